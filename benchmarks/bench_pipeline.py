@@ -0,0 +1,206 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from src.engine.core import BaziEngine
+from src.engine.models import BaziRequest, CalendarType, TimeMode, MonthMode, ZiShiMode, Gender
+from src.engine.preprocessor import Preprocessor
+from src.engine.extractor import CoreExtractor, FortuneExtractor, AuxiliaryExtractor
+from src.engine.algorithms.command import MonthCommandExtractor
+from src.engine.algorithms.energy import EnergyModel
+from src.engine.algorithms.interactions import InteractionDetector
+from src.engine.algorithms.geju import GejuAnalyzer
+from src.engine.algorithms.analysis import AnalysisEngine
+from src.engine.algorithms.stars import StarDetector
+from src.engine.utils import Tracer
+
+LOCATIONS = ["北京", "上海", "深圳市", "乌鲁木齐", "哈尔滨", "拉萨", "广东省/深圳市/南山区", "未知地点"]
+
+def build_corpus(samples: int, seed: int) -> List[BaziRequest]:
+    """固定语料：回归命例 + 固定种子的随机日期 / 地点 / 模式网格"""
+    corpus = []
+    with open("data/regression_test_full.json", "r", encoding="utf-8") as f:
+        for case in json.load(f):
+            corpus.append(BaziRequest(
+                name=case["case_name"],
+                gender=case.get("gender", 1),
+                birth_datetime=case["birth_datetime"],
+                birth_location=case.get("birth_location", "北京")
+            ))
+
+    rng = random.Random(seed)
+    for i in range(samples):
+        calendar_type = rng.choice(list(CalendarType))
+        day_max = 29 if calendar_type == CalendarType.LUNAR else 28
+        corpus.append(BaziRequest(
+            name=f"bench-{i}",
+            gender=rng.choice(list(Gender)),
+            calendar_type=calendar_type,
+            birth_datetime=f"{rng.randint(1801, 2199)}-{rng.randint(1, 12):02d}-{rng.randint(1, day_max):02d} "
+                           f"{rng.choice([0, 1, 11, 12, 22, 23, rng.randint(0, 23)]):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+            birth_location=rng.choice(LOCATIONS),
+            time_mode=rng.choice(list(TimeMode)),
+            month_mode=rng.choice(list(MonthMode)),
+            zi_shi_mode=rng.choice(list(ZiShiMode))
+        ))
+    return corpus
+
+def build_stages(engine: BaziEngine) -> Dict[str, Callable[[BaziRequest], object]]:
+    """各阶段单独计时；阶段所需的上游数据在计时外预先算好"""
+    pre: Preprocessor = engine.preprocessor
+    prepared = {}
+
+    def ctx_of(req):
+        key = id(req)
+        if key not in prepared:
+            ctx = pre.process(req)
+            energy = EnergyModel.calculate_scores(ctx)
+            interactions = InteractionDetector.detect_all(ctx)
+            scores = {k: v["score"] for k, v in energy.items()}
+            geju = GejuAnalyzer.analyze(ctx, interactions, scores)
+            prepared[key] = (ctx, energy, interactions, scores, geju)
+        return prepared[key]
+
+    def interactions(req):
+        ctx = ctx_of(req)[0]
+        found = InteractionDetector.detect_all(ctx, Tracer())
+        InteractionDetector.validate_transformations(found, ctx, Tracer())
+        return found
+
+    return {
+        "preprocess.correct": lambda req: pre.correct(req),
+        "preprocess.process": lambda req: pre.process(req),
+        "extract.core": lambda req: CoreExtractor.extract(ctx_of(req)[0]),
+        "extract.fortune": lambda req: FortuneExtractor.extract(ctx_of(req)[0]),
+        "extract.auxiliary": lambda req: AuxiliaryExtractor.extract(ctx_of(req)[0]),
+        "algo.command": lambda req: MonthCommandExtractor.get_command(ctx_of(req)[0], Tracer()),
+        "algo.energy": lambda req: EnergyModel.calculate_scores(ctx_of(req)[0], Tracer()),
+        "algo.interactions": interactions,
+        "algo.geju": lambda req: GejuAnalyzer.analyze(ctx_of(req)[0], ctx_of(req)[2], ctx_of(req)[3], Tracer()),
+        "algo.analysis": lambda req: AnalysisEngine.analyze(ctx_of(req)[0], ctx_of(req)[1], ctx_of(req)[4], Tracer()),
+        "algo.stars": lambda req: StarDetector.detect(ctx_of(req)[0], Tracer()),
+        "arrange": lambda req: engine.arrange(req),
+    }, ctx_of
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+def measure(stage: Callable, corpus: List[BaziRequest], repeat: int, alloc_samples: int) -> Dict[str, float]:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for req in corpus:
+            t0 = time.perf_counter()
+            stage(req)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    # 内存分配：tracemalloc 下逐次测量单次调用的峰值分配
+    peaks = []
+    tracemalloc.start()
+    for req in corpus[:alloc_samples]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        stage(req)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    return {
+        "calls": len(latencies),
+        "p50_us": round(_percentile(latencies, 0.50) * 1e6, 1),
+        "p99_us": round(_percentile(latencies, 0.99) * 1e6, 1),
+        "mean_us": round(statistics.fmean(latencies) * 1e6, 1),
+        "throughput_per_s": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "alloc_peak_kib": round(statistics.fmean(peaks) / 1024, 1) if peaks else 0.0,
+    }
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """p50 / p99 超出基线 (1 + tolerance) 倍视为性能回退"""
+    regressions = []
+    for name, stats in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        for metric in ("p50_us", "p99_us"):
+            if base[metric] > 0 and stats[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {base[metric]} -> {stats[metric]}")
+    return regressions
+
+def run_benchmark(samples: int = 200, seed: int = 20240101, repeat: int = 3, alloc_samples: int = 50,
+                  only: List[str] = None, save: str = None, baseline: str = None, tolerance: float = 0.25) -> int:
+    engine = BaziEngine()
+    corpus = build_corpus(samples, seed)
+    stages, ctx_of = build_stages(engine)
+
+    # 预热：加载配置 / 节气表并填满 lunar_python 的年份缓存，同时准备各阶段上游数据
+    for req in corpus:
+        ctx_of(req)
+        engine.arrange(req)
+
+    print("\n" + "═"*100)
+    print(f"  排盘流水线基准测试 (语料 {len(corpus)} 条, seed={seed}, repeat={repeat})")
+    print("─"*100)
+    print(f"  {'阶段':<22}{'p50(µs)':>12}{'p99(µs)':>12}{'mean(µs)':>12}{'吞吐(次/s)':>14}{'峰值分配(KiB)':>16}")
+    print("─"*100)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "samples": len(corpus),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "stages": {}
+    }
+    for name, stage in stages.items():
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        stats = measure(stage, corpus, repeat, alloc_samples)
+        report["stages"][name] = stats
+        print(f"  {name:<22}{stats['p50_us']:>12}{stats['p99_us']:>12}{stats['mean_us']:>12}"
+              f"{stats['throughput_per_s']:>14}{stats['alloc_peak_kib']:>16}")
+    print("─"*100)
+
+    if save:
+        with open(save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"  > 基线已保存: {save}")
+
+    status = 0
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), tolerance)
+        if regressions:
+            status = 1
+            print(f"  ❌ 性能回退 (容差 {tolerance*100:.0f}%):")
+            for line in regressions:
+                print(f"     {line}")
+        else:
+            print(f"  ✅ 未发现超出 {tolerance*100:.0f}% 容差的回退")
+    print("═"*100 + "\n")
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="排盘流水线基准测试")
+    parser.add_argument("--samples", type=int, default=200, help="随机语料条数 (另含全部回归命例)")
+    parser.add_argument("--seed", type=int, default=20240101)
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段遍历语料的轮数")
+    parser.add_argument("--alloc-samples", type=int, default=50, help="测量内存分配的调用次数")
+    parser.add_argument("--only", nargs="*", help="只运行指定前缀的阶段，如 algo. arrange")
+    parser.add_argument("--save", help="将结果保存为 JSON 基线")
+    parser.add_argument("--baseline", help="与 JSON 基线比较，超出容差时以非零状态退出")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的 p50/p99 相对退化比例")
+    args = parser.parse_args()
+    sys.exit(run_benchmark(args.samples, args.seed, args.repeat, args.alloc_samples,
+                           args.only, args.save, args.baseline, args.tolerance))
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# 在全新子进程中测量冷启动各阶段：导入、构造引擎、预热、首个请求、稳态请求
+_CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+from src.engine.core import BaziEngine
+from src.engine.models import BaziRequest
+t1 = time.perf_counter()
+engine = BaziEngine()
+t2 = time.perf_counter()
+warm = {k: v.seconds for k, v in engine.warm_up().items()} if WARM else {}
+t3 = time.perf_counter()
+requests = [BaziRequest(name="冷启动", birth_datetime=f"{1950 + i}-0{1 + i % 9}-1{i % 10} 0{i % 10}:30:00",
+                        birth_location="上海") for i in range(STEADY + 1)]
+engine.arrange(requests[0])
+t4 = time.perf_counter()
+steady = []
+for r in requests[1:]:
+    s = time.perf_counter()
+    engine.arrange(r)
+    steady.append(time.perf_counter() - s)
+print(json.dumps({"import": t1 - t0, "engine": t2 - t1, "warm_up": t3 - t2, "first_request": t4 - t3,
+                  "steady_request": sorted(steady)[len(steady) // 2] if steady else 0.0, "warm_stages": warm}))
+"""
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (os.getcwd(), env.get("PYTHONPATH")) if p)
+    return env
+
+def import_report(module: str = "src.engine.core", top: int = 15) -> Dict:
+    """python -X importtime：返回总导入耗时与按自身耗时排序的前 top 个模块 (微秒)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=_env(), check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    total = next((c for n, _, c in rows if n.strip() == module), 0)
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return {
+        "module": module,
+        "total_us": total,
+        "top": [{"module": n.strip(), "self_us": s, "cumulative_us": c} for n, s, c in rows[:top]]
+    }
+
+def cold_start(runs: int = 5, warm: bool = True, steady: int = 5) -> Dict:
+    """多次冷启动取各阶段中位数 (秒)"""
+    child = _CHILD.replace("WARM", str(warm)).replace("STEADY", str(steady))
+    samples: List[Dict] = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", child], capture_output=True, text=True, env=_env(), check=True)
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    phases = ("import", "engine", "warm_up", "first_request", "steady_request")
+    report = {p: statistics.median(s[p] for s in samples) for p in phases}
+    stages = samples[0]["warm_stages"].keys()
+    report["warm_stages"] = {k: statistics.median(s["warm_stages"][k] for s in samples) for k in stages}
+    # 冷启动总耗时：进程开始导入到首个请求返回
+    report["time_to_first_result"] = report["import"] + report["engine"] + report["warm_up"] + report["first_request"]
+    return report
+
+def run_cold_start(runs: int, top: int, budget: float, save: str = None) -> int:
+    imports = import_report(top=top)
+    cold = cold_start(runs, warm=False)
+    warm = cold_start(runs, warm=True)
+
+    print("\n" + "═"*75)
+    print(f"  冷启动测量 (子进程 {runs} 次取中位数)")
+    print("─"*75)
+    print(f"  {'阶段':<20}{'不预热(ms)':>14}{'预热(ms)':>14}")
+    for phase in ("import", "engine", "warm_up", "first_request", "steady_request", "time_to_first_result"):
+        print(f"  {phase:<20}{cold[phase] * 1e3:>14.1f}{warm[phase] * 1e3:>14.1f}")
+    for stage, seconds in warm["warm_stages"].items():
+        print(f"    warm_up.{stage:<19}{'':>6}{seconds * 1e3:>14.1f}")
+    print("─"*75)
+    print(f"  导入耗时报告: import {imports['module']} 共 {imports['total_us'] / 1e3:.1f} ms，自身耗时最多的模块:")
+    for row in imports["top"]:
+        print(f"    {row['module']:<45}{row['self_us'] / 1e3:>9.1f} ms{row['cumulative_us'] / 1e3:>10.1f} ms (累计)")
+    print("─"*75)
+
+    if save:
+        report = {"meta": {"python": platform.python_version(), "platform": platform.platform(), "runs": runs},
+                  "imports": imports, "cold": cold, "warm": warm}
+        with open(save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"  > 结果已保存: {save}")
+
+    status = 0
+    if budget:
+        if warm["time_to_first_result"] > budget:
+            status = 1
+            print(f"  ❌ 冷启动 {warm['time_to_first_result']:.3f}s 超出预算 {budget:.3f}s")
+        else:
+            print(f"  ✅ 冷启动 {warm['time_to_first_result']:.3f}s 在预算 {budget:.3f}s 之内")
+    print("═"*75 + "\n")
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="冷启动与导入耗时测量")
+    parser.add_argument("--runs", type=int, default=5, help="冷启动子进程次数")
+    parser.add_argument("--top", type=int, default=15, help="导入耗时报告列出的模块数")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="预热模式下从导入到首个结果的耗时预算 (秒)，超出时以非零状态退出；0 为不检查")
+    parser.add_argument("--save", help="将结果保存为 JSON")
+    args = parser.parse_args()
+    sys.exit(run_cold_start(args.runs, args.top, args.budget, args.save))
@@ -0,0 +1,5 @@
+import sys
+from src.engine.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
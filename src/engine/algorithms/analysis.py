@@ -1,9 +1,9 @@
-from typing import List, Dict, Optional
+from typing import Dict
 from pydantic import BaseModel
 from src.engine.preprocessor import BaziContext
 from src.engine.utils import Tracer
-from src.engine.algorithms.energy import EnergyModel
 from src.engine.algorithms.geju import GejuResult
+from src.engine.ganzhi import ELEMENTS, GAN_ELEMENT, SEASON_INDEX
 
 class AnalysisResult(BaseModel):
     strength_level: str
@@ -21,33 +21,27 @@ class AnalysisEngine:
     
     @staticmethod
     def analyze(ctx: BaziContext, energy_data: Dict[str, Dict], geju: GejuResult, tracer: Tracer = None) -> AnalysisResult:
-        lunar = ctx.solar.getLunar()
-        eight_char = lunar.getEightChar()
-        day_gan = eight_char.getDayGan()
-        day_elem = EnergyModel._gan_to_elem(day_gan)
+        idx = GAN_ELEMENT[ctx.chart.day.g]
         
-        scores = {k: v["score"] for k, v in energy_data.items()}
-        day_status = energy_data[day_elem]["season_status"] # 旺相休囚死
+        scores = [energy_data[e]["score"] for e in ELEMENTS]
+        day_status = SEASON_INDEX[energy_data[ELEMENTS[idx]]["season_status"]] # 旺相休囚死 -> 0-4
         
-        # 1. 角色定义
-        cycle = ["木", "火", "土", "金", "水"]
-        idx = cycle.index(day_elem)
-        sheng_me = cycle[(idx - 1) % 5] # 印
-        me_sheng = cycle[(idx + 1) % 5] # 食伤
-        ke_me = cycle[(idx - 2) % 5]    # 官杀
-        me_ke = cycle[(idx + 2) % 5]    # 财
+        # 1. 角色定义 (五行序号)
+        sheng_me = (idx - 1) % 5 # 印
+        me_sheng = (idx + 1) % 5 # 食伤
+        ke_me = (idx - 2) % 5    # 官杀
+        me_ke = (idx + 2) % 5    # 财
         
         # 2. 气势博弈 (Net Balance)
-        support_score = scores[day_elem] + scores[sheng_me]
-        drain_score = scores[me_sheng] + scores[me_ke] + scores[ke_me]
-        total_score = sum(scores.values())
+        support_score = scores[idx] + scores[sheng_me]
+        total_score = sum(scores)
         support_ratio = support_score / total_score if total_score > 0 else 0
         
         # 3. 动态阈值判定
         threshold_strong = 0.50 # 略微降低强弱分界线
-        if day_status in ["旺", "相"]:
+        if day_status <= 1:     # 旺、相
             threshold_strong = 0.46
-        elif day_status in ["死", "绝"]:
+        elif day_status == 4:   # 死
             threshold_strong = 0.55
             
         level = "中和"
@@ -62,19 +56,19 @@ class AnalysisEngine:
             if level in ["中和", "偏强"]:
                 old_level = level
                 level = "偏弱"
-                if tracer: tracer.record("强弱判定", f"检测到食伤[{me_sheng}]重泄，定性从[{old_level}]下调至[{level}]")
+                if tracer: tracer.record("强弱判定", f"检测到食伤[{ELEMENTS[me_sheng]}]重泄，定性从[{old_level}]下调至[{level}]")
 
         if tracer:
-            tracer.record("强弱判定", f"支持率:{support_ratio*100:.1f}%, 状态:{day_status}, 最终判定:{level}")
+            tracer.record("强弱判定", f"支持率:{support_ratio*100:.1f}%, 状态:{energy_data[ELEMENTS[idx]]['season_status']}, 最终判定:{level}")
 
         # 5. 喜用神 (护格 > 调候 > 扶抑)
         yong, xi, ji, chou = "", "", "", ""
         logic = "扶抑平衡"
         
         if "强" in level:
-            yong, xi, ji, chou = ke_me, me_ke, sheng_me, day_elem
+            yong, xi, ji, chou = ke_me, me_ke, sheng_me, idx
         else:
-            yong, xi, ji, chou = sheng_me, day_elem, ke_me, me_ke
+            yong, xi, ji, chou = sheng_me, idx, ke_me, me_ke
 
         # 格局护卫优化
         if "伤官佩印" in geju.name or "杀印相生" in geju.name or "病药" in geju.status:
@@ -84,6 +78,6 @@ class AnalysisEngine:
         return AnalysisResult(
             strength_level=level,
             strength_score=round(support_ratio * 100, 2),
-            yong_shen=yong, xi_shen=xi, ji_shen=ji, chou_shen=chou,
+            yong_shen=ELEMENTS[yong], xi_shen=ELEMENTS[xi], ji_shen=ELEMENTS[ji], chou_shen=ELEMENTS[chou],
             logic_type=logic
         )
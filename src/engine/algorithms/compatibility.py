@@ -0,0 +1,218 @@
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from pydantic import BaseModel
+from src.engine.models import BaziRequest
+from src.engine.preprocessor import BaziContext, Preprocessor
+from src.engine.utils import NULL_TRACER
+from src.engine.algorithms.energy import EnergyModel
+from src.engine.algorithms.interactions import InteractionDetector
+from src.engine.algorithms.geju import GejuAnalyzer
+from src.engine.algorithms.analysis import AnalysisEngine
+from src.engine.ganzhi import GAN, ZHI, ELEMENTS, ELEMENT_INDEX, STEM_COMBINE, BRANCH_CLASH
+
+_STEM_COMBINE = np.array(STEM_COMBINE, dtype=np.int8)
+_BRANCH_CLASH = np.array(BRANCH_CLASH, dtype=np.int8)
+
+class ChartFeatures(NamedTuple):
+    """单个命盘的合婚特征：四柱干支序号、喜用忌神五行、五行占比"""
+    gan: Tuple[int, int, int, int]   # 年月日时天干
+    zhi: Tuple[int, int, int, int]   # 年月日时地支
+    yong: int                        # 用神五行
+    ji: int                          # 忌神五行
+    share: Tuple[float, ...]         # 五行能量占比 (木火土金水，合计为 1)
+    gender: int
+
+class CompatScore(BaseModel):
+    score: float            # 0-100
+    day_stem_combine: bool  # 日干相合
+    day_branch_clash: bool  # 日支相冲
+    stem_combines: int      # 两盘天干相合的对数
+    branch_clashes: int     # 两盘地支相冲的对数
+    yong_support: float     # 对方五行对己方用神的补益 (0-1，双向平均)
+    ji_burden: float        # 对方五行对己方忌神的加重 (0-1，双向平均)
+    reasons: List[str] = []
+
+class CandidatePool:
+    """
+    候选人特征表 (列式 numpy 数组)，一次预计算后可反复打分。
+    gan / zhi: (N, 4) int8；yong / ji / gender: (N,) int8；share: (N, 5) float32
+    """
+
+    def __init__(self, gan: np.ndarray, zhi: np.ndarray, yong: np.ndarray, ji: np.ndarray,
+                 share: np.ndarray, gender: np.ndarray, ids: Optional[np.ndarray] = None):
+        self.gan = gan
+        self.zhi = zhi
+        self.yong = yong
+        self.ji = ji
+        self.share = share
+        self.gender = gender
+        self.ids = ids if ids is not None else np.arange(len(gan))
+
+    def __len__(self) -> int:
+        return len(self.gan)
+
+    @staticmethod
+    def from_features(features: Iterable[ChartFeatures], ids: Optional[Iterable] = None) -> "CandidatePool":
+        features = list(features)
+        return CandidatePool(
+            gan=np.array([f.gan for f in features], dtype=np.int8).reshape(-1, 4),
+            zhi=np.array([f.zhi for f in features], dtype=np.int8).reshape(-1, 4),
+            yong=np.array([f.yong for f in features], dtype=np.int8),
+            ji=np.array([f.ji for f in features], dtype=np.int8),
+            share=np.array([f.share for f in features], dtype=np.float32).reshape(-1, 5),
+            gender=np.array([f.gender for f in features], dtype=np.int8),
+            ids=np.array(list(ids)) if ids is not None else None
+        )
+
+    @staticmethod
+    def from_requests(requests: Iterable[BaziRequest], preprocessor: Optional[Preprocessor] = None,
+                      ids: Optional[Iterable] = None) -> "CandidatePool":
+        pre = preprocessor or Preprocessor()
+        return CandidatePool.from_features(
+            (CompatibilityAnalyzer.features(pre.process(r)) for r in requests), ids
+        )
+
+    def row(self, i: int) -> ChartFeatures:
+        return ChartFeatures(
+            tuple(int(x) for x in self.gan[i]), tuple(int(x) for x in self.zhi[i]),
+            int(self.yong[i]), int(self.ji[i]), tuple(float(x) for x in self.share[i]), int(self.gender[i])
+        )
+
+    def save(self, path: str):
+        np.savez(path, gan=self.gan, zhi=self.zhi, yong=self.yong, ji=self.ji,
+                 share=self.share, gender=self.gender, ids=self.ids)
+
+    @staticmethod
+    def load(path: str) -> "CandidatePool":
+        with np.load(path, allow_pickle=False) as data:
+            return CandidatePool(data["gan"], data["zhi"], data["yong"], data["ji"],
+                                 data["share"], data["gender"], data["ids"])
+
+class CompatibilityAnalyzer:
+    """
+    合婚配对分析：以天干五合、地支六冲 (InteractionDetector 同一套表)、
+    五行能量 (EnergyModel) 与喜用忌神 (AnalysisEngine) 为依据给两盘打分。
+    score 为单对打分并附理由；rank 对整个候选池做向量化打分。
+    """
+
+    # 评分权重 (基准 50 分，结果截断到 0-100)
+    BASE = 50.0
+    DAY_STEM_COMBINE = 15.0   # 日干相合 (夫妻宫主星相合)
+    DAY_BRANCH_CLASH = -15.0  # 日支相冲 (夫妻宫相冲)
+    STEM_COMBINE = 3.0        # 任意两柱天干相合，每对
+    BRANCH_CLASH = -3.0       # 任意两柱地支相冲，每对
+    YONG_SUPPORT = 30.0       # 对方五行补益己方用神
+    JI_BURDEN = -20.0         # 对方五行加重己方忌神
+
+    @staticmethod
+    def features(ctx: BaziContext) -> ChartFeatures:
+        """提取合婚特征：只跑五行评分与强弱喜用，不做完整排盘"""
+        chart = ctx.chart
+        energy = EnergyModel.calculate_scores(ctx, NULL_TRACER)
+        scores = {k: v["score"] for k, v in energy.items()}
+        interactions = InteractionDetector.detect_all(ctx, NULL_TRACER)
+        InteractionDetector.validate_transformations(interactions, ctx, NULL_TRACER)
+        geju = GejuAnalyzer.analyze(ctx, interactions, scores, NULL_TRACER)
+        analysis = AnalysisEngine.analyze(ctx, energy, geju, NULL_TRACER)
+
+        total = sum(scores.values()) or 1.0
+        return ChartFeatures(
+            gan=tuple(p.g for p in chart.pillars),
+            zhi=tuple(p.z for p in chart.pillars),
+            yong=ELEMENT_INDEX[analysis.yong_shen],
+            ji=ELEMENT_INDEX[analysis.ji_shen],
+            share=tuple(scores[e] / total for e in ELEMENTS),
+            gender=int(ctx.request.gender)
+        )
+
+    @staticmethod
+    def score(a: ChartFeatures, b: ChartFeatures) -> CompatScore:
+        """单对打分，与 rank 的向量化结果一致，并附带可读理由"""
+        cls = CompatibilityAnalyzer
+        reasons = []
+
+        stem_combines = sum(STEM_COMBINE[x] == y for x in a.gan for y in b.gan)
+        branch_clashes = sum(BRANCH_CLASH[x] == y for x in a.zhi for y in b.zhi)
+        day_combine = STEM_COMBINE[a.gan[2]] == b.gan[2]
+        day_clash = BRANCH_CLASH[a.zhi[2]] == b.zhi[2]
+        # 先按 float32 取整，与候选池中的存储精度一致
+        share_a = np.asarray(a.share, dtype=np.float32)
+        share_b = np.asarray(b.share, dtype=np.float32)
+        yong_support = float((share_b[a.yong] + share_a[b.yong]) / 2)
+        ji_burden = float((share_b[a.ji] + share_a[b.ji]) / 2)
+
+        if day_combine:
+            reasons.append(f"日干相合: {GAN[a.gan[2]]}{GAN[b.gan[2]]}")
+        if day_clash:
+            reasons.append(f"日支相冲: {ZHI[a.zhi[2]]}{ZHI[b.zhi[2]]}")
+        if stem_combines:
+            reasons.append(f"天干相合 {stem_combines} 对")
+        if branch_clashes:
+            reasons.append(f"地支相冲 {branch_clashes} 对")
+        reasons.append(f"用神互补: 对方{ELEMENTS[a.yong]}占比 {share_b[a.yong]:.0%}, 己方{ELEMENTS[b.yong]}占比 {share_a[b.yong]:.0%}")
+
+        total = cls._total(day_combine, day_clash, stem_combines, branch_clashes, yong_support, ji_burden)
+        return CompatScore(
+            score=round(float(total), 2),
+            day_stem_combine=bool(day_combine),
+            day_branch_clash=bool(day_clash),
+            stem_combines=int(stem_combines),
+            branch_clashes=int(branch_clashes),
+            yong_support=round(yong_support, 4),
+            ji_burden=round(ji_burden, 4),
+            reasons=reasons
+        )
+
+    @staticmethod
+    def _total(day_combine, day_clash, stem_combines, branch_clashes, yong_support, ji_burden):
+        # 标量与数组通用
+        cls = CompatibilityAnalyzer
+        total = (cls.BASE
+                 + cls.DAY_STEM_COMBINE * day_combine
+                 + cls.DAY_BRANCH_CLASH * day_clash
+                 + cls.STEM_COMBINE * stem_combines
+                 + cls.BRANCH_CLASH * branch_clashes
+                 + cls.YONG_SUPPORT * yong_support
+                 + cls.JI_BURDEN * ji_burden)
+        return np.clip(total, 0.0, 100.0)
+
+    @staticmethod
+    def score_pool(a: ChartFeatures, pool: CandidatePool) -> np.ndarray:
+        """对候选池全部成员打分，返回 (N,) float32"""
+        a_gan = np.array(a.gan, dtype=np.int8)
+        a_zhi = np.array(a.zhi, dtype=np.int8)
+        share_a = np.array(a.share, dtype=np.float32)
+
+        # 1. 天干相合 / 地支相冲：A 的 4 柱与候选 4 柱两两比较 -> (N, 4, 4)
+        combine_targets = _STEM_COMBINE[a_gan]
+        clash_targets = _BRANCH_CLASH[a_zhi]
+        stem_combines = (pool.gan[:, None, :] == combine_targets[None, :, None]).sum(axis=(1, 2))
+        branch_clashes = (pool.zhi[:, None, :] == clash_targets[None, :, None]).sum(axis=(1, 2))
+        day_combine = pool.gan[:, 2] == combine_targets[2]
+        day_clash = pool.zhi[:, 2] == clash_targets[2]
+
+        # 2. 喜用忌神互补：候选五行占比中己方用 / 忌神的份额，以及己方占比中候选用 / 忌神的份额
+        yong_support = (pool.share[:, a.yong] + share_a[pool.yong]) / 2
+        ji_burden = (pool.share[:, a.ji] + share_a[pool.ji]) / 2
+
+        return CompatibilityAnalyzer._total(
+            day_combine, day_clash, stem_combines, branch_clashes, yong_support, ji_burden
+        ).astype(np.float32)
+
+    @staticmethod
+    def rank(a: ChartFeatures, pool: CandidatePool, top: int = 50,
+             gender: Optional[int] = None) -> List[Tuple[object, float]]:
+        """
+        候选池排名：返回 [(候选 id, 分数), ...]，按分数降序。
+        gender 指定时只保留该性别的候选。
+        """
+        scores = CompatibilityAnalyzer.score_pool(a, pool)
+        if gender is not None:
+            scores = np.where(pool.gender == gender, scores, -1.0)
+        top = min(top, len(scores))
+        if top <= 0:
+            return []
+        # 先 argpartition 取前 top 个，再只对这部分排序
+        picked = np.argpartition(-scores, top - 1)[:top]
+        picked = picked[np.argsort(-scores[picked], kind="stable")]
+        return [(pool.ids[i].item(), float(scores[i])) for i in picked if scores[i] >= 0]
@@ -1,8 +1,9 @@
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional
 from pydantic import BaseModel
 from src.engine.preprocessor import BaziContext
 from src.engine.utils import Tracer
 from src.engine.algorithms.interactions import Interaction
+from src.engine.ganzhi import GAN_INDEX, ELEMENTS, GAN_ELEMENT, SHI_SHEN, SHI_SHEN_TABLE, element_relation
 
 class GejuResult(BaseModel):
     name: str
@@ -11,86 +12,80 @@ class GejuResult(BaseModel):
     detail: str
 
 class GejuAnalyzer:
+    # 五行关系类别名 (按 ganzhi.element_relation 序号)
+    RELATION_NAMES = ("比劫", "食伤", "财星", "官杀", "印绶")
+    # 专旺格名 (按五行序号)
+    SPECIAL_NAMES = ("曲直格", "炎上格", "稼格", "从革格", "润下格")
+
+    # 十神序号 (见 ganzhi.SHI_SHEN)
+    BI_JIAN, SHANG_GUAN, QI_SHA = 0, 3, 6
+    YIN = 4  # 偏印、正印的类别 (序号 // 2)
+
     @staticmethod
     def _get_shishen(day_gan: str, target_gan: str) -> str:
         # 简化版十神映射逻辑 (仅用于定名)
-        from src.engine.algorithms.energy import EnergyModel
-        day_elem = EnergyModel._gan_to_elem(day_gan)
-        target_elem = EnergyModel._gan_to_elem(target_gan)
-        
-        cycle = ["木", "火", "土", "金", "水"]
-        d_idx = cycle.index(day_elem)
-        t_idx = cycle.index(target_elem)
-        diff = (t_idx - d_idx) % 5
-        
-        mapping = {0: "比劫", 1: "食伤", 2: "财星", 3: "官杀", 4: "印绶"}
-        return mapping.get(diff, "未知")
+        relation = element_relation(GAN_ELEMENT[GAN_INDEX[day_gan]], GAN_ELEMENT[GAN_INDEX[target_gan]])
+        return GejuAnalyzer.RELATION_NAMES[relation]
 
     @staticmethod
     def analyze(ctx: BaziContext, interactions: List[Interaction], scores: Dict[str, float], tracer: Tracer = None) -> GejuResult:
-        lunar = ctx.solar.getLunar()
-        eight_char = lunar.getEightChar()
-        day_gan = eight_char.getDayGan()
-        from src.engine.algorithms.energy import EnergyModel
-        day_elem = EnergyModel._gan_to_elem(day_gan)
+        chart = ctx.chart
+        day_g = chart.day.g
+        day_elem = GAN_ELEMENT[day_g]
+        ten_gods = SHI_SHEN_TABLE[day_g]
         
         # 1. 识别特殊格局 (优先级最高)
-        total_score = sum(scores.values())
-        day_ratio = scores[day_elem] / total_score if total_score > 0 else 0
+        score_list = [scores[e] for e in ELEMENTS]
+        total_score = sum(score_list)
+        day_ratio = score_list[day_elem] / total_score if total_score > 0 else 0
         
         # A. 专旺格 (炎上、润下等)
         if day_ratio > 0.7:
-            special_names = {"火": "炎上格", "水": "润下格", "金": "从革格", "木": "曲直格", "土": "稼格"}
-            name = special_names.get(day_elem, "专旺格")
+            name = GejuAnalyzer.SPECIAL_NAMES[day_elem]
             return GejuResult(name=name, type="SPECIAL", status="成格", detail="日主气势极盛，五行专旺")
             
         # B. 从格 (弃命从财/杀)
         # 条件：支持率极低且无印星透干
-        all_stems_ss = [eight_char.getYearShiShenGan(), eight_char.getMonthShiShenGan(), eight_char.getTimeShiShenGan()]
-        has_seal = any("印" in s or "枭" in s for s in all_stems_ss)
+        stems_ss = [ten_gods[chart.year.g], ten_gods[chart.month.g], ten_gods[chart.time.g]]
+        has_seal = any(ss // 2 == GejuAnalyzer.YIN for ss in stems_ss)
         
         if day_ratio < 0.15 and not has_seal:
-            # 找到最强五行并转化为十神定名
-            sorted_elems = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-            top_elem = sorted_elems[0][0]
-            # 获取最强五行对日主的十神名
-            top_ss = GejuAnalyzer._get_shishen(day_gan, EnergyModel.ELEMENT_MAP[top_elem][0])
+            # 找到最强五行，按其对日主的关系定名 (同分取五行序靠前者)
+            top_elem = max(range(5), key=score_list.__getitem__)
+            relation = element_relation(day_elem, top_elem)
             
-            if any(k in top_ss for k in ["财", "杀", "官", "食", "伤"]):
-                name = f"从{top_ss[:1]}格" # 如 从财格, 从杀格
+            if relation in (1, 2, 3):  # 食伤、财星、官杀
+                top_ss = GejuAnalyzer.RELATION_NAMES[relation]
+                name = f"从{top_ss[:1]}格" # 如 从财格, 从官格
                 return GejuResult(name=name, type="SPECIAL", status="成格", detail=f"日主无根无助，弃命从{top_ss}")
 
         # 2. 正八格取法 (月令透干优先)
-        month_all_gans = eight_char.getMonthHideGan()
+        month_hide = chart.month.hide
+        geju_ss: Optional[int] = None
         geju_name = ""
-        check_list = [
-            (eight_char.getYearGan(), eight_char.getYearShiShenGan),
-            (eight_char.getMonthGan(), eight_char.getMonthShiShenGan),
-            (eight_char.getTimeGan(), eight_char.getTimeShiShenGan)
-        ]
-
-        for gan, shi_shen_func in check_list:
-            if gan in month_all_gans:
-                ss = shi_shen_func()
-                if any(k in ss for k in ["官", "财", "印", "食", "杀", "伤"]):
-                    geju_name = ss
-                    break
+        for pillar, ss in zip((chart.year, chart.month, chart.time), stems_ss):
+            # 透出月令藏干者取格，仅比肩除外 (劫财亦可取格，与原字符串匹配规则一致)
+            if pillar.g in month_hide and ss != GejuAnalyzer.BI_JIAN:
+                geju_ss = ss
+                break
         
-        if not geju_name:
-            main_ss = eight_char.getMonthShiShenZhi()[0]
-            if "比" in main_ss or "劫" in main_ss:
-                geju_name = "建禄格" if "比" in main_ss else "月刃格"
+        if geju_ss is None:
+            main_ss = ten_gods[month_hide[0]]
+            if main_ss // 2 == 0:
+                geju_name = "建禄格" if main_ss == GejuAnalyzer.BI_JIAN else "月刃格"
             else:
-                geju_name = main_ss
+                geju_ss = main_ss
 
         # 3. 意象组合分析
-        all_stems_ss = [eight_char.getYearShiShenGan(), eight_char.getMonthShiShenGan(), eight_char.getTimeShiShenGan()]
-        if "伤官" in geju_name or "伤官" in all_stems_ss:
-            if any("印" in s for s in all_stems_ss): geju_name = "伤官佩印"
-        elif "杀" in geju_name and any("印" in s for s in all_stems_ss):
+        has_yin = has_seal
+        if geju_ss is not None:
+            geju_name = SHI_SHEN[geju_ss]
+        if geju_ss == GejuAnalyzer.SHANG_GUAN or GejuAnalyzer.SHANG_GUAN in stems_ss:
+            if has_yin: geju_name = "伤官佩印"
+        elif geju_ss == GejuAnalyzer.QI_SHA and has_yin:
             geju_name = "杀印相生"
 
         if not geju_name.endswith("格") and "佩印" not in geju_name and "相生" not in geju_name:
             geju_name += "格"
 
-        return GejuResult(name=geju_name, type="INNER_EIGHT", status="成格", detail="标准正八格取法")
\ No newline at end of file
+        return GejuResult(name=geju_name, type="INNER_EIGHT", status="成格", detail="标准正八格取法")
@@ -1,7 +1,11 @@
-from typing import List, Dict, Tuple, Optional
+from typing import List, Optional
 from pydantic import BaseModel
 from src.engine.preprocessor import BaziContext
 from src.engine.utils import Tracer
+from src.engine.ganzhi import (
+    GAN, ZHI, ELEMENTS, ELEMENT_INDEX, GAN_ELEMENT, ELEMENT_YANG_GAN,
+    DI_SHI, DI_SHI_TABLE, DI_SHI_PROSPEROUS, STEM_COMBINE, STEM_COMBINE_ELEMENT, BRANCH_CLASH
+)
 
 class Interaction(BaseModel):
     type: str        # 合, 冲, 刑, 害, 破, 会, 伏吟, 反吟
@@ -14,123 +18,94 @@ class Interaction(BaseModel):
 class InteractionDetector:
     """
     干支作用关系检测器 (基于《渊海子平》)
+    天干五合、地支六冲见 ganzhi.STEM_COMBINE / BRANCH_CLASH
     """
-    
-    # 十天干合化定义
-    STEM_COMBINATIONS = {
-        ("甲", "己"): "土",
-        ("乙", "庚"): "金",
-        ("丙", "辛"): "水",
-        ("丁", "壬"): "木",
-        ("戊", "癸"): "火"
-    }
-    
-    # 地支六冲
-    BRANCH_CLASHES = {
-        "子": "午", "丑": "未", "寅": "申", "卯": "酉", "辰": "戌", "巳": "亥"
-    }
-    
-    # 地支三刑 (简化逻辑)
-    BRANCH_PUNISHMENTS = {
-        ("寅", "巳", "申"): "无恩之刑",
-        ("未", "丑", "戌"): "持势之刑",
-        ("子", "卯"): "无礼之刑"
-    }
+
+    STEM_POSITIONS = ("年干", "月干", "日干", "时干")
+    BRANCH_POSITIONS = ("年支", "月支", "日支", "时支")
 
     @staticmethod
     def validate_transformations(interactions: List[Interaction], ctx: BaziContext, tracer: Tracer = None):
         """
         根据《渊海子平》标准校验合化是否成功
         """
-        lunar = ctx.solar.getLunar()
-        eight_char = lunar.getEightChar()
-        month_zhi = eight_char.getMonthZhi()
+        chart = ctx.chart
+        month_z = chart.month.z
         
-        # 获取原局所有天干
-        all_stems = [eight_char.getYearGan(), eight_char.getMonthGan(), eight_char.getDayGan(), eight_char.getTimeGan()]
+        # 获取原局所有天干的五行
+        stem_elems = {GAN_ELEMENT[p.g] for p in chart.pillars}
         
         for inter in interactions:
             if inter.type == "合" and inter.transformed_to:
                 # 校验条件 1: 天干引化 (化神必须在天干透出)
-                # 考虑到日干通常作为合化主体，我们检查是否有除了合化双方之外的同类五行透出，或者库的逻辑
                 # 这里简化为: 化神五行对应的天干是否在四柱中存在
-                from src.engine.algorithms.energy import EnergyModel
-                target_gans = EnergyModel.ELEMENT_MAP[inter.transformed_to]
-                has_leader = any(g in all_stems for g in target_gans)
+                elem = ELEMENT_INDEX[inter.transformed_to]
+                has_leader = elem in stem_elems
                 
                 # 校验条件 2: 月令支持 (化神在月令必须是旺或相)
-                # 获取化神在月令的状态
-                rep_gan = target_gans[0]
-                state = EnergyModel.get_state(rep_gan, month_zhi)
-                is_supported = state in ["长生", "沐浴", "冠带", "临官", "帝旺"]
+                # 以化神五行的阳干在月令的十二长生判定：长生至帝旺为得令
+                state = DI_SHI_TABLE[ELEMENT_YANG_GAN[elem]][month_z]
+                is_supported = state <= DI_SHI_PROSPEROUS
                 
                 if has_leader and is_supported:
                     inter.is_transformed = True
                     if tracer:
-                        tracer.record("干支作用", f"合化成功! [{inter.desc}] 因天干引化且月令支持({state})")
+                        tracer.record("干支作用", f"合化成功! [{inter.desc}] 因天干引化且月令支持({DI_SHI[state]})")
                 else:
                     inter.is_transformed = False
-                    reason = "引化神未透" if not has_leader else f"月令不助({state})"
+                    reason = "引化神未透" if not has_leader else f"月令不助({DI_SHI[state]})"
                     if tracer:
                         tracer.record("干支作用", f"合而不化: [{inter.desc}] 失败原因: {reason}")
 
     @staticmethod
     def detect_all(ctx: BaziContext, tracer: Tracer = None) -> List[Interaction]:
-        lunar = ctx.solar.getLunar()
-        eight_char = lunar.getEightChar()
+        pillars = ctx.chart.pillars
+        stem_pos = InteractionDetector.STEM_POSITIONS
+        branch_pos = InteractionDetector.BRANCH_POSITIONS
         
         interactions = []
-        
-        # 定义四柱天干地支
-        stems = [
-            (eight_char.getYearGan(), "年干"),
-            (eight_char.getMonthGan(), "月干"),
-            (eight_char.getDayGan(), "日干"),
-            (eight_char.getTimeGan(), "时干")
-        ]
-        branches = [
-            (eight_char.getYearZhi(), "年支"),
-            (eight_char.getMonthZhi(), "月支"),
-            (eight_char.getDayZhi(), "日支"),
-            (eight_char.getTimeZhi(), "时支")
-        ]
 
-        # 1. 天干五合检测
-        for i in range(len(stems)):
-            for j in range(i + 1, len(stems)):
-                pair = tuple(sorted([stems[i][0], stems[j][0]]))
-                if pair in InteractionDetector.STEM_COMBINATIONS:
-                    target_elem = InteractionDetector.STEM_COMBINATIONS[pair]
+        for i in range(4):
+            a = pillars[i]
+            for j in range(i + 1, 4):
+                b = pillars[j]
+
+                # 1. 天干五合检测
+                if STEM_COMBINE[a.g] == b.g:
+                    target_elem = ELEMENTS[STEM_COMBINE_ELEMENT[a.g]]
                     interactions.append(Interaction(
                         type="合",
-                        source=stems[i][1],
-                        target=stems[j][1],
+                        source=stem_pos[i],
+                        target=stem_pos[j],
                         transformed_to=target_elem,
-                        desc=f"{stems[i][0]}{stems[j][0]}合化{target_elem}"
+                        desc=f"{GAN[a.g]}{GAN[b.g]}合化{target_elem}"
                     ))
                     if tracer:
-                        tracer.record("干支作用", f"检测到天干合: {stems[i][1]}{stems[i][0]} + {stems[j][1]}{stems[j][0]}")
+                        tracer.record("干支作用", f"检测到天干合: {stem_pos[i]}{GAN[a.g]} + {stem_pos[j]}{GAN[b.g]}")
+
+        for i in range(4):
+            a = pillars[i]
+            for j in range(i + 1, 4):
+                b = pillars[j]
 
-        # 2. 地支六冲检测
-        for i in range(len(branches)):
-            for j in range(i + 1, len(branches)):
-                if InteractionDetector.BRANCH_CLASHES.get(branches[i][0]) == branches[j][0]:
+                # 2. 地支六冲检测
+                if BRANCH_CLASH[a.z] == b.z:
                     interactions.append(Interaction(
                         type="冲",
-                        source=branches[i][1],
-                        target=branches[j][1],
-                        desc=f"{branches[i][0]}{branches[j][0]}相冲"
+                        source=branch_pos[i],
+                        target=branch_pos[j],
+                        desc=f"{ZHI[a.z]}{ZHI[b.z]}相冲"
                     ))
                     if tracer:
-                        tracer.record("干支作用", f"检测到地支冲: {branches[i][1]}{branches[i][0]} vs {branches[j][1]}{branches[j][0]}")
+                        tracer.record("干支作用", f"检测到地支冲: {branch_pos[i]}{ZHI[a.z]} vs {branch_pos[j]}{ZHI[b.z]}")
 
         # 3. 伏吟/反吟检测 (原局)
-        for i in range(len(branches)):
-            for j in range(i + 1, len(branches)):
-                if branches[i][0] == branches[j][0] and stems[i][0] == stems[j][0]:
+        for i in range(4):
+            for j in range(i + 1, 4):
+                if pillars[i].z == pillars[j].z and pillars[i].g == pillars[j].g:
                     interactions.append(Interaction(
-                        type="伏吟", source=branches[i][1], target=branches[j][1],
-                        desc=f"{branches[i][1]}与{branches[j][1]}伏吟"
+                        type="伏吟", source=branch_pos[i], target=branch_pos[j],
+                        desc=f"{branch_pos[i]}与{branch_pos[j]}伏吟"
                     ))
 
         return interactions
@@ -0,0 +1,112 @@
+from typing import List, Optional, Sequence, Tuple
+from pydantic import BaseModel
+from src.engine.preprocessor import BaziContext
+from src.engine.extractor import FortuneData, FortuneExtractor
+from src.engine.algorithms.interactions import Interaction, InteractionDetector
+from src.engine.ganzhi import (
+    GAN, ZHI, ELEMENTS, GAN_INDEX, ZHI_INDEX, cycle_index,
+    STEM_COMBINE, STEM_COMBINE_ELEMENT, STEM_CLASH, BRANCH_CLASH, BRANCH_HARMONY, BRANCH_PUNISH
+)
+
+# 六十甲子序号 -> (天干, 地支)
+_CYCLE: Tuple[Tuple[int, int], ...] = tuple((i % 10, i % 12) for i in range(60))
+
+# 一对干支 (行运柱, 原局柱) 之间的作用，(类型, 是否天干, 化出五行, 描述)
+PairEvent = Tuple[str, bool, Optional[str], str]
+
+def _pair_events(t: int, n: int) -> Tuple[PairEvent, ...]:
+    tg, tz = _CYCLE[t]
+    ng, nz = _CYCLE[n]
+    events = []
+    # 1. 天干五合
+    if STEM_COMBINE[tg] == ng:
+        elem = ELEMENTS[STEM_COMBINE_ELEMENT[tg]]
+        events.append(("合", True, elem, f"{GAN[tg]}{GAN[ng]}合化{elem}"))
+    # 2. 地支六合
+    if BRANCH_HARMONY[tz] == nz:
+        events.append(("合", False, None, f"{ZHI[tz]}{ZHI[nz]}六合"))
+    # 3. 地支六冲
+    if BRANCH_CLASH[tz] == nz:
+        events.append(("冲", False, None, f"{ZHI[tz]}{ZHI[nz]}相冲"))
+    # 4. 地支相刑
+    if BRANCH_PUNISH[tz] >> nz & 1:
+        events.append(("刑", False, None, f"{ZHI[tz]}{ZHI[nz]}{'自刑' if tz == nz else '相刑'}"))
+    # 5. 伏吟 (干支全同) / 反吟 (天克地冲)
+    if t == n:
+        events.append(("伏吟", False, None, f"{GAN[tg]}{ZHI[tz]}伏吟"))
+    elif STEM_CLASH[tg] == ng and BRANCH_CLASH[tz] == nz:
+        events.append(("反吟", False, None, f"{GAN[tg]}{ZHI[tz]}与{GAN[ng]}{ZHI[nz]}反吟"))
+    return tuple(events)
+
+# PAIR_TABLE[行运柱序号 * 60 + 原局柱序号] -> 该对干支的全部作用，导入时一次生成 (3600 项)
+PAIR_TABLE: Tuple[Tuple[PairEvent, ...], ...] = tuple(_pair_events(t, n) for t in range(60) for n in range(60))
+
+class TransitYear(BaseModel):
+    year: int
+    age: int                    # 虚岁
+    da_yun: Optional[str] = None  # 起运前及末运之后为空
+    liu_nian: str
+    events: List[Interaction] = []
+
+class TransitTimeline(BaseModel):
+    natal: List[str]            # 原局四柱
+    years: List[TransitYear]
+
+class TransitScanner:
+    """
+    行运扫描：逐年以大运柱、流年柱对原局四柱做合、冲、刑、伏吟、反吟检测。
+    两柱之间的作用只取决于二者的六十甲子序号，全部组合预先算入 PAIR_TABLE，
+    扫描时每一对只查一次表，仅对命中的作用构造 Interaction。
+    """
+
+    SOURCES = ("大运", "流年")
+
+    @staticmethod
+    def scan(natal: Sequence[str], fortune: FortuneData, birth_year: int,
+             start_year: Optional[int] = None, years: int = 100) -> TransitTimeline:
+        """natal 为年月日时四柱干支；默认自出生年起扫描 100 年"""
+        start = birth_year if start_year is None else start_year
+        stem_pos = InteractionDetector.STEM_POSITIONS
+        branch_pos = InteractionDetector.BRANCH_POSITIONS
+        rows = [cycle_index(GAN_INDEX[p[0]], ZHI_INDEX[p[1]]) for p in natal]
+
+        # 1. 各年所行大运 (大运柱序号，-1 表示不在任何大运内)
+        da_yun = [-1] * years
+        da_yun_names = [None] * years
+        for dy in fortune.da_yun:
+            index = cycle_index(GAN_INDEX[dy.gan_zhi[0]], ZHI_INDEX[dy.gan_zhi[1]])
+            for y in range(max(dy.start_year, start), min(dy.start_year + 10, start + years)):
+                da_yun[y - start] = index
+                da_yun_names[y - start] = dy.gan_zhi
+
+        # 2. 逐年查表
+        timeline = []
+        for k in range(years):
+            year = start + k
+            liu_nian = (year - 4) % 60
+            events = []
+            for source, transit in zip(TransitScanner.SOURCES, (da_yun[k], liu_nian)):
+                if transit < 0:
+                    continue
+                base = transit * 60
+                for pos, row in enumerate(rows):
+                    for kind, is_stem, elem, desc in PAIR_TABLE[base + row]:
+                        events.append(Interaction(
+                            type=kind, source=source,
+                            target=stem_pos[pos] if is_stem else branch_pos[pos],
+                            transformed_to=elem, desc=desc
+                        ))
+            timeline.append(TransitYear(
+                year=year, age=year - birth_year + 1, da_yun=da_yun_names[k],
+                liu_nian=GAN[liu_nian % 10] + ZHI[liu_nian % 12], events=events
+            ))
+        return TransitTimeline(natal=list(natal), years=timeline)
+
+    @staticmethod
+    def scan_context(ctx: BaziContext, fortune: Optional[FortuneData] = None,
+                     start_year: Optional[int] = None, years: int = 100) -> TransitTimeline:
+        """由排盘上下文扫描；fortune 缺省时现取大运"""
+        if fortune is None:
+            fortune = FortuneExtractor.extract(ctx)
+        natal = [p.gan_zhi for p in ctx.chart.pillars]
+        return TransitScanner.scan(natal, fortune, ctx.solar.getYear(), start_year, years)
@@ -0,0 +1,262 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from itertools import product
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from src.engine.models import BaziRequest, TimeMode, MonthMode, ZiShiMode
+
+CASES_PATH = "data/regression_test_full.json"
+CACHE_PATH = ".audit_cache.json"
+
+# 逐一尝试的模式组合 (2x2x2 = 8 种)，优先标准模式
+MODES = list(product([TimeMode.MEAN_SOLAR, TimeMode.TRUE_SOLAR],
+                     [MonthMode.SOLAR_TERM, MonthMode.LUNAR_MONTH],
+                     [ZiShiMode.LATE_ZI_IN_DAY, ZiShiMode.NEXT_DAY]))
+
+# 影响排盘结果的数据文件 (与引擎源码一起计入代码指纹)
+ENGINE_DATA = ("data/latlng.json", "data/jieqi_1800_2200.bin", "data/lunar_months_1800_2200.bin",
+               "data/tz_1800_2200.bin")
+
+class CaseResult(BaseModel):
+    name: str
+    key: str                     # 命例内容指纹
+    pillars: List[str]
+    expected_pillars: List[str]
+    flags: str = ""              # 对上四柱所用的非默认模式 (T:真太阳时, M:农历月, N:23点换日)
+    geju: str
+    expected_geju: str
+    strength: str
+    expected_strength: str
+    pillars_ok: bool
+    geju_ok: bool
+    strength_ok: bool
+    seconds: float               # 本例排盘耗时 (命中缓存时为当初的耗时)
+    cached: bool = False
+
+    @property
+    def perfect(self) -> bool:
+        return self.pillars_ok and self.geju_ok and self.strength_ok
+
+    def diffs(self) -> Dict[str, Dict[str, Any]]:
+        """不一致的项：{项: {expected, actual}}"""
+        items = {"pillars": (self.pillars_ok, self.expected_pillars, self.pillars),
+                 "geju": (self.geju_ok, self.expected_geju, self.geju),
+                 "strength": (self.strength_ok, self.expected_strength, self.strength)}
+        return {k: {"expected": e, "actual": a} for k, (ok, e, a) in items.items() if not ok}
+
+def case_key(case: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(case, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+
+def code_hash(root: Optional[str] = None) -> str:
+    """引擎代码指纹：src/engine 下全部源码 + 引擎数据文件 + lunar_python 版本，任一变化则全部命例重跑"""
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256(metadata.version("lunar_python").encode())
+    files = sorted(glob.glob(os.path.join(root, "**", "*.py"), recursive=True))
+    for path in files + [p for p in ENGINE_DATA if os.path.exists(p)]:
+        digest.update(os.path.relpath(path, root).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+_engine = None
+
+def audit_case(case: Dict[str, Any]) -> CaseResult:
+    """
+    单个命例对账：
+    1. 多流派对比只算四柱，找到与命例一致的模式组合 (都不一致时取标准模式)；
+    2. 以该组合完整排盘，四柱精确比对，格局与强弱按关键字模糊匹配。
+    """
+    from src.engine.core import BaziEngine
+    global _engine
+    engine = _engine = _engine or BaziEngine()
+    t0 = time.perf_counter()
+
+    req = BaziRequest(
+        name=case["case_name"],
+        gender=case.get("gender", 1),
+        birth_datetime=case["birth_datetime"],
+        birth_location=case.get("birth_location", "北京")
+    )
+    sweep = engine.arrange_variants(req, modes=MODES, full=False)
+    chosen = sweep.find(case["pillars"])
+    flags = ""
+    if chosen is not None:
+        flags = "".join(f for f, on in (("T", chosen.time_mode == TimeMode.TRUE_SOLAR),
+                                        ("M", chosen.month_mode == MonthMode.LUNAR_MONTH),
+                                        ("N", chosen.zi_shi_mode == ZiShiMode.NEXT_DAY)) if on)
+    else:
+        chosen = sweep.variants[0]
+    res = engine.arrange(req.model_copy(update={
+        "time_mode": chosen.time_mode, "month_mode": chosen.month_mode, "zi_shi_mode": chosen.zi_shi_mode
+    }))
+
+    pillars = [c.gan + c.zhi for c in (res.core.year, res.core.month, res.core.day, res.core.time)]
+    geju, expected_geju = res.geju.name, case["expected_geju"]
+    strength, expected_strength = res.analysis.strength_level, case["expected_strength"]
+    return CaseResult(
+        name=case["case_name"], key=case_key(case),
+        pillars=pillars, expected_pillars=list(case["pillars"]), flags=flags,
+        geju=geju, expected_geju=expected_geju, strength=strength, expected_strength=expected_strength,
+        pillars_ok=pillars == list(case["pillars"]),
+        geju_ok=expected_geju.replace("格", "") in geju or geju.replace("格", "") in expected_geju,
+        strength_ok=expected_strength in strength or strength in expected_strength,
+        seconds=time.perf_counter() - t0
+    )
+
+class AuditCache:
+    """
+    逐例结果缓存 (JSON 文件)：键为 (代码指纹, 命例指纹)。
+    保存时只保留当前代码指纹下的条目，文件不会随版本累积。
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self._data: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}  # 缓存损坏时视为空，全部重跑
+
+    def get(self, code: str, key: str) -> Optional[CaseResult]:
+        entry = self._data.get(code, {}).get(key)
+        return CaseResult(**entry, cached=True) if entry is not None else None
+
+    def save(self, code: str, results: List[CaseResult]):
+        self._data = {code: {r.key: r.model_dump(exclude={"cached"}) for r in results}}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+class AuditReport(BaseModel):
+    code_hash: str
+    total: int
+    pillars_ok: int
+    geju_ok: int
+    strength_ok: int
+    executed: int                # 实际重跑的命例数 (其余命中缓存)
+    elapsed_seconds: float
+    cases: List[CaseResult]
+
+    def accuracy(self) -> Dict[str, float]:
+        n = self.total or 1
+        return {"pillars": self.pillars_ok / n, "geju": self.geju_ok / n, "strength": self.strength_ok / n}
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "code_hash": self.code_hash, "total": self.total, "executed": self.executed,
+            "cached": self.total - self.executed, "elapsed_seconds": self.elapsed_seconds,
+            "accuracy": self.accuracy(),
+            "cases": [dict(c.model_dump(), diffs=c.diffs(), perfect=c.perfect) for c in self.cases]
+        }
+
+    def to_junit(self) -> ET.ElementTree:
+        """每个命例一个 testsuite，四柱、格局、强弱各为一个 testcase；不一致记为 failure"""
+        cases = [(c, item) for c in self.cases for item in ("pillars", "geju", "strength")]
+        failures = sum(1 for c, item in cases if item in c.diffs())
+        root = ET.Element("testsuites", name="supreme_audit", tests=str(len(cases)),
+                          failures=str(failures), time=f"{self.elapsed_seconds:.3f}")
+        for c in self.cases:
+            diffs = c.diffs()
+            suite = ET.SubElement(root, "testsuite", name=c.name, tests="3", failures=str(len(diffs)),
+                                  time=f"{c.seconds:.3f}")
+            for item in ("pillars", "geju", "strength"):
+                case = ET.SubElement(suite, "testcase", classname=c.name, name=item,
+                                     time=f"{c.seconds / 3:.3f}")
+                if item in diffs:
+                    d = diffs[item]
+                    ET.SubElement(case, "failure", message=f"期望 {d['expected']}，实际 {d['actual']}")
+        return ET.ElementTree(root)
+
+def load_cases(path: str = CASES_PATH) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def run_audit(cases: List[Dict[str, Any]], workers: int = 1, cache: Optional[AuditCache] = None) -> AuditReport:
+    """命中缓存的命例直接复用，其余命例分发到进程池；结果按命例原顺序排列"""
+    t0 = time.perf_counter()
+    code = code_hash()
+    results: List[Optional[CaseResult]] = [cache.get(code, case_key(c)) if cache else None for c in cases]
+    pending = [i for i, r in enumerate(results) if r is None]
+
+    if workers <= 1 or len(pending) <= 1:
+        fresh = [audit_case(cases[i]) for i in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(pending) // (workers * 4))
+            fresh = list(pool.map(audit_case, [cases[i] for i in pending], chunksize=chunksize))
+    for i, r in zip(pending, fresh):
+        results[i] = r
+    if cache is not None:
+        cache.save(code, results)
+
+    return AuditReport(
+        code_hash=code, total=len(results),
+        pillars_ok=sum(r.pillars_ok for r in results), geju_ok=sum(r.geju_ok for r in results),
+        strength_ok=sum(r.strength_ok for r in results),
+        executed=len(pending), elapsed_seconds=time.perf_counter() - t0, cases=results
+    )
+
+def print_report(report: AuditReport, table: bool = True):
+    print("\n" + "═"*120)
+    print(f"  八字排盘引擎：终极全流程审计报告 (Supreme Audit)")
+    print("─"*120)
+    if table:
+        print(f"{'命例名称':<10} {'[1] 基础干支对账':<25} | {'[2] 格局定性':<15} | {'[3] 强弱判定':<15} | 状态")
+        print("─"*120)
+        for c in report.cases:
+            # 标注使用了哪些非默认模式 (T:真太阳时, M:农历月, N:23点换日)
+            suffix = f" ({c.flags})" if c.flags else ""
+            p_display = f"{'✅' if c.pillars_ok else '❌'} {' '.join(c.pillars)}{suffix}"
+            g_display = f"{'✅' if c.geju_ok else '⚠️'} {c.geju}"
+            s_display = f"{'✅' if c.strength_ok else '⚠️'} {c.strength}"
+            overall = "🌟 PERFECT" if c.perfect else "🚧 PARTIAL"
+            print(f"{c.name[:10]:<10} {p_display:<25} | {g_display:<15} | {s_display:<15} | {overall}")
+        print("─"*120)
+    n = report.total or 1
+    print(f"  [审计统计结果]")
+    print(f"  > 1. 基础干支准确率: {report.pillars_ok/n*100:.1f}% ({report.pillars_ok}/{report.total})")
+    print(f"  > 2. 格局判定准确率: {report.geju_ok/n*100:.1f}% ({report.geju_ok}/{report.total})")
+    print(f"  > 3. 强弱判定准确率: {report.strength_ok/n*100:.1f}% ({report.strength_ok}/{report.total})")
+    print(f"  > 重跑 {report.executed} 例，缓存 {report.total - report.executed} 例，"
+          f"耗时 {report.elapsed_seconds:.2f} 秒 (代码指纹 {report.code_hash})")
+    print("═"*120 + "\n")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.engine.audit",
+                                     description="回归命例审计：进程池并行，按命例内容与引擎代码指纹增量重跑")
+    parser.add_argument("cases", nargs="?", default=CASES_PATH, help="命例 JSON 文件")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="工作进程数")
+    parser.add_argument("--cache", default=CACHE_PATH, help="逐例结果缓存文件")
+    parser.add_argument("--no-cache", action="store_true", help="忽略缓存，全部重跑")
+    parser.add_argument("--json", help="将报告保存为 JSON")
+    parser.add_argument("--junit", help="将报告保存为 JUnit XML")
+    parser.add_argument("--quiet", action="store_true", help="不打印逐例表格")
+    parser.add_argument("--fail-under", type=float, default=0.0,
+                        help="四柱准确率 (0-1) 低于该值时以非零状态退出")
+    args = parser.parse_args(argv)
+
+    report = run_audit(load_cases(args.cases), args.workers, None if args.no_cache else AuditCache(args.cache))
+    print_report(report, table=not args.quiet)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.to_json(), f, ensure_ascii=False, indent=2)
+    if args.junit:
+        tree = report.to_junit()
+        ET.indent(tree)
+        tree.write(args.junit, encoding="utf-8", xml_declaration=True)
+    # 四柱为精确对账，作为发布门槛；格局与强弱为模糊匹配，只计入准确率
+    return 0 if report.accuracy()["pillars"] >= args.fail_under else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
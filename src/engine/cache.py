@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+from lunar_python import Solar
+from src.engine.models import BaziRequest
+
+class ResultCache:
+    """
+    排盘结果缓存 (内存 LRU)。
+    键只包含真正影响命盘的输入：校正后的公历时刻、性别、月柱模式、子时模式，
+    以及决定输出形态的运程展开范围与追踪级别。
+    姓名不参与；不同地点只要校正后时刻一致即共用同一条目。
+    条目以 JSON 存储，每次命中都重新解析出独立的 BaziResult，调用方修改返回结果不会影响缓存。
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl  # 秒；None 表示永不过期
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(solar: Solar, request: BaziRequest) -> str:
+        # 运程展开范围与追踪级别决定输出形态，同样纳入键
+        return "|".join([
+            solar.toYmdHms(),
+            str(int(request.gender)),
+            request.month_mode.value,
+            request.zi_shi_mode.value,
+            request.fortune_depth.value,
+            str(request.fortune_start_year),
+            str(request.fortune_end_year),
+            request.trace_level.value
+        ])
+
+    def get(self, key: str):
+        from src.engine.core import BaziResult
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return BaziResult.model_validate_json(entry[1])
+
+    def put(self, key: str, result) -> None:
+        payload = result.model_dump_json()
+        with self._lock:
+            self._data[key] = (time.monotonic(), payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self),
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+class SQLiteResultCache(ResultCache):
+    """
+    基于 SQLite 的共享磁盘缓存，多进程 / 多实例可共用同一个文件。
+    结果以 JSON 存储，命中时重新解析为 BaziResult。
+    """
+
+    def __init__(self, path: str, maxsize: int = 100000, ttl: Optional[float] = None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bazi_result ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bazi_result_accessed ON bazi_result(accessed)")
+        # 行数上限只在每 evict_every 次写入后检查一次，写入路径不做 COUNT(*) 全表扫描；
+        # 两次检查之间最多超出 evict_every 行
+        self.evict_every = max(1, min(1024, maxsize // 16))
+        self._puts = 0
+
+    def get(self, key: str):
+        from src.engine.core import BaziResult
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created FROM bazi_result WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM bazi_result WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE bazi_result SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return BaziResult.model_validate_json(row[0])
+
+    def put(self, key: str, result) -> None:
+        payload = result.model_dump_json()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO bazi_result (key, payload, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        # 超出容量时按最近访问时间淘汰：沿 accessed 索引倒序保留 maxsize 行，其余删除
+        self._conn.execute(
+            "DELETE FROM bazi_result WHERE key IN "
+            "(SELECT key FROM bazi_result ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.maxsize,)
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM bazi_result")
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM bazi_result").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+from lunar_python import Solar, Lunar, EightChar
+from lunar_python.util import LunarUtil
+from src.engine.models import ZiShiMode
+from src.engine.jieqi import get_table, solar_to_seconds, seconds_to_solar
+from src.engine.ganzhi import GAN, ZHI, GAN_INDEX, ZHI_INDEX, SHI_SHEN, SHI_SHEN_TABLE, DI_SHI, DI_SHI_TABLE
+
+@dataclass(frozen=True)
+class Pillar:
+    """单柱快照：干支及其派生信息"""
+    gan: str
+    zhi: str
+    hide_gan: Tuple[str, ...]
+    shi_shen_gan: str
+    shi_shen_zhi: Tuple[str, ...]
+    na_yin: str
+    xun_kong: str
+    di_shi: str  # 日干在本柱地支的十二长生
+    # 整数编码 (见 ganzhi.py)，供算法模块查表
+    g: int = -1
+    z: int = -1
+    hide: Tuple[int, ...] = ()
+
+    @property
+    def gan_zhi(self) -> str:
+        return self.gan + self.zhi
+
+def _pillar(gan, zhi, hide_gan, shi_shen_gan, shi_shen_zhi, na_yin, xun_kong, di_shi) -> Pillar:
+    # 输入边界：汉字干支在这里一次性编码为整数
+    return Pillar(
+        gan, zhi, tuple(hide_gan), shi_shen_gan, tuple(shi_shen_zhi), na_yin, xun_kong, di_shi,
+        GAN_INDEX[gan], ZHI_INDEX[zhi], tuple(GAN_INDEX[h] for h in hide_gan)
+    )
+
+@lru_cache(maxsize=None)
+def _pillar_of(cycle: int, day_g: int, is_day: bool) -> Pillar:
+    # 由六十甲子序号与日干直接派生单柱，与 EightChar 的取值口径一致 (日柱天干十神记为"日主")
+    g, z = cycle % 10, cycle % 12
+    gan, zhi = GAN[g], ZHI[z]
+    hide_gan = LunarUtil.ZHI_HIDE_GAN[zhi]
+    return _pillar(
+        gan, zhi, hide_gan,
+        "日主" if is_day else SHI_SHEN[SHI_SHEN_TABLE[day_g][g]],
+        [SHI_SHEN[SHI_SHEN_TABLE[day_g][GAN_INDEX[h]]] for h in hide_gan],
+        LunarUtil.NAYIN[gan + zhi], LunarUtil.getXunKong(gan + zhi), DI_SHI[DI_SHI_TABLE[day_g][z]]
+    )
+
+@dataclass(frozen=True)
+class JieMoment:
+    """交节时刻 (节)"""
+    name: str
+    solar: Solar
+    seconds: int  # 见 jieqi.solar_to_seconds
+
+@dataclass(frozen=True)
+class ChartSnapshot:
+    """
+    命盘快照：每个请求只做一次 Solar -> Lunar -> EightChar 换算，
+    各提取器与算法模块统一从这里读取四柱数据，不再重复推导。
+    """
+    year: Pillar
+    month: Pillar
+    day: Pillar
+    time: Pillar
+    prev_jie: JieMoment
+    next_jie: JieMoment
+    lunar: Lunar
+    eight_char: EightChar
+
+    @property
+    def pillars(self) -> Tuple[Pillar, Pillar, Pillar, Pillar]:
+        return (self.year, self.month, self.day, self.time)
+
+    @property
+    def day_gan(self) -> str:
+        return self.day.gan
+
+    @property
+    def month_zhi(self) -> str:
+        return self.month.zhi
+
+    @staticmethod
+    def build(solar: Solar, zi_shi_mode: ZiShiMode, lunar: Optional[Lunar] = None,
+              near_jie: Optional[Tuple[JieMoment, JieMoment]] = None) -> "ChartSnapshot":
+        """
+        lunar / near_jie 可由调用方传入以便在多种子时流派间共用；
+        EightChar 每次新建，因为 setSect 会修改对象而 Lunar.getEightChar() 返回的是缓存实例。
+        """
+        lunar = lunar or solar.getLunar()
+        eight_char = EightChar.fromLunar(lunar)
+        # 子时流派：1 = 23点换日, 2 = 晚子时不换日
+        eight_char.setSect(1 if zi_shi_mode == ZiShiMode.NEXT_DAY else 2)
+
+        ec = eight_char
+        prev_jie, next_jie = near_jie or ChartSnapshot.near_jie(solar, lunar)
+        return ChartSnapshot(
+            year=_pillar(
+                ec.getYearGan(), ec.getYearZhi(), ec.getYearHideGan(),
+                ec.getYearShiShenGan(), ec.getYearShiShenZhi(),
+                ec.getYearNaYin(), ec.getYearXunKong(), ec.getYearDiShi()
+            ),
+            month=_pillar(
+                ec.getMonthGan(), ec.getMonthZhi(), ec.getMonthHideGan(),
+                ec.getMonthShiShenGan(), ec.getMonthShiShenZhi(),
+                ec.getMonthNaYin(), ec.getMonthXunKong(), ec.getMonthDiShi()
+            ),
+            day=_pillar(
+                ec.getDayGan(), ec.getDayZhi(), ec.getDayHideGan(),
+                ec.getDayShiShenGan(), ec.getDayShiShenZhi(),
+                ec.getDayNaYin(), ec.getDayXunKong(), ec.getDayDiShi()
+            ),
+            time=_pillar(
+                ec.getTimeGan(), ec.getTimeZhi(), ec.getTimeHideGan(),
+                ec.getTimeShiShenGan(), ec.getTimeShiShenZhi(),
+                ec.getTimeNaYin(), ec.getTimeXunKong(), ec.getTimeDiShi()
+            ),
+            prev_jie=prev_jie,
+            next_jie=next_jie,
+            lunar=lunar,
+            eight_char=eight_char
+        )
+
+    @staticmethod
+    def from_cycles(year: int, month: int, day: int, time: int) -> "ChartSnapshot":
+        """
+        仅由四柱六十甲子序号构建的快照，不含交节时刻与农历 (prev_jie / next_jie / lunar / eight_char 为 None)，
+        供只读取四柱的算法模块 (五行能量、干支作用、格局、强弱、神煞) 批量评估候选时辰。
+        """
+        day_g = day % 10
+        return ChartSnapshot(
+            year=_pillar_of(year, day_g, False),
+            month=_pillar_of(month, day_g, False),
+            day=_pillar_of(day, day_g, True),
+            time=_pillar_of(time, day_g, False),
+            prev_jie=None,
+            next_jie=None,
+            lunar=None,
+            eight_char=None
+        )
+
+    @staticmethod
+    def near_jie(solar: Solar, lunar: Lunar) -> Tuple[JieMoment, JieMoment]:
+        """前后两个节：优先查预计算表，超出表范围时回退到 lunar_python"""
+        table = get_table()
+        near = table.prev_next(solar_to_seconds(solar)) if table else None
+        if near:
+            (prev_name, prev_ts), (next_name, next_ts) = near
+            return (
+                JieMoment(prev_name, seconds_to_solar(prev_ts), prev_ts),
+                JieMoment(next_name, seconds_to_solar(next_ts), next_ts)
+            )
+        prev_jie = lunar.getPrevJie()
+        next_jie = lunar.getNextJie()
+        return (
+            JieMoment(prev_jie.getName(), prev_jie.getSolar(), solar_to_seconds(prev_jie.getSolar())),
+            JieMoment(next_jie.getName(), next_jie.getSolar(), solar_to_seconds(next_jie.getSolar()))
+        )
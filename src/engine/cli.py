@@ -0,0 +1,241 @@
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+from typing import IO, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from src.engine import serialize
+from src.engine.core import BaziEngine, BatchItem
+from src.engine.models import BaziRequest
+
+# CSV 输出列 (pillars 投影展平)
+CSV_COLUMNS = ("index", "name", "birth_solar_datetime", "birth_lunar_datetime",
+               "year", "month", "day", "time", "error")
+
+Record = Tuple[int, Optional[BaziRequest], Optional[str]]  # (输入偏移, 请求, 解析错误)
+
+def read_ndjson(stream: IO[str], start: int = 0) -> Iterator[Record]:
+    """逐行读取 NDJSON，空行不计入偏移；单行解析失败只记录错误"""
+    lines = (line for line in stream if line.strip())
+    for offset, line in enumerate(islice(lines, start, None), start):
+        try:
+            yield offset, BaziRequest.model_validate_json(line), None
+        except ValidationError as e:
+            yield offset, None, _validation_message(e)
+
+def read_csv(stream: IO[str], start: int = 0) -> Iterator[Record]:
+    """逐行读取带表头的 CSV，列名即 BaziRequest 字段名，空单元格取默认值"""
+    reader = csv.DictReader(stream)
+    for offset, row in enumerate(islice(reader, start, None), start):
+        data = {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip()}
+        try:
+            yield offset, BaziRequest.model_validate(data), None
+        except ValidationError as e:
+            yield offset, None, _validation_message(e)
+
+def _validation_message(e: ValidationError) -> str:
+    details = "; ".join(f"{'.'.join(str(p) for p in err['loc']) or '-'}: {err['msg']}" for err in e.errors())
+    return f"ValidationError: {details}"
+
+def arrange_stream(engine: BaziEngine, records: Iterator[Record], workers: int = 1,
+                   chunksize: int = 64, max_buffered: Optional[int] = None) -> Iterator[Tuple[int, BatchItem]]:
+    """
+    按输入顺序产出 (输入偏移, BatchItem)。解析失败的记录在排在它之前的合法请求都产出后立即产出。
+    单进程时逐条排盘；多进程时合法请求交给 iter_arrange 流式排盘，已读入未产出的记录
+    (在途请求 + 其间的错误项) 不超过 max_buffered 条，达到上限时先排空在途分块、产出错误项再继续读入，
+    因此大段无效输入也不会无限缓冲。各段共用同一个进程池，工作进程只启动、预热一次。
+    """
+    if workers <= 1:
+        for offset, request, error in records:
+            if error is not None:
+                yield offset, BatchItem(index=offset, error=error)
+            else:
+                item = next(engine.iter_arrange([request], workers=1))
+                yield offset, item.model_copy(update={"index": offset})
+        return
+
+    max_buffered = max_buffered or max(4096, workers * 4 * chunksize)
+    records = iter(records)
+    order = deque()
+    exhausted = False
+
+    def valid() -> Iterator[BaziRequest]:
+        nonlocal exhausted
+        while len(order) < max_buffered:
+            record = next(records, None)
+            if record is None:
+                exhausted = True
+                return
+            offset, request, error = record
+            order.append((offset, error))
+            if error is None:
+                yield request
+
+    # 进程池在首次提交时才启动工作进程；全部无效的输入不会拉起进程
+    with engine.process_pool(workers) as pool:
+        while not exhausted:
+            # 每一段输入对应一次 iter_arrange，共用同一个进程池
+            for item in engine.iter_arrange(valid(), workers=workers, chunksize=chunksize, executor=pool):
+                offset, error = order.popleft()
+                while error is not None:
+                    yield offset, BatchItem(index=offset, error=error)
+                    offset, error = order.popleft()
+                yield offset, item.model_copy(update={"index": offset})
+            while order:
+                offset, error = order.popleft()
+                yield offset, BatchItem(index=offset, error=error)
+
+class NdjsonWriter:
+    def __init__(self, stream: IO[bytes], view: str):
+        self.stream = stream
+        self.view = view
+
+    def write(self, item: BatchItem):
+        self.stream.write(serialize.dumps_item(item, "json", self.view) + b"\n")
+
+    def finish(self):
+        self.stream.flush()
+
+class CsvWriter:
+    def __init__(self, stream: IO[bytes], header: bool = True):
+        self.text = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=True)
+        self.writer = csv.writer(self.text)
+        if header:
+            self.writer.writerow(CSV_COLUMNS)
+
+    def write(self, item: BatchItem):
+        # 错误信息压成单行，保证一条记录一行 (续跑按行计数)
+        row = {"index": item.index, "error": " ".join((item.error or "").split())}
+        if item.result is not None:
+            data = serialize.pillars_view(item.result)
+            row.update(data["pillars"])
+            row.update({k: data[k] for k in ("name", "birth_solar_datetime", "birth_lunar_datetime")})
+        self.writer.writerow([row.get(c, "") for c in CSV_COLUMNS])
+
+    def finish(self):
+        # 解除包装，避免关闭底层的标准输出
+        self.text.flush()
+        self.text.detach()
+
+def completed_records(path: str, fmt: str, block: int = 1 << 20) -> int:
+    """
+    续跑：分块统计已有输出中的完整记录数 (输出与输入顺序一致，即已完成的输入条数)，
+    并截掉中断时写了一半的末行。
+    """
+    if not os.path.exists(path):
+        return 0
+    lines, complete, pos = 0, 0, 0
+    with open(path, "rb+") as f:
+        while True:
+            chunk = f.read(block)
+            if not chunk:
+                break
+            lines += chunk.count(b"\n")
+            last = chunk.rfind(b"\n")
+            if last >= 0:
+                complete = pos + last + 1
+            pos += len(chunk)
+        if complete < pos:
+            f.truncate(complete)
+    if fmt == "csv":
+        # CsvWriter 保证单元格内没有换行，减去表头
+        lines = max(lines - 1, 0)
+    return lines
+
+class Progress:
+    """进度报告：按时间间隔输出到 stderr"""
+
+    def __init__(self, every: float, stream: IO[str] = sys.stderr, start: int = 0):
+        self.every = every
+        self.stream = stream
+        self.start = start
+        self.done = 0
+        self.failed = 0
+        self._t0 = time.monotonic()
+        self._last = self._t0
+
+    def update(self, item: BatchItem):
+        self.done += 1
+        if item.error is not None:
+            self.failed += 1
+        if self.every > 0:
+            now = time.monotonic()
+            if now - self._last >= self.every:
+                self._last = now
+                self.report(now)
+
+    def report(self, now: Optional[float] = None):
+        elapsed = (now or time.monotonic()) - self._t0
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        self.stream.write(f"已处理 {self.done} 条 (偏移 {self.start + self.done}，失败 {self.failed})，"
+                          f"{rate:.1f} 条/秒\n")
+        self.stream.flush()
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.engine",
+        description="流式批量排盘：从 NDJSON / CSV 读取 BaziRequest，按输入顺序逐条输出结果"
+    )
+    parser.add_argument("input", nargs="?", default="-", help="输入文件，缺省或 - 为标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出文件，缺省或 - 为标准输出")
+    parser.add_argument("--input-format", choices=("ndjson", "csv"), help="输入格式，缺省按扩展名判断 (标准输入为 ndjson)")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson", help="输出格式")
+    parser.add_argument("--view", choices=serialize.VIEWS, default="pillars",
+                        help="结果投影：pillars 仅四柱 (默认)，full 为完整 BaziResult (仅 ndjson)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="工作进程数，1 为单进程")
+    parser.add_argument("--chunksize", type=int, default=64, help="每次派发给工作进程的请求数")
+    parser.add_argument("--start", type=int, default=0, help="从第 N 条输入记录开始 (0 起)")
+    parser.add_argument("--limit", type=int, help="最多处理的记录数")
+    parser.add_argument("--resume", action="store_true",
+                        help="跳过已有输出文件中已完成的记录数并追加 (需要 --output 指向文件，与首次运行的 --start 一致)")
+    parser.add_argument("--progress", type=float, default=5.0, help="进度报告间隔秒数，0 为关闭")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.format == "csv" and args.view != "pillars":
+        print("CSV 输出仅支持 pillars 投影", file=sys.stderr)
+        return 2
+    if args.resume and args.output == "-":
+        print("--resume 需要 --output 指向文件", file=sys.stderr)
+        return 2
+
+    input_format = args.input_format
+    if input_format is None:
+        input_format = "csv" if args.input.lower().endswith(".csv") else "ndjson"
+
+    # 1. 续跑：输出与输入顺序一致，已有完整记录数即已完成的输入条数
+    start = args.start
+    append = False
+    if args.resume:
+        start += completed_records(args.output, args.format)
+        append = os.path.exists(args.output) and os.path.getsize(args.output) > 0
+
+    # 2. 流式读取 (不整体载入内存)
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8-sig", newline="")
+    sink = sys.stdout.buffer if args.output == "-" else open(args.output, "ab" if append else "wb")
+    try:
+        read = read_csv if input_format == "csv" else read_ndjson
+        records = read(source, start)
+        if args.limit is not None:
+            records = islice(records, args.limit)
+
+        writer = CsvWriter(sink, header=not append) if args.format == "csv" else NdjsonWriter(sink, args.view)
+        progress = Progress(args.progress, start=start)
+        engine = BaziEngine()
+        for _, item in arrange_stream(engine, records, workers=args.workers, chunksize=args.chunksize):
+            writer.write(item)
+            progress.update(item)
+        writer.finish()
+        if args.progress > 0:
+            progress.report()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout.buffer:
+            sink.close()
+    return 0
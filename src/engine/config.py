@@ -1,54 +1,52 @@
 import json
-import os
-from typing import Dict, Any, Optional
+from typing import Dict, Optional
+from src.engine.location import LocationIndex, Location
+from src.engine.timezone import OffsetResolver, TzDatabase
 
 class BaziConfig:
-    def __init__(self, config_path: str = "data/latlng.json"):
+    def __init__(self, config_path: str = "data/latlng.json", index_path: Optional[str] = None,
+                 tz_resolver: Optional[OffsetResolver] = None):
         self.config_path = config_path
-        self.flat_latlng: Dict[str, float] = {}
-        self._load_config()
+        self.index_path = index_path
+        self._index: Optional[LocationIndex] = None
+        # 时制解析器：出生地墙钟 -> UTC 偏移与夏令时，可替换为自定义实现
+        self.time_zones: OffsetResolver = tz_resolver or TzDatabase()
 
-    def _load_config(self):
-        if not os.path.exists(self.config_path):
-            return
-
-        with open(self.config_path, "r", encoding="utf-8") as f:
+    @property
+    def locations(self) -> LocationIndex:
+        """地名索引，首次使用时才加载 (优先读取预构建的 data/latlng.idx)"""
+        if self._index is None:
             try:
-                data = json.load(f)
-                self._flatten_data(data)
+                self._index = LocationIndex.open(self.config_path, self.index_path)
             except json.JSONDecodeError:
-                pass
+                self._index = LocationIndex.empty()
+        return self._index
+
+    @property
+    def flat_latlng(self) -> Dict[str, float]:
+        """兼容旧接口：简称 -> 经度"""
+        index = self.locations
+        flat = {}
+        for path, lon in zip(index.paths, index.longitudes):
+            flat.setdefault(path.rsplit("/", 1)[-1], lon)
+        return flat
 
-    def _flatten_data(self, item: Any):
+    def get_location(self, location: str, strict: bool = False) -> Optional[Location]:
         """
-        递归地将树形结构的城市数据扁平化。
-        注意：观察 data/latlng.json 发现 'lat' 字段存的是经度 (116.40...)，
-        'lng' 字段存的是纬度 (39.90...)。我们需要经度进行真太阳时校正。
+        根据地名获取地点 (经度、纬度)。
+        支持完整路径 ("广东省/深圳市/南山区"、"广东/深圳/南山") 与简称 ("深圳市"、"深圳")；
+        同名地点取层级最浅的一个；最浅一级仍有多个 (如 "南山区") 时，
+        strict 抛出 AmbiguousLocation，否则取数据文件中最靠前的一个。
         """
-        if isinstance(item, dict):
-            name = item.get("name")
-            # 这里的 'lat' 实际上存储的是经度数据（如北京 116.40）
-            lon_str = item.get("lat")
-            if name and lon_str:
-                try:
-                    self.flat_latlng[name] = float(lon_str)
-                except ValueError:
-                    pass
-            
-            # 递归处理子节点
-            children = item.get("children", [])
-            for child in children:
-                self._flatten_data(child)
-        elif isinstance(item, list):
-            for sub_item in item:
-                self._flatten_data(sub_item)
+        return self.locations.get(location, strict)
 
     def get_longitude(self, location: str) -> float:
         """
         根据地名获取经度。
         若找不到，则返回东八区基准 120.0
         """
-        return self.flat_latlng.get(location, 120.0)
+        loc = self.get_location(location)
+        return loc.longitude if loc else 120.0
 
 # 创建默认配置实例
-config = BaziConfig()
\ No newline at end of file
+config = BaziConfig()
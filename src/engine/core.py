@@ -1,17 +1,27 @@
-from typing import List, Dict, Optional
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice, product
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
 from pydantic import BaseModel, Field
 from datetime import datetime
-from src.engine.models import BaziRequest, TraceStep
-from src.engine.preprocessor import Preprocessor, BaziContext
-from src.engine.utils import Tracer
+from src.engine.models import BaziRequest, TraceStep, TraceLevel, StageTiming, TimeMode, MonthMode, ZiShiMode, FortuneDepth
+from src.engine.preprocessor import Preprocessor
+from src.engine.chart import ChartSnapshot
+from src.engine.jieqi import seconds_to_solar, get_table
+from src.engine import serialize
+from src.engine.utils import Tracer, NULL_TRACER, StageTimer, NULL_TIMER, MetricsHook, strip_zodiac
+from src.engine.cache import ResultCache
 from src.engine.extractor import (
     CoreExtractor, FortuneExtractor, AuxiliaryExtractor, 
     CoreChart, FortuneData, AuxiliaryChart
 )
-from src.engine.algorithms.interactions import Interaction
-from src.engine.algorithms.geju import GejuResult
-from src.engine.algorithms.analysis import AnalysisResult
-from src.engine.algorithms.stars import Star
+from src.engine.algorithms.command import MonthCommandExtractor
+from src.engine.algorithms.energy import EnergyModel
+from src.engine.algorithms.interactions import Interaction, InteractionDetector
+from src.engine.algorithms.geju import GejuResult, GejuAnalyzer
+from src.engine.algorithms.analysis import AnalysisResult, AnalysisEngine
+from src.engine.algorithms.stars import Star, StarDetector
 
 # 补救 1.1.3: 环境快照
 class EnvironmentSnapshot(BaseModel):
@@ -42,74 +52,323 @@ class BaziResult(BaseModel):
     geju: Optional[GejuResult] = None # 格局判定
     analysis: Optional[AnalysisResult] = None # 强弱喜用判定
     stars: List[Star] = [] # 专业神煞
+    timings: Optional[Dict[str, StageTiming]] = None # 各阶段耗时 (request.collect_timings 为 true 时)
+
+# 批量排盘的单项结果：成功时 result 有值，失败时 error 记录原因，互不影响
+class BatchItem(BaseModel):
+    index: int  # 在输入序列中的位置
+    result: Optional[BaziResult] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+PILLAR_NAMES = ("year", "month", "day", "time")
+
+# 多流派对比的单项：该模式组合下的四柱，以及相对首个组合发生变化的柱
+class VariantResult(BaseModel):
+    time_mode: TimeMode
+    month_mode: MonthMode
+    zi_shi_mode: ZiShiMode
+    birth_solar_datetime: str  # 该模式下校正后的公历时刻
+    pillars: List[str]  # [年, 月, 日, 时] 干支
+    changed: List[str] = []  # 与首个组合相比不同的柱 (year/month/day/time)
+    result: Optional[BaziResult] = None  # full=True 时附带完整排盘
+
+class VariantSweep(BaseModel):
+    variants: List[VariantResult]
+    varying: List[str] = []  # 在任意组合间存在差异的柱
+
+    def find(self, pillars: List[str]) -> Optional[VariantResult]:
+        """按顺序返回第一个四柱完全一致的组合"""
+        for variant in self.variants:
+            if variant.pillars == list(pillars):
+                return variant
+        return None
+
+# 预热用样例：展开到流日、记录完整推导，尽量覆盖全部代码路径
+WARM_UP_REQUEST = BaziRequest(
+    name="预热", birth_datetime="1990-05-01 12:00:00", birth_location="北京",
+    fortune_depth=FortuneDepth.LIU_RI, fortune_start_year=2020, fortune_end_year=2020
+)
+
+# --- 批量排盘：进程池工作端 ---
+_worker_engine: Optional["BaziEngine"] = None
+
+def _init_worker(config_obj):
+    global _worker_engine
+    _worker_engine = BaziEngine(config_obj)
+    _worker_engine.warm_up()
+
+def _arrange_chunk(chunk: List[Tuple[int, BaziRequest]]) -> List[BatchItem]:
+    engine = _worker_engine or BaziEngine()
+    return [engine._arrange_item(index, request) for index, request in chunk]
 
 class BaziEngine:
-    def __init__(self):
-        self.preprocessor = Preprocessor()
+    def __init__(self, config_obj=None, cache: Optional[ResultCache] = None,
+                 metrics: Optional[MetricsHook] = None):
+        self.preprocessor = Preprocessor(config_obj)
+        self.cache = cache  # 可选的结果缓存 (ResultCache / SQLiteResultCache)
+        self.metrics = metrics  # 可选的阶段指标钩子，如 StageMetrics 或 Prometheus 导出器
+        self.warmed = False
+
+    def warm_up(self, sample: Optional[BaziRequest] = None) -> Dict[str, StageTiming]:
+        """
+        预热：加载地名索引、节气表与时区表，并完整排一次样例盘 (不经过缓存、不上报指标)，
+        让 lunar_python 的内部表、pydantic 校验 / 序列化路径在首个真实请求之前就绪。
+        返回各步骤耗时；进程池工作进程启动时会自动调用。
+        """
+        timer = StageTimer()
+        config = self.preprocessor.config
+
+        # 1. 配置与数据表
+        if hasattr(config, "locations"):
+            config.locations
+        timer.lap("config")
+        get_table()
+        getattr(getattr(config, "time_zones", None), "table", None)
+        timer.lap("tables")
+
+        # 2. 样例排盘：覆盖历法换算、各提取器与算法模块
+        request = sample or WARM_UP_REQUEST
+        solar, longitude = self.preprocessor.correct(request)
+        result = self._arrange(request, solar, longitude)
+        timer.lap("pipeline")
+
+        # 3. 序列化路径
+        serialize.dumps(result)
+        serialize.dumps(result, view="pillars")
+        timer.lap("serialize")
+
+        self.warmed = True
+        return timer.get_timings()
+
+    def _arrange_item(self, index: int, request: BaziRequest) -> BatchItem:
+        try:
+            return BatchItem(index=index, result=self.arrange(request))
+        except Exception as e:
+            return BatchItem(index=index, error=f"{type(e).__name__}: {e}")
+
+    def process_pool(self, workers: int) -> ProcessPoolExecutor:
+        """按本引擎配置初始化 (并预热) 工作进程的进程池"""
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(self.preprocessor.config,))
+
+    def iter_arrange(self, requests: Iterable[BaziRequest], workers: Optional[int] = None,
+                     chunksize: int = 64, executor: Optional[Executor] = None) -> Iterator[BatchItem]:
+        """
+        流式批量排盘：按输入顺序逐项产出 BatchItem。
+        workers <= 1 时在当前进程内执行；否则按 chunksize 分块派发到进程池，
+        在途分块数量有上限，输入可以是任意长度的迭代器。
+        传入 executor 时复用该进程池 (由调用方负责关闭)，多次调用不必重复启动、预热工作进程。
+        """
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        indexed = enumerate(requests)
+
+        if workers <= 1:
+            for index, request in indexed:
+                yield self._arrange_item(index, request)
+            return
+
+        if executor is not None:
+            yield from self._iter_pool(executor, indexed, workers * 2, chunksize)
+            return
+        with self.process_pool(workers) as pool:
+            yield from self._iter_pool(pool, indexed, workers * 2, chunksize)
+
+    @staticmethod
+    def _iter_pool(pool: Executor, indexed: Iterator[Tuple[int, BaziRequest]],
+                   max_pending: int, chunksize: int) -> Iterator[BatchItem]:
+        pending = deque()
+        while True:
+            while len(pending) < max_pending:
+                chunk = list(islice(indexed, chunksize))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_arrange_chunk, chunk))
+            if not pending:
+                break
+            yield from pending.popleft().result()
+
+    def arrange_many(self, requests: Iterable[BaziRequest], workers: Optional[int] = None,
+                     chunksize: int = 64) -> List[BatchItem]:
+        """批量排盘：结果与输入顺序一致，单项失败只记录在对应的 BatchItem 中"""
+        return list(self.iter_arrange(requests, workers=workers, chunksize=chunksize))
 
     def arrange(self, request: BaziRequest) -> BaziResult:
-        tracer = Tracer()
+        # 既不需要附带耗时也没有指标钩子时使用空计时器，不读取时钟
+        if request.collect_timings or self.metrics is not None:
+            timer = StageTimer(self.metrics)
+        else:
+            timer = NULL_TIMER
+
+        solar, longitude = self.preprocessor.correct(request)
+        timer.lap("preprocess")
+        return self._arrange_cached(request, solar, longitude, timer)
+
+    def arrange_variants(self, request: BaziRequest,
+                         modes: Optional[Iterable[Tuple[TimeMode, MonthMode, ZiShiMode]]] = None,
+                         full: bool = True) -> VariantSweep:
+        """
+        多流派对比：对同一请求按多种 (时间模式, 月柱模式, 子时模式) 组合排盘。
+        历法换算、夏令时与经度只算一次；真太阳时、农历换算与节气查找按时间模式各算一次；
+        八字按子时流派分支；月柱模式只影响月柱。
+        modes 缺省为全部 8 种组合；full=False 时只返回四柱，不跑完整分析流程。
+        """
+        modes = list(modes) if modes is not None else list(product(TimeMode, MonthMode, ZiShiMode))
+        pre = self.preprocessor
+
+        # 1. 共享部分：历法换算、夏令时、经度
+        base, standard_offset = pre.base_seconds(request)
+        longitude = pre.longitude(request, standard_offset,
+                                  strict=any(mode[0] == TimeMode.TRUE_SOLAR for mode in modes))
+
+        by_time: Dict[TimeMode, tuple] = {}
+        charts: Dict[Tuple[TimeMode, ZiShiMode], ChartSnapshot] = {}
+        lunar_months: Dict[TimeMode, Optional[str]] = {}
+        variants: List[VariantResult] = []
+        for time_mode, month_mode, zi_shi_mode in modes:
+            # 2. 按时间模式分支：校正时刻、农历与前后节
+            if time_mode not in by_time:
+                solar = seconds_to_solar(pre.apply_time_mode(base, standard_offset, longitude, time_mode))
+                lunar = solar.getLunar()
+                by_time[time_mode] = (solar, lunar, ChartSnapshot.near_jie(solar, lunar))
+            solar, lunar, near_jie = by_time[time_mode]
+
+            # 3. 按子时流派分支：四柱快照
+            chart = charts.get((time_mode, zi_shi_mode))
+            if chart is None:
+                chart = ChartSnapshot.build(solar, zi_shi_mode, lunar, near_jie)
+                charts[(time_mode, zi_shi_mode)] = chart
+
+            # 4. 月柱模式：只替换月柱
+            month = chart.month.gan_zhi
+            if month_mode == MonthMode.LUNAR_MONTH:
+                if time_mode not in lunar_months:
+                    lunar_months[time_mode] = CoreExtractor.lunar_month_gan_zhi(lunar)
+                month = lunar_months[time_mode] or month
+
+            result = None
+            if full:
+                variant_request = request.model_copy(update={
+                    "time_mode": time_mode, "month_mode": month_mode, "zi_shi_mode": zi_shi_mode
+                })
+                result = self._arrange_cached(variant_request, solar, longitude, chart=chart)
+
+            variants.append(VariantResult(
+                time_mode=time_mode,
+                month_mode=month_mode,
+                zi_shi_mode=zi_shi_mode,
+                birth_solar_datetime=solar.toYmdHms(),
+                pillars=[chart.year.gan_zhi, month, chart.day.gan_zhi, chart.time.gan_zhi],
+                result=result
+            ))
+
+        # 5. 差异：相对首个组合逐柱比较
+        varying = set()
+        if variants:
+            first = variants[0].pillars
+            for variant in variants[1:]:
+                variant.changed = [name for name, a, b in zip(PILLAR_NAMES, first, variant.pillars) if a != b]
+                varying.update(variant.changed)
+        return VariantSweep(variants=variants, varying=[name for name in PILLAR_NAMES if name in varying])
+
+    def _arrange_cached(self, request: BaziRequest, solar, longitude: float,
+                        timer: StageTimer = NULL_TIMER, chart: Optional[ChartSnapshot] = None) -> BaziResult:
+        if self.cache is None:
+            return self._arrange(request, solar, longitude, timer, chart)
+
+        key = ResultCache.make_key(solar, request)
+        cached = self.cache.get(key)
+        timer.lap("cache")
+        if cached is not None:
+            return self._rebind(cached, request, timer)
+        result = self._arrange(request, solar, longitude, timer, chart)
+        self.cache.put(key, result)
+        timer.lap("cache")
+        return result
+
+    @staticmethod
+    def _rebind(cached: BaziResult, request: BaziRequest, timer: StageTimer = NULL_TIMER) -> BaziResult:
+        """缓存命中：命盘部分复用，请求相关字段换成本次请求"""
+        trace = list(cached.analysis_trace)
+        if trace and trace[0].module == "预处理":
+            trace[0] = TraceStep(module="预处理", desc=f"开始处理 {request.name} 的请求")
+        return cached.model_copy(update={
+            "environment": EnvironmentSnapshot(original_request=request),
+            "request": request,
+            "analysis_trace": trace,
+            "timings": timer.get_timings() if request.collect_timings else None
+        })
+
+    def _arrange(self, request: BaziRequest, solar, longitude: float,
+                 timer: StageTimer = NULL_TIMER, chart: Optional[ChartSnapshot] = None) -> BaziResult:
+        # tracer 记录阶段概要；detail 传给各算法模块记录推导细节
+        level = request.trace_level
+        tracer = NULL_TRACER if level == TraceLevel.OFF else Tracer()
+        detail = tracer if level == TraceLevel.FULL else NULL_TRACER
         
         # 1. 预处理
-        tracer.record("预处理", f"开始处理 {request.name} 的请求")
-        ctx = self.preprocessor.process(request)
-        tracer.record("预处理", f"时间校正完成: {ctx.solar.toFullString()}")
+        if tracer:
+            tracer.record("预处理", f"开始处理 {request.name} 的请求")
+        ctx = self.preprocessor.build_context(request, solar, longitude, chart)
+        timer.lap("context")
+        if tracer:
+            tracer.record("预处理", f"时间校正完成: {ctx.solar.toFullString()}")
         
         # 2. 提取数据
         core_chart = CoreExtractor.extract(ctx)
+        timer.lap("core")
         tracer.record("核心命盘", "四柱提取完成")
         
         fortune_data = FortuneExtractor.extract(ctx)
+        timer.lap("fortune")
         tracer.record("动态运程", "起运时间与大运计算完成")
         
         auxiliary_chart = AuxiliaryExtractor.extract(ctx)
+        timer.lap("auxiliary")
         tracer.record("辅助命盘", "胎元、命宫等神煞计算完成")
         
         # 3. 深度分析 (Phase 3)
         # 3.1 月令分司
-        from src.engine.algorithms.command import MonthCommandExtractor
-        cmd_gan, cmd_detail = MonthCommandExtractor.get_command(ctx, tracer)
+        cmd_gan, cmd_detail = MonthCommandExtractor.get_command(ctx, detail)
         month_command = MonthCommandResult(current=cmd_gan, detail=cmd_detail)
+        timer.lap("month_command")
         
         # 3.2 五行能量评分
-        from src.engine.algorithms.energy import EnergyModel
-        energy_data = EnergyModel.calculate_scores(ctx, tracer)
+        energy_data = EnergyModel.calculate_scores(ctx, detail)
         five_elements = FiveElementsResult(
             scores={k: v["score"] for k, v in energy_data.items()},
             states={k: v["state"] for k, v in energy_data.items()}
         )
+        timer.lap("energy")
         
         # 3.3 干支作用关系
-        from src.engine.algorithms.interactions import InteractionDetector
-        interactions = InteractionDetector.detect_all(ctx, tracer)
-        InteractionDetector.validate_transformations(interactions, ctx, tracer)
+        interactions = InteractionDetector.detect_all(ctx, detail)
+        InteractionDetector.validate_transformations(interactions, ctx, detail)
+        timer.lap("interactions")
         
         # 3.4 格局判定
-        from src.engine.algorithms.geju import GejuAnalyzer
-        geju = GejuAnalyzer.analyze(ctx, interactions, five_elements.scores, tracer)
+        geju = GejuAnalyzer.analyze(ctx, interactions, five_elements.scores, detail)
+        timer.lap("geju")
         
         # 3.5 强弱喜用判定
-        from src.engine.algorithms.analysis import AnalysisEngine
-        analysis = AnalysisEngine.analyze(ctx, energy_data, geju, tracer)
+        analysis = AnalysisEngine.analyze(ctx, energy_data, geju, detail)
+        timer.lap("analysis")
         
         # 3.6 神煞检测
-        from src.engine.algorithms.stars import StarDetector
-        stars = StarDetector.detect(ctx, tracer)
+        stars = StarDetector.detect(ctx, detail)
+        timer.lap("stars")
         
         # 4. 构建快照
         env = EnvironmentSnapshot(original_request=request)
         
         # 过滤掉库自带的星座信息
-        import re
-        solar_full = ctx.solar.toFullString()
-        lunar_full = ctx.solar.getLunar().toFullString()
-        
-        zodiac_pattern = r"\s(白羊|金牛|双子|巨蟹|狮子|处女|天秤|天蝎|射手|摩羯|水瓶|双鱼)座"
-        
-        clean_solar = re.sub(zodiac_pattern, "", solar_full)
-        clean_lunar = re.sub(zodiac_pattern, "", lunar_full)
+        clean_solar = strip_zodiac(ctx.solar.toFullString())
+        clean_lunar = strip_zodiac(ctx.chart.lunar.toFullString())
         
-        return BaziResult(
+        result = BaziResult(
             environment=env,
             request=request,
             birth_solar_datetime=clean_solar,
@@ -125,4 +384,8 @@ class BaziEngine:
             analysis=analysis,
             stars=stars
         )
+        timer.lap("assemble")
+        if request.collect_timings:
+            result.timings = timer.get_timings()
+        return result
 
@@ -1,10 +1,13 @@
-import re
-from typing import List, Dict, Optional
-from pydantic import BaseModel, Field
-from datetime import datetime
-from lunar_python import EightChar, Lunar, Solar
-from src.engine.models import ZiShiMode, MonthMode, BaziRequest
+from typing import List, Optional
+from pydantic import BaseModel
+from datetime import date
+from lunar_python import Lunar
+from lunar_python.util import LunarUtil
+from src.engine.models import MonthMode, FortuneDepth
+from src.engine.jieqi import month_boundaries, seconds_to_solar
 from src.engine.preprocessor import BaziContext
+from src.engine.chart import Pillar
+from src.engine.utils import strip_zodiac
 
 # --- 核心命盘 ---
 class Column(BaseModel):
@@ -30,21 +33,68 @@ class CoreChart(BaseModel):
     jie_qi: JieQiContext
 
 # --- 动态运程 ---
+# 流年、流月、流日均由干支序数直接推算，按需展开，不为每一项构造 Lunar
+
+_JIA_ZI_DAY = date(1949, 10, 1).toordinal()  # 1949-10-01 为甲子日
+
+def _jia_zi(index: int) -> str:
+    return LunarUtil.JIA_ZI[index % 60]
+
+def _day_gan_zhi(d: date) -> str:
+    return _jia_zi(d.toordinal() - _JIA_ZI_DAY)
+
 class LiuRi(BaseModel):
     day: int
     gan_zhi: str
+    date: str = ""  # 公历日期 YYYY-MM-DD
 
 class LiuYue(BaseModel):
-    month: int
+    month: int  # 1 = 寅月 (正月)，以节为界
     gan_zhi: str
+    year: int = 0  # 所属流年 (立春起算)
     liu_ri: List[LiuRi] = []
 
+    def days(self) -> List[LiuRi]:
+        """流日：本节月内 (交节当日起，至下一节前一日) 每一天的日干支"""
+        if self.liu_ri:
+            return self.liu_ri
+        bounds = month_boundaries(self.year)
+        start = seconds_to_solar(bounds[self.month - 1][1])
+        end = seconds_to_solar(bounds[self.month][1])
+        first = date(start.getYear(), start.getMonth(), start.getDay()).toordinal()
+        last = date(end.getYear(), end.getMonth(), end.getDay()).toordinal()
+        result = []
+        for ordinal in range(first, last):
+            d = date.fromordinal(ordinal)
+            result.append(LiuRi(day=d.day, gan_zhi=_jia_zi(ordinal - _JIA_ZI_DAY), date=d.isoformat()))
+        return result
+
 class LiuNian(BaseModel):
     year: int
     gan_zhi: str
     xun: str
     liu_yue: List[LiuYue] = []
 
+    @staticmethod
+    def of(year: int) -> "LiuNian":
+        gan_zhi = _jia_zi(year - 4)
+        return LiuNian(year=year, gan_zhi=gan_zhi, xun=LunarUtil.getXun(gan_zhi))
+
+    def months(self) -> List[LiuYue]:
+        """流月 (五虎遁)：寅月起，共 12 个节月"""
+        if self.liu_yue:
+            return self.liu_yue
+        year_gan = (self.year - 4) % 10
+        first_gan = (year_gan % 5 * 2 + 2) % 10
+        result = []
+        for i in range(12):
+            gan_zhi = LunarUtil.GAN[(first_gan + i) % 10 + 1] + LunarUtil.ZHI[(2 + i) % 12 + 1]
+            result.append(LiuYue(month=i + 1, gan_zhi=gan_zhi, year=self.year))
+        return result
+
+    def month(self, month: int) -> LiuYue:
+        return self.months()[month - 1]
+
 class XiaoYun(BaseModel):
     index: int
     gan_zhi: str
@@ -64,6 +114,17 @@ class FortuneData(BaseModel):
     da_yun: List[DaYun]
     before_start_xiao_yun: List[XiaoYun] = [] # 起运前的小运
 
+    def year(self, year: int) -> LiuNian:
+        """按需获取某一流年 (已展开的直接返回，否则即时推算)"""
+        for dy in self.da_yun:
+            for ln in dy.liu_nian:
+                if ln.year == year:
+                    return ln
+        return LiuNian.of(year)
+
+    def years(self, start_year: int, end_year: int) -> List[LiuNian]:
+        return [self.year(y) for y in range(start_year, end_year + 1)]
+
 # --- 辅助命盘 ---
 class AuxiliaryChart(BaseModel):
     year_di_shi: str
@@ -79,88 +140,64 @@ class AuxiliaryChart(BaseModel):
 
 # --- 提取逻辑 ---
 class CoreExtractor:
+    @staticmethod
+    def lunar_month_gan_zhi(lunar: Lunar) -> Optional[str]:
+        """农历月定月：取出生所在农历月 (区分闰月) 的月干支，找不到时返回 None"""
+        from lunar_python import LunarYear
+        ly = LunarYear.fromYear(lunar.getYear())
+        # 找到对应的农历月对象，需匹配月份数字且匹配闰月属性
+        for m in ly.getMonths():
+            if abs(m.getMonth()) == abs(lunar.getMonth()):
+                # 如果当前月是闰月，则必须匹配闰月属性；否则匹配非闰月
+                if (lunar.getMonth() < 0 and m.getMonth() < 0) or (lunar.getMonth() > 0 and m.getMonth() > 0):
+                    return m.getGanZhi()
+        return None
+
     @staticmethod
     def extract(ctx: BaziContext) -> CoreChart:
-        lunar = ctx.solar.getLunar()
-        eight_char = lunar.getEightChar()
-        
-        if ctx.request.zi_shi_mode == ZiShiMode.NEXT_DAY:
-            eight_char.setSect(1)
-        else:
-            eight_char.setSect(2)
-            
-        def get_col(gan_func, zhi_func, shi_gan_func, shi_zhi_func, hide_gan_func, na_yin_func, xun_kong_func) -> Column:
+        chart = ctx.chart
+        lunar = chart.lunar
+
+        def get_col(pillar: Pillar) -> Column:
             return Column(
-                gan=gan_func(),
-                zhi=zhi_func(),
-                shi_shen_gan=shi_gan_func(),
-                shi_shen_zhi=shi_zhi_func(),
-                hide_gan=hide_gan_func(),
-                na_yin=na_yin_func(),
-                xun_kong=list(xun_kong_func())
+                gan=pillar.gan,
+                zhi=pillar.zhi,
+                shi_shen_gan=pillar.shi_shen_gan,
+                shi_shen_zhi=list(pillar.shi_shen_zhi),
+                hide_gan=list(pillar.hide_gan),
+                na_yin=pillar.na_yin,
+                xun_kong=list(pillar.xun_kong)
             )
 
         # 补救 2.1.3: 处理月柱分支模式
-        month_gan = eight_char.getMonthGan()
-        month_zhi = eight_char.getMonthZhi()
+        month_col = get_col(chart.month)
         if ctx.request.month_mode == MonthMode.LUNAR_MONTH:
-            from lunar_python import LunarYear
-            ly = LunarYear.fromYear(lunar.getYear())
-            # 找到对应的农历月对象，需匹配月份数字且匹配闰月属性
-            lm = None
-            for m in ly.getMonths():
-                if abs(m.getMonth()) == abs(lunar.getMonth()):
-                    # 如果当前月是闰月，则必须匹配闰月属性；否则匹配非闰月
-                    if (lunar.getMonth() < 0 and m.getMonth() < 0) or (lunar.getMonth() > 0 and m.getMonth() > 0):
-                        lm = m
-                        break
-            if lm:
-                month_gan = lm.getGanZhi()[:1]
-                month_zhi = lm.getGanZhi()[1:]
+            gan_zhi = CoreExtractor.lunar_month_gan_zhi(lunar)
+            if gan_zhi:
+                month_col.gan = gan_zhi[:1]
+                month_col.zhi = gan_zhi[1:]
 
         return CoreChart(
-            year=get_col(
-                eight_char.getYearGan, eight_char.getYearZhi,
-                eight_char.getYearShiShenGan, eight_char.getYearShiShenZhi,
-                eight_char.getYearHideGan, eight_char.getYearNaYin,
-                eight_char.getYearXunKong
-            ),
-            month=Column(
-                gan=month_gan,
-                zhi=month_zhi,
-                shi_shen_gan=eight_char.getMonthShiShenGan(),
-                shi_shen_zhi=eight_char.getMonthShiShenZhi(),
-                hide_gan=eight_char.getMonthHideGan(),
-                na_yin=eight_char.getMonthNaYin(),
-                xun_kong=list(eight_char.getMonthXunKong())
-            ),
-            day=get_col(
-                eight_char.getDayGan, eight_char.getDayZhi,
-                eight_char.getDayShiShenGan, eight_char.getDayShiShenZhi,
-                eight_char.getDayHideGan, eight_char.getDayNaYin,
-                eight_char.getDayXunKong
-            ),
-            time=get_col(
-                eight_char.getTimeGan, eight_char.getTimeZhi,
-                eight_char.getTimeShiShenGan, eight_char.getTimeShiShenZhi,
-                eight_char.getTimeHideGan, eight_char.getTimeNaYin,
-                eight_char.getTimeXunKong
-            ),
+            year=get_col(chart.year),
+            month=month_col,
+            day=get_col(chart.day),
+            time=get_col(chart.time),
             # 补救 2.1.2: 节气上下文
             jie_qi=JieQiContext(
-                prev_name=lunar.getPrevJie().getName(),
-                prev_jie=re.sub(r"\s(白羊|金牛|双子|巨蟹|狮子|处女|天秤|天蝎|射手|摩羯|水瓶|双鱼)座", "", lunar.getPrevJie().getSolar().toFullString()),
-                next_name=lunar.getNextJie().getName(),
-                next_jie=re.sub(r"\s(白羊|金牛|双子|巨蟹|狮子|处女|天秤|天蝎|射手|摩羯|水瓶|双鱼)座", "", lunar.getNextJie().getSolar().toFullString())
+                prev_name=chart.prev_jie.name,
+                prev_jie=strip_zodiac(chart.prev_jie.solar.toFullString()),
+                next_name=chart.next_jie.name,
+                next_jie=strip_zodiac(chart.next_jie.solar.toFullString())
             )
         )
 
 class FortuneExtractor:
     @staticmethod
     def extract(ctx: BaziContext) -> FortuneData:
-        lunar = ctx.solar.getLunar()
-        eight_char = lunar.getEightChar()
-        yun = eight_char.getYun(ctx.request.gender)
+        yun = ctx.chart.eight_char.getYun(ctx.request.gender)
+        depth = ctx.request.fortune_depth
+        start_year = ctx.request.fortune_start_year
+        end_year = ctx.request.fortune_end_year
         
         da_yun_list = []
         before_start_xiao_yun = []
@@ -176,14 +213,18 @@ class FortuneExtractor:
                 continue
             
             ln_list = []
-            for ln in dy.getLiuNian():
-                # 补救 2.2.1: 预留级联结构
-                ln_list.append(LiuNian(
-                    year=ln.getYear(),
-                    gan_zhi=ln.getGanZhi(),
-                    xun=ln.getXun(),
-                    liu_yue=[] # 暂不深度递归，防止输出过大
-                ))
+            if depth != FortuneDepth.DA_YUN:
+                for y in range(dy.getStartYear(), dy.getStartYear() + 10):
+                    if (start_year is not None and y < start_year) or (end_year is not None and y > end_year):
+                        continue
+                    ln = LiuNian.of(y)
+                    # 补救 2.2.1: 级联结构，按请求深度展开
+                    if depth in (FortuneDepth.LIU_YUE, FortuneDepth.LIU_RI):
+                        ln.liu_yue = ln.months()
+                        if depth == FortuneDepth.LIU_RI:
+                            for ly in ln.liu_yue:
+                                ly.liu_ri = ly.days()
+                    ln_list.append(ln)
                 
             da_yun_list.append(DaYun(
                 index=i,
@@ -196,7 +237,7 @@ class FortuneExtractor:
             ))
             
         return FortuneData(
-            start_solar=re.sub(r"\s(白羊|金牛|双子|巨蟹|狮子|处女|天秤|天蝎|射手|摩羯|水瓶|双鱼)座", "", yun.getStartSolar().toFullString()),
+            start_solar=strip_zodiac(yun.getStartSolar().toFullString()),
             # 补救 2.2.3: 修正起运年龄获取
             start_age=yun.getStartYear() - ctx.solar.getYear() if yun.getStartYear() > 0 else 0,
             da_yun=da_yun_list,
@@ -206,12 +247,13 @@ class FortuneExtractor:
 class AuxiliaryExtractor:
     @staticmethod
     def extract(ctx: BaziContext) -> AuxiliaryChart:
-        eight_char = ctx.solar.getLunar().getEightChar()
+        chart = ctx.chart
+        eight_char = chart.eight_char
         return AuxiliaryChart(
-            year_di_shi=eight_char.getYearDiShi(),
-            month_di_shi=eight_char.getMonthDiShi(),
-            day_di_shi=eight_char.getDayDiShi(),
-            time_di_shi=eight_char.getTimeDiShi(),
+            year_di_shi=chart.year.di_shi,
+            month_di_shi=chart.month.di_shi,
+            day_di_shi=chart.day.di_shi,
+            time_di_shi=chart.time.di_shi,
             tai_yuan=eight_char.getTaiYuan(),
             tai_yuan_na_yin=eight_char.getTaiYuanNaYin(),
             ming_gong=eight_char.getMingGong(),
@@ -0,0 +1,116 @@
+# 干支整数编码与查表核心：天干 0-9 (甲-癸)，地支 0-11 (子-亥)，五行 0-4 (木火土金水)。
+# 各算法模块在整数上查表，只在输出边界转换为汉字。
+from typing import Dict, Tuple
+
+GAN = ("甲", "乙", "丙", "丁", "戊", "己", "庚", "辛", "壬", "癸")
+ZHI = ("子", "丑", "寅", "卯", "辰", "巳", "午", "未", "申", "酉", "戌", "亥")
+ELEMENTS = ("木", "火", "土", "金", "水")
+
+GAN_INDEX: Dict[str, int] = {g: i for i, g in enumerate(GAN)}
+ZHI_INDEX: Dict[str, int] = {z: i for i, z in enumerate(ZHI)}
+ELEMENT_INDEX: Dict[str, int] = {e: i for i, e in enumerate(ELEMENTS)}
+
+def cycle_index(gan, zhi):
+    """由天干、地支序号求六十甲子序号 (甲子 = 0)；同样适用于 numpy 数组"""
+    return (6 * gan - 5 * zhi) % 60
+
+# --- 五行 ---
+GAN_ELEMENT: Tuple[int, ...] = tuple(g // 2 for g in range(10))
+ZHI_ELEMENT: Tuple[int, ...] = (4, 2, 0, 0, 2, 1, 1, 2, 3, 3, 2, 4)
+# 每种五行的阳干 (甲丙戊庚壬)，用作该五行的代表天干
+ELEMENT_YANG_GAN: Tuple[int, ...] = tuple(e * 2 for e in range(5))
+
+def element_relation(me: int, other: int) -> int:
+    """五行生克关系：0 同我, 1 我生, 2 我克, 3 克我, 4 生我"""
+    return (other - me) % 5
+
+# --- 十神 ---
+# 序号 // 2 即关系类别 (比劫、食伤、财、官杀、印)，序号 % 2 为 0 表示与日干同阴阳
+SHI_SHEN = ("比肩", "劫财", "食神", "伤官", "偏财", "正财", "七杀", "正官", "偏印", "正印")
+SHI_SHEN_TABLE: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(element_relation(GAN_ELEMENT[d], GAN_ELEMENT[t]) * 2 + (d % 2 != t % 2) for t in range(10))
+    for d in range(10)
+)
+SHI_SHEN_INDEX: Dict[str, int] = {s: i for i, s in enumerate(SHI_SHEN)}
+
+# --- 十二长生 (地势) ---
+DI_SHI = ("长生", "沐浴", "冠带", "临官", "帝旺", "衰", "病", "死", "墓", "绝", "胎", "养")
+# 各天干的长生之位：阳干顺行，阴干逆行
+_CHANG_SHENG = (11, 6, 2, 9, 2, 9, 5, 0, 8, 3)
+DI_SHI_TABLE: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple((z - _CHANG_SHENG[g]) % 12 if g % 2 == 0 else (_CHANG_SHENG[g] - z) % 12 for z in range(12))
+    for g in range(10)
+)
+DI_SHI_PROSPEROUS = 4  # 长生至帝旺 (序号 0-4) 为得令
+
+# --- 旺相休囚死 ---
+SEASON = ("旺", "相", "休", "囚", "死")
+SEASON_INDEX: Dict[str, int] = {s: i for i, s in enumerate(SEASON)}
+# 月支所属季节的当令五行：寅卯木、巳午火、申酉金、亥子水、辰戌丑未土
+_SEASON_ELEMENT = (4, 2, 0, 0, 2, 1, 1, 2, 3, 3, 2, 4)
+# SEASON_TABLE[月支][五行] -> 旺相休囚死序号：当令者旺，我生者相，生我者休，克我者囚，我克者死
+SEASON_TABLE: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple((0, 1, 4, 3, 2)[element_relation(_SEASON_ELEMENT[z], e)] for e in range(5))
+    for z in range(12)
+)
+
+# --- 干支作用 ---
+# 天干五合：甲己、乙庚、丙辛、丁壬、戊癸，化土金水木火
+STEM_COMBINE: Tuple[int, ...] = tuple((g + 5) % 10 for g in range(10))
+STEM_COMBINE_ELEMENT: Tuple[int, ...] = tuple((g % 5 + 2) % 5 for g in range(10))
+# 地支六冲
+BRANCH_CLASH: Tuple[int, ...] = tuple((z + 6) % 12 for z in range(12))
+# 天干相冲 (甲庚、乙辛、丙壬、丁癸)，戊己居中无冲，记 -1
+STEM_CLASH: Tuple[int, ...] = tuple(g + 6 if g < 4 else g - 6 if g >= 6 else -1 for g in range(10))
+# 地支六合：子丑、寅亥、卯戌、辰酉、巳申、午未
+BRANCH_HARMONY: Tuple[int, ...] = tuple((1 - z) % 12 for z in range(12))
+
+# --- 神煞 ---
+def _mask(*zhis: str) -> int:
+    return sum(1 << ZHI_INDEX[z] for z in zhis)
+
+# 地支相刑 (按地支位掩码存储，两两对称)：子卯无礼之刑，寅巳申无恩之刑，丑戌未恃势之刑，辰午酉亥自刑
+BRANCH_PUNISH: Tuple[int, ...] = tuple(
+    _mask(*rule) for rule in (
+        "卯", "戌未", "巳申", "子", "辰", "寅申", "午", "丑戌", "寅巳", "酉", "丑未", "亥"
+    )
+)
+
+# 天乙贵人 (日干查地支)，按地支位掩码存储
+TIAN_YI_MASK: Tuple[int, ...] = (
+    _mask("丑", "未"), _mask("子", "申"), _mask("亥", "酉"), _mask("亥", "酉"), _mask("丑", "未"),
+    _mask("子", "申"), _mask("丑", "未"), _mask("午", "寅"), _mask("巳", "卯"), _mask("巳", "卯")
+)
+# 月德贵人 (月支查天干)
+YUE_DE_GAN: Tuple[int, ...] = tuple(GAN_INDEX[g] for g in "壬庚丙甲壬庚丙甲壬庚丙甲")
+# 天德贵人 (月支查干支)：正丁二申三壬，四辛五亥六甲，七癸八寅九丙，十乙冬巳腊庚
+# 天德为天干时记在 TIAN_DE_GAN，为地支时记在 TIAN_DE_ZHI，另一侧为 -1
+_TIAN_DE = "巳庚丁申壬辛亥甲癸寅丙乙"
+TIAN_DE_GAN: Tuple[int, ...] = tuple(GAN_INDEX.get(c, -1) for c in _TIAN_DE)
+TIAN_DE_ZHI: Tuple[int, ...] = tuple(ZHI_INDEX[c] if c not in GAN_INDEX else -1 for c in _TIAN_DE)
+# 驿马、咸池 (年/日支查地支)
+YI_MA: Tuple[int, ...] = tuple(ZHI_INDEX[z] for z in "寅亥申巳寅亥申巳寅亥申巳")
+XIAN_CHI: Tuple[int, ...] = tuple(ZHI_INDEX[z] for z in "酉午卯子酉午卯子酉午卯子")
+# 截路空亡 (日干查时柱)：甲己申酉、乙庚午未、丙辛辰巳、丁壬寅卯、戊癸子丑，时干固定为壬癸
+JIE_LU_VOID: Tuple[Tuple[int, int], ...] = tuple(
+    (cycle_index(8, (8 - 2 * (g % 5)) % 12), cycle_index(9, (9 - 2 * (g % 5)) % 12)) for g in range(10)
+)
+
+# --- 月令分司 ---
+# 月支 -> ((司令天干, 天数), ...)，一个月按 30 天计
+COMMAND_TABLE: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+    tuple((GAN_INDEX[g], days) for g, days in rules) for rules in (
+        (("壬", 10), ("癸", 20)),
+        (("癸", 9), ("辛", 3), ("己", 18)),
+        (("戊", 7), ("丙", 7), ("甲", 16)),
+        (("甲", 10), ("乙", 20)),
+        (("乙", 9), ("癸", 3), ("戊", 18)),
+        (("戊", 5), ("庚", 9), ("丙", 16)),
+        (("丙", 10), ("己", 9), ("丁", 11)),
+        (("丁", 9), ("乙", 3), ("己", 18)),
+        (("己", 7), ("壬", 3), ("庚", 20)),
+        (("庚", 10), ("辛", 20)),
+        (("辛", 9), ("丁", 3), ("戊", 18)),
+        (("戊", 7), ("甲", 5), ("壬", 18)),
+    )
+)
@@ -0,0 +1,152 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from datetime import date
+from typing import List, Optional, Tuple
+from lunar_python import Solar, Lunar, LunarYear
+
+# 十二节 (不含中气)，按一年内出现顺序排列
+JIE_NAMES = ("小寒", "立春", "惊蛰", "清明", "立夏", "芒种", "小暑", "立秋", "白露", "寒露", "立冬", "大雪")
+
+# 表内时刻统一编码为：自 1800-01-01 00:00:00 (北京时间) 起的整数秒
+EPOCH_ORDINAL = date(1800, 1, 1).toordinal()
+
+_MAGIC = b"JQT1"
+_HEADER = struct.Struct("<4sHHII")  # magic, 起始年, 结束年, 首项节名序号, 条目数
+
+def ymdhms_to_seconds(year: int, month: int, day: int, hour: int, minute: int, second: int) -> int:
+    # 按月初序数 + 日偏移计算，容忍 fromJulianDay 偶发的日期溢出 (如 31 日 +1)
+    days = date(year, month, 1).toordinal() + day - 1 - EPOCH_ORDINAL
+    return days * 86400 + hour * 3600 + minute * 60 + second
+
+def solar_to_seconds(solar: Solar) -> int:
+    return ymdhms_to_seconds(
+        solar.getYear(), solar.getMonth(), solar.getDay(),
+        solar.getHour(), solar.getMinute(), solar.getSecond()
+    )
+
+def seconds_to_solar(seconds: int) -> Solar:
+    days, rest = divmod(seconds, 86400)
+    d = date.fromordinal(EPOCH_ORDINAL + days)
+    return Solar.fromYmdHms(d.year, d.month, d.day, rest // 3600, rest % 3600 // 60, rest % 60)
+
+class JieQiTable:
+    """
+    预计算的交节时刻表 (1800-2200)。
+    数据文件为紧凑的 int64 数组，通过 mmap 只读映射，二分查找前后两个节。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.start_year, self.end_year, self._first_name, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"无效的节气表文件: {path}")
+        body = memoryview(self._mm)[_HEADER.size:_HEADER.size + count * 8]
+        if sys.byteorder == "little":
+            self._instants = body.cast("q")
+        else:
+            self._instants = array("q", body.tobytes())
+            self._instants.byteswap()
+        # 可查询区间：首个节之后、末个节之前
+        self.lower = self._instants[0]
+        self.upper = self._instants[-1]
+
+    def __len__(self) -> int:
+        return len(self._instants)
+
+    @property
+    def instants(self):
+        """全部交节时刻 (只读，支持 buffer 协议，可直接交给 numpy.frombuffer)"""
+        return self._instants
+
+    def name_at(self, index: int) -> str:
+        return JIE_NAMES[(self._first_name + index) % 12]
+
+    def instant_at(self, index: int) -> int:
+        return self._instants[index]
+
+    def covers(self, seconds: int) -> bool:
+        return self.lower <= seconds < self.upper
+
+    def locate(self, seconds: int) -> int:
+        """返回上一个节 (时刻 <= seconds) 的下标，与 lunar_python 的 getPrevJie 口径一致"""
+        return bisect_right(self._instants, seconds) - 1
+
+    def prev_next(self, seconds: int) -> Optional[Tuple[Tuple[str, int], Tuple[str, int]]]:
+        """返回 ((上一节名, 时刻), (下一节名, 时刻))；超出表范围时返回 None"""
+        if not self.covers(seconds):
+            return None
+        i = self.locate(seconds)
+        return (self.name_at(i), self._instants[i]), (self.name_at(i + 1), self._instants[i + 1])
+
+    @staticmethod
+    def build(path: str, start_year: int = 1800, end_year: int = 2200) -> int:
+        """
+        用 lunar_python 逐年计算并写出节气表，返回条目数。
+        为保证首尾可查，额外包含前一年与后一年的节。
+        """
+        moments = {}
+        for y in range(start_year - 1, end_year + 2):
+            julian_days = LunarYear.fromYear(y).getJieQiJulianDays()
+            # 与 Lunar.JIE_QI_IN_USE 对齐，取中文名 (本年) 的节
+            for i, key in enumerate(Lunar.JIE_QI_IN_USE):
+                if key in JIE_NAMES:
+                    s = Solar.fromJulianDay(julian_days[i])
+                    moments[solar_to_seconds(s)] = key
+
+        instants = sorted(moments)
+        first_name = JIE_NAMES.index(moments[instants[0]])
+        for i, t in enumerate(instants):
+            if moments[t] != JIE_NAMES[(first_name + i) % 12]:
+                raise ValueError(f"节气序列不连续: {seconds_to_solar(t).toYmdHms()} {moments[t]}")
+
+        data = array("q", instants)
+        if sys.byteorder != "little":
+            data.byteswap()
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, start_year, end_year, first_name, len(instants)))
+            f.write(data.tobytes())
+        return len(instants)
+
+_default_table: Optional[JieQiTable] = None
+_default_loaded = False
+
+def get_table(path: str = "data/jieqi_1800_2200.bin") -> Optional[JieQiTable]:
+    """加载默认节气表 (进程内只加载一次)；文件不存在时返回 None，调用方回退到 lunar_python"""
+    global _default_table, _default_loaded
+    if not _default_loaded:
+        _default_loaded = True
+        if os.path.exists(path):
+            _default_table = JieQiTable(path)
+    return _default_table
+
+def month_boundaries(year: int) -> List[Tuple[str, int]]:
+    """
+    以立春为岁首的 12 个节月边界：返回 13 个 (节名, 时刻)，
+    从 year 年立春到 year+1 年立春。优先查表，超出范围时回退到 lunar_python。
+    """
+    table = get_table()
+    if table is not None:
+        # 立春恒在 2 月初，3 月 1 日之前的最近一个节即为立春
+        i = table.locate(ymdhms_to_seconds(year, 3, 1, 0, 0, 0))
+        if 0 <= i and i + 12 < len(table) and table.name_at(i) == "立春":
+            return [(table.name_at(j), table.instant_at(j)) for j in range(i, i + 13)]
+
+    keys = ("立春", "惊蛰", "清明", "立夏", "芒种", "小暑", "立秋", "白露", "寒露", "立冬", "大雪", "XIAO_HAN", "LI_CHUN")
+    julian_days = LunarYear.fromYear(year).getJieQiJulianDays()
+    result = []
+    for key in keys:
+        jd = julian_days[Lunar.JIE_QI_IN_USE.index(key)]
+        name = {"XIAO_HAN": "小寒", "LI_CHUN": "立春"}.get(key, key)
+        result.append((name, solar_to_seconds(Solar.fromJulianDay(jd))))
+    return result
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else "data/jieqi_1800_2200.bin"
+    n = JieQiTable.build(out)
+    print(f"已写出 {n} 个交节时刻 -> {out}")
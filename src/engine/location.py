@@ -0,0 +1,224 @@
+import difflib
+import hashlib
+import json
+import os
+import pickle
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# 行政区划名称常见后缀，按长度降序匹配 ("广东省" -> "广东", "南山区" -> "南山")
+_SUFFIXES = sorted([
+    "特别行政区", "维吾尔自治区", "壮族自治区", "回族自治区", "自治区", "自治州", "自治县",
+    "地区", "新区", "省", "市", "区", "县", "盟", "旗"
+], key=len, reverse=True)
+
+_INDEX_VERSION = 2
+
+def normalize(name: str) -> str:
+    """去掉行政后缀；去掉后为空或只剩一个字时保留原名 (如 "城区"、"矿区")"""
+    name = name.strip()
+    for suffix in _SUFFIXES:
+        if name.endswith(suffix) and len(name) - len(suffix) >= 2:
+            return name[:-len(suffix)]
+    return name
+
+class Location(NamedTuple):
+    path: str        # 完整路径，如 "广东省/深圳市/南山区"
+    name: str        # 末级名称
+    longitude: float
+    latitude: float
+
+class AmbiguousLocation(ValueError):
+    """简称对应多个同一层级的地点 (如 "南山区")，无法确定经度"""
+
+    def __init__(self, query: str, candidates: List[Location]):
+        self.query = query
+        self.candidates = candidates
+        paths = "、".join(c.path for c in candidates)
+        super().__init__(f"地名 {query!r} 对应多个同级地点：{paths}；请使用完整路径 (如 {candidates[0].path!r}) 或直接给出 longitude")
+
+class LocationIndex:
+    """
+    地名索引：支持完整路径、简称、前缀与模糊查找。
+    同名地点 (如多个 "朝阳区") 全部保留，按层级由浅到深、再按数据文件顺序排序。
+    简称查找取层级最浅的候选 ("吉林" -> 吉林省)；最浅一级仍有多个时视为歧义，
+    严格查找抛出 AmbiguousLocation，需要精确定位时使用完整路径。
+    """
+
+    def __init__(self, paths: List[str], longitudes: array, latitudes: array, source_hash: str = "", keys=None):
+        self.paths = paths
+        self.longitudes = longitudes
+        self.latitudes = latitudes
+        self.source_hash = source_hash
+        if keys is None:
+            self._build_keys()
+        else:
+            self._by_path, self._by_name, self._name_keys = keys
+
+    def _build_keys(self):
+        self._by_path: Dict[str, int] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        # paths 已按 (层级, 文件顺序) 排好，按序追加即保证候选优先级
+        for i, path in enumerate(self.paths):
+            parts = path.split("/")
+            self._by_path.setdefault(path, i)
+            self._by_path.setdefault("/".join(normalize(p) for p in parts), i)
+            name = parts[-1]
+            for key in {name, normalize(name)}:
+                self._by_name.setdefault(key, []).append(i)
+        self._name_keys = sorted(self._by_name)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def _location(self, i: int) -> Location:
+        path = self.paths[i]
+        return Location(path, path.rsplit("/", 1)[-1], self.longitudes[i], self.latitudes[i])
+
+    def get(self, query: str, strict: bool = False) -> Optional[Location]:
+        """
+        精确查找：完整路径 (可省略后缀) 或简称，同名时取层级最浅的候选。
+        最浅一级有多个候选时，strict 抛出 AmbiguousLocation，否则取数据文件中靠前的一个。
+        """
+        candidates = self.candidates(query)
+        if not candidates:
+            return None
+        depth = candidates[0].path.count("/")
+        tier = [c for c in candidates if c.path.count("/") == depth]
+        if strict and len(tier) > 1:
+            raise AmbiguousLocation(query, tier)
+        return candidates[0]
+
+    def candidates(self, query: str) -> List[Location]:
+        query = query.strip()
+        if "/" in query:
+            i = self._by_path.get(query)
+            if i is None:
+                i = self._by_path.get("/".join(normalize(p) for p in query.split("/")))
+            return [self._location(i)] if i is not None else []
+        indices = self._by_name.get(query) or self._by_name.get(normalize(query)) or []
+        return [self._location(i) for i in indices]
+
+    def prefix(self, prefix: str, limit: int = 20) -> List[Location]:
+        """前缀查找 (按名称字典序)"""
+        results, seen = [], set()
+        start = bisect_left(self._name_keys, prefix)
+        for key in self._name_keys[start:]:
+            if not key.startswith(prefix) or len(results) >= limit:
+                break
+            for i in self._by_name[key]:
+                if i not in seen and len(results) < limit:
+                    seen.add(i)
+                    results.append(self._location(i))
+        return results
+
+    def search(self, query: str, limit: int = 5, cutoff: float = 0.6) -> List[Location]:
+        """模糊查找：精确 -> 前缀 -> 相似度"""
+        exact = self.candidates(query)
+        if exact:
+            return exact[:limit]
+        by_prefix = self.prefix(normalize(query), limit)
+        if by_prefix:
+            return by_prefix
+        keys = difflib.get_close_matches(normalize(query), self._name_keys, n=limit, cutoff=cutoff)
+        results, seen = [], set()
+        for key in keys:
+            for i in self._by_name[key]:
+                if i not in seen and len(results) < limit:
+                    seen.add(i)
+                    results.append(self._location(i))
+        return results
+
+    # --- 构建与持久化 ---
+    @staticmethod
+    def empty() -> "LocationIndex":
+        return LocationIndex([], array("d"), array("d"))
+
+    @staticmethod
+    def from_json(json_path: str) -> "LocationIndex":
+        """
+        从树形 latlng.json 构建索引。
+        注意：该文件中 'lat' 字段存的是经度 (116.40...)，'lng' 字段存的是纬度 (39.90...)。
+        """
+        with open(json_path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+
+        rows: List[Tuple[int, int, str, float, float]] = []
+
+        def walk(item, parents: List[str]):
+            if isinstance(item, list):
+                for sub in item:
+                    walk(sub, parents)
+                return
+            if not isinstance(item, dict):
+                return
+            name = item.get("name")
+            path = parents + [name] if name else parents
+            if name and item.get("lat"):
+                try:
+                    lon = float(item["lat"])
+                    lat = float(item.get("lng") or 0.0)
+                    rows.append((len(path), len(rows), "/".join(path), lon, lat))
+                except ValueError:
+                    pass
+            walk(item.get("children", []), path)
+
+        # 根节点 (如 "中国") 不计入路径
+        if isinstance(data, dict) and not data.get("lat"):
+            walk(data.get("children", []), [])
+        else:
+            walk(data, [])
+
+        rows.sort(key=lambda r: (r[0], r[1]))
+        return LocationIndex(
+            [r[2] for r in rows],
+            array("d", (r[3] for r in rows)),
+            array("d", (r[4] for r in rows)),
+            hashlib.sha1(raw).hexdigest()
+        )
+
+    def save(self, index_path: str):
+        # 连同查找键一起序列化，加载时无需再做名称归一化
+        payload = (_INDEX_VERSION, self.source_hash, self.paths,
+                   self.longitudes.tobytes(), self.latitudes.tobytes(),
+                   (self._by_path, self._by_name, self._name_keys))
+        with open(index_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(index_path: str) -> "LocationIndex":
+        with open(index_path, "rb") as f:
+            payload = pickle.load(f)
+        if payload[0] != _INDEX_VERSION:
+            raise ValueError(f"地名索引版本不匹配: {payload[0]}")
+        _, source_hash, paths, lons, lats, keys = payload
+        return LocationIndex(paths, array("d", lons), array("d", lats), source_hash, keys)
+
+    @staticmethod
+    def open(json_path: str, index_path: Optional[str] = None) -> "LocationIndex":
+        """优先加载预构建索引；索引缺失或与源数据不一致 (sha1) 时回退到解析 JSON"""
+        index_path = index_path or os.path.splitext(json_path)[0] + ".idx"
+        has_source = os.path.exists(json_path)
+        if os.path.exists(index_path):
+            try:
+                index = LocationIndex.load(index_path)
+                if not has_source:
+                    return index
+                with open(json_path, "rb") as f:
+                    if hashlib.sha1(f.read()).hexdigest() == index.source_hash:
+                        return index
+            except (OSError, ValueError, pickle.UnpicklingError):
+                pass
+        if not has_source:
+            return LocationIndex.empty()
+        return LocationIndex.from_json(json_path)
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "data/latlng.json"
+    out = os.path.splitext(src)[0] + ".idx"
+    index = LocationIndex.from_json(src)
+    index.save(out)
+    print(f"已写出 {len(index)} 个地点 -> {out}")
@@ -23,23 +23,54 @@ class ZiShiMode(str, Enum):
     LATE_ZI_IN_DAY = "LATE_ZI_IN_DAY"  # 晚子时不换日 (Sect 2)
     NEXT_DAY = "NEXT_DAY"              # 23点换日 (Sect 1)
 
+class FortuneDepth(str, Enum):
+    DA_YUN = "DA_YUN"      # 仅大运
+    LIU_NIAN = "LIU_NIAN"  # 大运 + 流年 (默认)
+    LIU_YUE = "LIU_YUE"    # 展开到流月
+    LIU_RI = "LIU_RI"      # 展开到流日
+
+class TraceLevel(str, Enum):
+    OFF = "OFF"          # 不记录推导路径
+    SUMMARY = "SUMMARY"  # 仅记录各阶段完成情况
+    FULL = "FULL"        # 记录全部算法推导细节
+
 class TraceStep(BaseModel):
     module: str      # 模块名 (如: 月令分司, 五行评分)
     desc: str        # 推导描述
     value: Optional[float] = None # 涉及的数值变动 (可选)
 
+class StageTiming(BaseModel):
+    seconds: float   # 该阶段累计耗时 (秒)
+    calls: int = 1   # 调用次数
+
 class BaziRequest(BaseModel):
     name: str = Field(..., min_length=1)
     gender: Gender = Gender.MALE
     calendar_type: CalendarType = CalendarType.SOLAR
     birth_datetime: str  # 格式: YYYY-MM-DD HH:mm:ss
     birth_location: str = "北京"
+    # 出生地时区：IANA 名 (如 "America/New_York"、"Asia/Hong_Kong") 或固定偏移 (如 "+05:30")；
+    # 为空时按北京时间处理，并校正 1986-1991 年中国夏令时
+    time_zone: Optional[str] = None
+    # 出生地经度 (东经为正)，指定时优先于 birth_location，海外出生请直接给出
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     
     # 算法开关
     time_mode: TimeMode = TimeMode.TRUE_SOLAR
     month_mode: MonthMode = MonthMode.SOLAR_TERM
     zi_shi_mode: ZiShiMode = ZiShiMode.LATE_ZI_IN_DAY
 
+    # 运程展开范围：流年及以下只在 [fortune_start_year, fortune_end_year] 内展开
+    fortune_depth: FortuneDepth = FortuneDepth.LIU_NIAN
+    fortune_start_year: Optional[int] = None
+    fortune_end_year: Optional[int] = None
+
+    # 推导路径记录级别
+    trace_level: TraceLevel = TraceLevel.FULL
+
+    # 是否在结果中附带各阶段耗时 (BaziResult.timings)
+    collect_timings: bool = False
+
     @validator("birth_datetime")
     def validate_datetime(cls, v):
         try:
@@ -1,19 +1,47 @@
 import math
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Optional, Tuple
 from lunar_python import Solar, Lunar
-from datetime import datetime
 from pydantic import BaseModel
 from src.engine.models import CalendarType, BaziRequest, TimeMode
+from src.engine.chart import ChartSnapshot
+from src.engine.jieqi import EPOCH_ORDINAL, ymdhms_to_seconds, solar_to_seconds, seconds_to_solar
+from src.engine.timezone import BEIJING_OFFSET
+
+# 校正流程统一在整数秒上进行 (自 1800-01-01 00:00:00 起，见 jieqi.py)，
+# 只在最后转换一次 Solar；不经过 datetime 时间戳，因此与宿主机时区无关。
+
+def parse_datetime(date_str: str) -> Tuple[int, int, int, int, int, int]:
+    """解析 YYYY-MM-DD HH:MM:SS：规范写法直接按位切片，其余写法交给 strptime"""
+    if len(date_str) == 19 and date_str[4] == "-" and date_str[7] == "-" and date_str[10] == " " \
+            and date_str[13] == ":" and date_str[16] == ":":
+        parts = (date_str[0:4], date_str[5:7], date_str[8:10], date_str[11:13], date_str[14:16], date_str[17:19])
+        if all(p.isdigit() for p in parts):
+            return tuple(int(p) for p in parts)
+    dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+    return dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second
+
+def _floor_seconds(offset: float) -> int:
+    # 与旧实现 datetime.fromtimestamp 的取整一致：先按微秒四舍五入，再舍去不足 1 秒的部分
+    return round(offset * 1_000_000) // 1_000_000
 
 class CalendarConverter:
     @staticmethod
-    def to_solar(date_str: str, calendar_type: CalendarType) -> Solar:
-        dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+    def to_seconds(date_str: str, calendar_type: CalendarType) -> int:
+        y, m, d, hh, mm, ss = parse_datetime(date_str)
         if calendar_type == CalendarType.SOLAR:
-            return Solar.fromYmdHms(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
-        else:
-            # 农历转公历
-            lunar = Lunar.fromYmdHms(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
-            return lunar.getSolar()
+            return ymdhms_to_seconds(y, m, d, hh, mm, ss)
+        # 农历转公历
+        return solar_to_seconds(Lunar.fromYmdHms(y, m, d, hh, mm, ss).getSolar())
+
+    @staticmethod
+    def to_solar(date_str: str, calendar_type: CalendarType) -> Solar:
+        return seconds_to_solar(CalendarConverter.to_seconds(date_str, calendar_type))
+
+def _range_seconds(start_str: str, end_str: str) -> Tuple[int, int]:
+    # 闭区间 [start, end] -> 半开区间 [start, end + 1)
+    return ymdhms_to_seconds(*parse_datetime(start_str)), ymdhms_to_seconds(*parse_datetime(end_str)) + 1
 
 class DSTCorrector:
     # 中国夏令时区间 (1986-1991)
@@ -25,64 +53,65 @@ class DSTCorrector:
         ("1990-04-15 00:00:00", "1990-09-16 23:59:59"),
         ("1991-04-14 00:00:00", "1991-09-15 23:59:59"),
     ]
+    # 预解析为按起点排序的整数秒区间，二分查找
+    _BOUNDS = sorted(_range_seconds(start, end) for start, end in DST_RANGES)
+    _STARTS = [start for start, _ in _BOUNDS]
+    _ENDS = [end for _, end in _BOUNDS]
+
+    @classmethod
+    def offset(cls, seconds: int) -> int:
+        """该时刻的夏令时偏移 (秒)：区间内为 3600，否则为 0"""
+        i = bisect_right(cls._STARTS, seconds) - 1
+        return 3600 if i >= 0 and seconds < cls._ENDS[i] else 0
+
+    @classmethod
+    def correct_seconds(cls, seconds: int) -> int:
+        return seconds - cls.offset(seconds)
 
     @classmethod
     def check_and_correct(cls, solar: Solar) -> Solar:
-        dt_str = f"{solar.getYear()}-{solar.getMonth():02d}-{solar.getDay():02d} " \
-                 f"{solar.getHour():02d}:{solar.getMinute():02d}:{solar.getSecond():02d}"
-        dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-        
-        for start_str, end_str in cls.DST_RANGES:
-            start = datetime.strptime(start_str, "%Y-%m-%d %H:%M:%S")
-            end = datetime.strptime(end_str, "%Y-%m-%d %H:%M:%S")
-            if start <= dt <= end:
-                corrected_dt = datetime.fromtimestamp(dt.timestamp() - 3600)
-                return Solar.fromYmdHms(
-                    corrected_dt.year, corrected_dt.month, corrected_dt.day,
-                    corrected_dt.hour, corrected_dt.minute, corrected_dt.second
-                )
-        return solar
+        seconds = solar_to_seconds(solar)
+        offset = cls.offset(seconds)
+        return seconds_to_solar(seconds - offset) if offset else solar
+
+def _eot_minutes(n: int) -> float:
+    b_rad = math.radians(360 * (n - 81) / 365)
+    # EoT = 9.87*sin(2B) - 7.67*sin(B+78.7)
+    return 9.87 * math.sin(2 * b_rad) - 7.67 * math.sin(b_rad + math.radians(78.7))
 
 class SolarTimeCalculator:
+    # 均时差 (分钟)，按一年中的第几天 (1-366) 预计算，下标 0 不用
+    EOT_TABLE = tuple(_eot_minutes(n) for n in range(367))
+
+    @staticmethod
+    def day_of_year(seconds: int) -> int:
+        d = date.fromordinal(EPOCH_ORDINAL + seconds // 86400)
+        return d.toordinal() - date(d.year, 1, 1).toordinal() + 1
+
     @staticmethod
     def get_eot(solar: Solar) -> float:
         """计算均时差 (分钟)"""
-        # N 为一年中的第几天
-        dt_str = f"{solar.getYear()}-{solar.getMonth():02d}-{solar.getDay():02d}"
-        dt = datetime.strptime(dt_str, "%Y-%m-%d")
-        n = dt.timetuple().tm_yday
-        
-        b_deg = 360 * (n - 81) / 365
-        b_rad = math.radians(b_deg)
-        
-        # EoT = 9.87*sin(2B) - 7.67*sin(B+78.7)
-        eot = 9.87 * math.sin(2 * b_rad) - 7.67 * math.sin(b_rad + math.radians(78.7))
-        return eot
+        n = date(solar.getYear(), solar.getMonth(), solar.getDay()).timetuple().tm_yday
+        return SolarTimeCalculator.EOT_TABLE[n]
 
     @staticmethod
-    def get_true_solar_time(solar: Solar, longitude: float) -> Solar:
-        """将平太阳时转换为真太阳时"""
-        eot = SolarTimeCalculator.get_eot(solar)
+    def true_solar_seconds(seconds: int, longitude: float) -> int:
+        """平太阳时 -> 真太阳时 (整数秒)"""
+        eot = SolarTimeCalculator.EOT_TABLE[SolarTimeCalculator.day_of_year(seconds)]
         # 经度修正: (经度 - 120) * 4 分钟
         lon_offset = (longitude - 120.0) * 4
-        
-        total_offset_minutes = lon_offset + eot
-        
-        # 转换时间
-        dt_str = f"{solar.getYear()}-{solar.getMonth():02d}-{solar.getDay():02d} " \
-                 f"{solar.getHour():02d}:{solar.getMinute():02d}:{solar.getSecond():02d}"
-        dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-        
-        corrected_dt = datetime.fromtimestamp(dt.timestamp() + total_offset_minutes * 60)
-        return Solar.fromYmdHms(
-            corrected_dt.year, corrected_dt.month, corrected_dt.day,
-            corrected_dt.hour, corrected_dt.minute, corrected_dt.second
-        )
+        return seconds + _floor_seconds((lon_offset + eot) * 60)
+
+    @staticmethod
+    def get_true_solar_time(solar: Solar, longitude: float) -> Solar:
+        """将平太阳时转换为真太阳时"""
+        return seconds_to_solar(SolarTimeCalculator.true_solar_seconds(solar_to_seconds(solar), longitude))
 
 class BaziContext(BaseModel):
     solar: Solar
     longitude: float
     request: BaziRequest
+    chart: ChartSnapshot  # 四柱快照，全流程共享
 
     class Config:
         arbitrary_types_allowed = True
@@ -93,21 +122,67 @@ class Preprocessor:
         self.config = config_obj or default_config
 
     def process(self, request: BaziRequest) -> BaziContext:
-        # 1. 历法标准化 -> 获取公历 Solar
-        solar = CalendarConverter.to_solar(request.birth_datetime, request.calendar_type)
+        solar, longitude = self.correct(request)
+        return self.build_context(request, solar, longitude)
+
+    def base_seconds(self, request: BaziRequest) -> Tuple[int, int]:
+        """
+        与时间模式无关的部分：历法标准化 + 夏令时校正。
+        返回 (出生地标准时墙钟秒数, 标准时 UTC 偏移秒)；未指定时区时后者恒为东八区。
+        """
+        # 1. 历法标准化 -> 公历时刻
+        seconds = CalendarConverter.to_seconds(request.birth_datetime, request.calendar_type)
         
-        # 2. 夏令时校正
-        solar = DSTCorrector.check_and_correct(solar)
+        # 2. 夏令时校正：按出生地时制去掉夏令时部分
+        offset = self.config.time_zones.resolve(request.time_zone, seconds)
+        return seconds - offset.dst, offset.standard
+
+    def base_solar(self, request: BaziRequest) -> Solar:
+        return seconds_to_solar(self.base_seconds(request)[0])
+
+    def longitude(self, request: BaziRequest, standard_offset: int = BEIJING_OFFSET, strict: bool = True) -> float:
+        """
+        经度：显式 longitude 优先，其次按地名查找；
+        都没有时，指定了时区的取该时区标准经线，否则取东八区基准 120°。
+        strict 时歧义地名 (多个同级同名地点) 抛出 AmbiguousLocation，不替调用方猜测经度
+        """
+        if request.longitude is not None:
+            return request.longitude
+        loc = self.config.get_location(request.birth_location, strict)
+        if loc:
+            return loc.longitude
+        return standard_offset / 240 if request.time_zone is not None else 120.0
+
+    @staticmethod
+    def apply_time_mode(seconds: int, standard_offset: int, longitude: float, time_mode: TimeMode) -> int:
+        """
+        平太阳时直接使用出生地标准时；
+        真太阳时先换算到北京时间墙钟，再按经度与均时差校正 (结果即出生地视太阳时)
+        """
+        if time_mode == TimeMode.TRUE_SOLAR:
+            return SolarTimeCalculator.true_solar_seconds(seconds - standard_offset + BEIJING_OFFSET, longitude)
+        return seconds
+
+    def correct(self, request: BaziRequest) -> Tuple[Solar, float]:
+        """时间校正阶段：返回 (校正后的 Solar, 经度)，不涉及农历换算"""
+        seconds, standard_offset = self.base_seconds(request)
         
-        # 3. 经度获取
-        longitude = self.config.get_longitude(request.birth_location)
+        # 3. 经度获取 (只有真太阳时用到经度，平太阳时不因歧义地名报错)
+        longitude = self.longitude(request, standard_offset, strict=request.time_mode == TimeMode.TRUE_SOLAR)
         
         # 4. 真太阳时校正 (如果模式开启)
-        if request.time_mode == TimeMode.TRUE_SOLAR:
-            solar = SolarTimeCalculator.get_true_solar_time(solar, longitude)
-            
+        seconds = self.apply_time_mode(seconds, standard_offset, longitude, request.time_mode)
+
+        return seconds_to_solar(seconds), longitude
+
+    def build_context(self, request: BaziRequest, solar: Solar, longitude: float,
+                      chart: Optional[ChartSnapshot] = None) -> BaziContext:
+        # 5. 构建命盘快照 (全流程仅换算一次；调用方已构建时直接复用)
+        chart = chart or ChartSnapshot.build(solar, request.zi_shi_mode)
+
         return BaziContext(
             solar=solar,
             longitude=longitude,
-            request=request
+            request=request,
+            chart=chart
         )
\ No newline at end of file
@@ -0,0 +1,422 @@
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from lunar_python import LunarYear, Solar
+from pydantic import BaseModel
+from src.engine.models import BaziRequest, MonthMode, ZiShiMode, TimeMode, TraceLevel, FortuneDepth
+from src.engine.jieqi import ymdhms_to_seconds, seconds_to_solar
+from src.engine.sexagenary import SexagenaryCalculator, _DAY_OFFSET
+from src.engine.chart import ChartSnapshot
+from src.engine.preprocessor import BaziContext, parse_datetime
+from src.engine.algorithms.energy import EnergyModel
+from src.engine.algorithms.interactions import InteractionDetector
+from src.engine.algorithms.geju import GejuAnalyzer
+from src.engine.algorithms.analysis import AnalysisEngine
+from src.engine.algorithms.stars import StarDetector
+from src.engine.ganzhi import GAN, ZHI, GAN_INDEX, ZHI_INDEX, BRANCH_CLASH, cycle_index
+
+_MAGIC = b"LMT1"
+_HEADER = struct.Struct("<4sI")  # magic, 条目数
+
+def _lunar_year_months(year: int):
+    """
+    某农历年各月 (首日序数, 月干支)。
+    月干支与 CoreExtractor.lunar_month_gan_zhi 口径一致：在 LunarYear.fromYear(year).getMonths()
+    中取第一个月数与闰月属性都相同的月份 (该列表从上一年冬月开始，冬月、腊月会取到上一年的同名月)。
+    """
+    months = LunarYear.fromYear(year).getMonths()
+    result = []
+    for m in months:
+        if m.getYear() != year:
+            continue
+        number = m.getMonth()
+        gan_zhi = next(x.getGanZhi() for x in months
+                       if abs(x.getMonth()) == abs(number) and (x.getMonth() < 0) == (number < 0))
+        first = Solar.fromJulianDay(m.getFirstJulianDay())
+        day = ymdhms_to_seconds(first.getYear(), first.getMonth(), first.getDay(), 0, 0, 0) // 86400
+        result.append((day, cycle_index(GAN_INDEX[gan_zhi[0]], ZHI_INDEX[gan_zhi[1]])))
+    return result
+
+class LunarMonthTable:
+    """
+    预计算的农历月表 (1800-2200)：每个农历月的首日 (自 1800-01-01 起的天数) 与月干支序号，
+    供农历月定月 (MonthMode.LUNAR_MONTH) 的反查使用。农历日在 0 点换日，月界即首日 0 点。
+    """
+
+    def __init__(self, days: np.ndarray, cycles: np.ndarray):
+        self.days = days      # int32，严格递增；第 i 月为 [days[i], days[i+1])
+        self.cycles = cycles  # int8，月干支六十甲子序号
+
+    def __len__(self) -> int:
+        return len(self.days) - 1
+
+    @staticmethod
+    def compute(start_year: int = 1800, end_year: int = 2200) -> "LunarMonthTable":
+        """用 lunar_python 逐年计算 (前后各多算一年以覆盖边界)"""
+        rows = []
+        for y in range(start_year - 1, end_year + 2):
+            rows.extend(_lunar_year_months(y))
+        days = np.array([d for d, _ in rows], dtype=np.int32)
+        if (np.diff(days) <= 0).any():
+            raise ValueError("农历月序列不连续")
+        return LunarMonthTable(days, np.array([c for _, c in rows], dtype=np.int8))
+
+    def save(self, path: str):
+        days = array("i", self.days.tolist())
+        if sys.byteorder != "little":
+            days.byteswap()
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(days)))
+            f.write(days.tobytes())
+            f.write(self.cycles.astype(np.int8).tobytes())
+
+    @staticmethod
+    def load(path: str) -> "LunarMonthTable":
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"无效的农历月表文件: {path}")
+        offset = _HEADER.size
+        days = np.frombuffer(data, dtype="<i4", count=count, offset=offset).astype(np.int32)
+        cycles = np.frombuffer(data, dtype=np.int8, count=count, offset=offset + count * 4).copy()
+        return LunarMonthTable(days, cycles)
+
+_default_months: Optional[LunarMonthTable] = None
+
+def get_lunar_months(path: str = "data/lunar_months_1800_2200.bin") -> LunarMonthTable:
+    """加载农历月表 (进程内只加载一次)；文件不存在时现场计算 (约数秒)"""
+    global _default_months
+    if _default_months is None:
+        _default_months = LunarMonthTable.load(path) if os.path.exists(path) else LunarMonthTable.compute()
+    return _default_months
+
+@dataclass(frozen=True)
+class BirthWindow:
+    """
+    一个匹配时段 [start, end)：自 1800-01-01 起的整数秒 (校正后的北京时间墙钟，
+    即排盘流程中真太阳时 / 夏令时校正之后的时刻)。通常为一个完整时辰，
+    遇到交节或农历换月时会被截断。
+    """
+    start: int
+    end: int
+
+    @property
+    def start_solar(self) -> Solar:
+        return seconds_to_solar(self.start)
+
+    @property
+    def end_solar(self) -> Solar:
+        return seconds_to_solar(self.end)
+
+    def __str__(self) -> str:
+        return f"{self.start_solar.toYmdHms()} ~ {self.end_solar.toYmdHms()}"
+
+class PillarSearch:
+    """
+    四柱反查：给定四柱干支，列出 1800-2200 年间所有符合的出生时段。
+    年、月柱在节气表 (或农历月表) 上按序号算术定位，日柱按六十日周期步进，
+    时柱按五鼠遁校验，全程不调用排盘。
+    """
+
+    def __init__(self, calculator: Optional[SexagenaryCalculator] = None):
+        self.calculator = calculator or SexagenaryCalculator()
+        instants = self.calculator.instants
+        self._jie_year, self._jie_month = self.calculator.jie_cycles()
+        self.lower = int(instants[0])
+        self.upper = int(instants[-1])
+
+    @staticmethod
+    def _parse(pillars: Sequence[str]) -> List[int]:
+        if len(pillars) != 4:
+            raise ValueError(f"需要年月日时四柱，收到 {len(pillars)} 柱")
+        result = []
+        for p in pillars:
+            if len(p) != 2 or p[0] not in GAN_INDEX or p[1] not in ZHI_INDEX:
+                raise ValueError(f"无效的干支: {p}")
+            g, z = GAN_INDEX[p[0]], ZHI_INDEX[p[1]]
+            if g % 2 != z % 2:
+                raise ValueError(f"干支阴阳不配: {p}")
+            result.append(cycle_index(g, z))
+        return result
+
+    def find(self, pillars: Sequence[str], start_year: Optional[int] = None, end_year: Optional[int] = None,
+             zi_shi_mode: ZiShiMode = ZiShiMode.LATE_ZI_IN_DAY,
+             month_mode: MonthMode = MonthMode.SOLAR_TERM) -> List[BirthWindow]:
+        """返回按时间排序的全部匹配时段；start_year / end_year 为公历年 (含)"""
+        year, month, day, hour = self._parse(pillars)
+        lower, upper = self.lower, self.upper
+        if start_year is not None:
+            lower = max(lower, ymdhms_to_seconds(start_year, 1, 1, 0, 0, 0))
+        if end_year is not None:
+            upper = min(upper, ymdhms_to_seconds(end_year + 1, 1, 1, 0, 0, 0))
+
+        # 1. 时柱与日柱的搭配：五鼠遁决定时干，不配则无解
+        offsets = self._hour_offsets(day, hour, zi_shi_mode)
+        if not offsets:
+            return []
+
+        # 2. 年、月柱确定的时间区间
+        windows = []
+        for seg_start, seg_end in self._segments(year, month, month_mode):
+            seg_start, seg_end = max(seg_start, lower), min(seg_end, upper)
+            if seg_start >= seg_end:
+                continue
+            # 3. 区间内日柱相符的日子：相邻两次相隔 60 天；晚子时可能落在前一日
+            first = seg_start // 86400 - 1
+            first += (day - _DAY_OFFSET - first) % 60
+            for d in range(first, seg_end // 86400 + 2, 60):
+                for lo, hi in offsets:
+                    s, e = max(d * 86400 + lo, seg_start), min(d * 86400 + hi, seg_end)
+                    if s < e:
+                        windows.append(BirthWindow(s, e))
+        windows.sort(key=lambda w: w.start)
+        return windows
+
+    @staticmethod
+    def _hour_offsets(day: int, hour: int, zi_shi_mode: ZiShiMode) -> List[tuple]:
+        """
+        日柱为 day 的那一天 (0 点起算) 中，时柱为 hour 的秒区间列表。
+        子时分早晚：NEXT_DAY 下前一日 23 点起已算作本日，早晚子时连成一个时辰；
+        LATE_ZI_IN_DAY 下本日 23 点的晚子时仍属本日，但时干按次日日干起。
+        """
+        time_gan, time_zhi = hour % 10, hour % 12
+        day_gan = day % 10
+
+        def gan_of(gan: int) -> int:
+            return (gan % 5 * 2 + time_zhi) % 10
+
+        if time_zhi != 0:
+            if gan_of(day_gan) != time_gan:
+                return []
+            return [((2 * time_zhi - 1) * 3600, (2 * time_zhi + 1) * 3600)]
+        if zi_shi_mode == ZiShiMode.NEXT_DAY:
+            return [(-3600, 3600)] if gan_of(day_gan) == time_gan else []
+        offsets = []
+        if gan_of(day_gan) == time_gan:
+            offsets.append((0, 3600))
+        if gan_of(day_gan + 1) == time_gan:
+            offsets.append((23 * 3600, 24 * 3600))
+        return offsets
+
+    def _segments(self, year: int, month: int, month_mode: MonthMode) -> List[tuple]:
+        instants = self.calculator.instants
+        if month_mode == MonthMode.SOLAR_TERM:
+            hits = np.nonzero((self._jie_year == year) & (self._jie_month == month))[0]
+            return [(int(instants[i]), int(instants[i + 1])) for i in hits]
+
+        # 农历月定月：年柱仍以立春为界，与月干支相符的农历月取交集
+        years = np.nonzero(self._jie_year == year)[0]
+        table = get_lunar_months()
+        months = np.nonzero(table.cycles[:-1] == month)[0]
+        segments = []
+        # 同一干支年的节月连续 (表首尾可能不足 12 个)，合并为一个区间
+        runs = np.split(years, np.nonzero(np.diff(years) > 1)[0] + 1) if len(years) else []
+        for run in runs:
+            y_start, y_end = int(instants[run[0]]), int(instants[run[-1] + 1])
+            for m in months:
+                s = max(y_start, int(table.days[m]) * 86400)
+                e = min(y_end, int(table.days[m + 1]) * 86400)
+                if s < e:
+                    segments.append((s, e))
+        return segments
+
+# --- 择日 ---
+class SelectionCriteria(BaseModel):
+    """择日条件，各项同时满足；留空的项不作限制"""
+    geju: List[str] = []                 # 格局名 (GejuResult.name)，命中其一即可
+    strength_levels: List[str] = []      # 强弱等级 (AnalysisResult.strength_level)，如 ["偏强", "中和"]
+    strength_min: Optional[float] = None # 日主支持率下限 (AnalysisResult.strength_score，含)
+    strength_max: Optional[float] = None # 日主支持率上限 (含)
+    stars: List[str] = []                # 必须出现的神煞，如 ["天乙贵人"]
+    no_clash: bool = False               # 四柱地支之间无六冲
+
+    @property
+    def needs_analysis(self) -> bool:
+        """是否含格局或强弱条件；不含时只判神煞与相冲，跳过五行能量、干支作用、格局与强弱"""
+        return bool(self.geju or self.strength_levels) or self.strength_min is not None or self.strength_max is not None
+
+@dataclass(frozen=True)
+class SelectedWindow(BirthWindow):
+    """择日命中的时辰及其判定结果 (四柱为节气定月口径)；条件不含格局与强弱时这三项为 None"""
+    pillars: Tuple[str, str, str, str]
+    geju: Optional[str]
+    strength_level: Optional[str]
+    strength_score: Optional[float]
+    stars: Tuple[str, ...]
+
+    def __str__(self) -> str:
+        text = f"{super().__str__()} {' '.join(self.pillars)}"
+        return text if self.geju is None else f"{text} {self.geju} {self.strength_level}"
+
+@lru_cache(maxsize=None)
+def _day_hours(day_gan: int, zi_shi_mode: ZiShiMode) -> Tuple[Tuple[int, int, int], ...]:
+    """
+    日柱天干为 day_gan 的一天中各时辰：(相对当日 0 点的起秒, 止秒, 时柱序号)。
+    NEXT_DAY 下前一日 23 点起即属本日子时；LATE_ZI_IN_DAY 下早子时 0-1 点与晚子时 23-24 点
+    分属两个时段，晚子时的时干按次日日干起 (口径同 PillarSearch._hour_offsets)。
+    """
+    def time_cycle(gan: int, zhi: int) -> int:
+        return cycle_index((gan % 5 * 2 + zhi) % 10, zhi)
+
+    zi = (-3600, 3600) if zi_shi_mode == ZiShiMode.NEXT_DAY else (0, 3600)
+    hours = [zi + (time_cycle(day_gan, 0),)]
+    for zhi in range(1, 12):
+        hours.append(((2 * zhi - 1) * 3600, (2 * zhi + 1) * 3600, time_cycle(day_gan, zhi)))
+    if zi_shi_mode == ZiShiMode.LATE_ZI_IN_DAY:
+        hours.append((23 * 3600, 24 * 3600, time_cycle(day_gan + 1, 0)))
+    return tuple(hours)
+
+def _clashes(z: int, *others: int) -> bool:
+    return BRANCH_CLASH[z] in others
+
+def _evaluate(cycles: Tuple[int, int, int, int], criteria: SelectionCriteria) -> Optional[tuple]:
+    """
+    在四柱快照上跑神煞、五行能量、干支作用、格局与强弱 (与排盘流程相同的算法模块)，
+    不满足条件时尽早返回 None；满足时返回 (格局, 强弱等级, 支持率, 神煞)，
+    条件不含格局与强弱时只判神煞，前三项为 None。
+    """
+    chart = ChartSnapshot.from_cycles(*cycles)
+    # 算法模块只读取 ctx.chart，快照之外的字段 (Solar、请求) 不必构造
+    ctx = BaziContext.model_construct(chart=chart)
+
+    # 1. 神煞：查表最廉价，先判
+    stars = tuple(dict.fromkeys(s.name for s in StarDetector.detect(ctx)))
+    if criteria.stars and not set(criteria.stars).issubset(stars):
+        return None
+    if not criteria.needs_analysis:
+        return None, None, None, stars
+
+    # 2. 格局
+    energy = EnergyModel.calculate_scores(ctx)
+    interactions = InteractionDetector.detect_all(ctx)
+    InteractionDetector.validate_transformations(interactions, ctx)
+    geju = GejuAnalyzer.analyze(ctx, interactions, {k: v["score"] for k, v in energy.items()})
+    if criteria.geju and geju.name not in criteria.geju:
+        return None
+
+    # 3. 强弱
+    analysis = AnalysisEngine.analyze(ctx, energy, geju)
+    if criteria.strength_levels and analysis.strength_level not in criteria.strength_levels:
+        return None
+    if criteria.strength_min is not None and analysis.strength_score < criteria.strength_min:
+        return None
+    if criteria.strength_max is not None and analysis.strength_score > criteria.strength_max:
+        return None
+    return geju.name, analysis.strength_level, analysis.strength_score, stars
+
+def _select_months(months: List[Tuple[int, int, int, int]], criteria: SelectionCriteria,
+                   zi_shi_mode: ZiShiMode) -> List[SelectedWindow]:
+    """
+    对若干节月 (起秒, 止秒, 年柱序号, 月柱序号) 做日级、时辰级剪枝与判定。
+    模块级函数，可直接派发到进程池。
+    """
+    result = []
+    no_clash = criteria.no_clash
+    for seg_start, seg_end, year, month in months:
+        yz, mz = year % 12, month % 12
+        # 日柱覆盖 [d 日 0 点 - 1 小时, d + 1 日 0 点)，前后各多取一天
+        for d in range(seg_start // 86400 - 1, (seg_end - 1) // 86400 + 2):
+            day = (_DAY_OFFSET + d) % 60
+            # 2. 日级剪枝
+            if no_clash and _clashes(day % 12, yz, mz):
+                continue
+            base = d * 86400
+            for lo, hi, time in _day_hours(day % 10, zi_shi_mode):
+                start, end = max(base + lo, seg_start), min(base + hi, seg_end)
+                if start >= end:
+                    continue
+                # 3. 时辰级剪枝
+                if no_clash and _clashes(time % 12, yz, mz, day % 12):
+                    continue
+                verdict = _evaluate((year, month, day, time), criteria)
+                if verdict is None:
+                    continue
+                pillars = tuple(GAN[c % 10] + ZHI[c % 12] for c in (year, month, day, time))
+                result.append(SelectedWindow(start, end, pillars, *verdict))
+    return result
+
+class DateSelector:
+    """
+    择日：列出 [start, end) 内四柱满足 SelectionCriteria 的全部时辰。
+    格局、强弱与神煞只取决于四柱 (排盘流程中均按节气定月的四柱计算)，因此逐级剪枝：
+      1. 月级：节月确定年、月柱，年月相冲时整月剔除；
+      2. 日级：日柱按六十日周期推算，与年、月柱相冲时整日剔除；
+      3. 时辰级：时柱按五鼠遁推算，先查相冲，再在四柱快照上跑神煞、格局与强弱。
+    全程不换算农历、不提取运程，单个时辰的判定约为完整排盘的 1/50；节月分块后可多进程并行。
+    命中的时辰需要完整结果时，用 arrange() 交给排盘流程。
+    """
+
+    def __init__(self, calculator: Optional[SexagenaryCalculator] = None):
+        self.calculator = calculator or SexagenaryCalculator()
+        self._jie_year, self._jie_month = self.calculator.jie_cycles()
+
+    def months(self, lower: int, upper: int, criteria: SelectionCriteria) -> List[Tuple[int, int, int, int]]:
+        """与 [lower, upper) 相交、通过月级剪枝的节月：(起秒, 止秒, 年柱序号, 月柱序号)"""
+        instants = self.calculator.instants
+        if lower < instants[0] or upper > instants[-1]:
+            raise ValueError("择日范围超出节气表 (1800-2200)")
+        first = int(np.searchsorted(instants, lower, side="right")) - 1
+        last = int(np.searchsorted(instants, upper, side="left"))
+        result = []
+        for i in range(first, last):
+            year, month = int(self._jie_year[i]), int(self._jie_month[i])
+            # 1. 月级剪枝
+            if criteria.no_clash and _clashes(year % 12, month % 12):
+                continue
+            result.append((max(int(instants[i]), lower), min(int(instants[i + 1]), upper), year, month))
+        return result
+
+    def find(self, start: str, end: str, criteria: SelectionCriteria,
+             zi_shi_mode: ZiShiMode = ZiShiMode.LATE_ZI_IN_DAY, workers: Optional[int] = 1,
+             chunk_months: int = 6) -> List[SelectedWindow]:
+        """
+        start / end 为 YYYY-MM-DD HH:MM:SS (北京时间墙钟，即排盘所用时刻，不做真太阳时校正)。
+        返回按时间排序的命中时辰，遇交节时截断；workers > 1 时按 chunk_months 个节月一块并行。
+        """
+        lower = ymdhms_to_seconds(*parse_datetime(start))
+        upper = ymdhms_to_seconds(*parse_datetime(end))
+        if lower >= upper:
+            return []
+        months = self.months(lower, upper, criteria)
+        chunks = [months[i:i + chunk_months] for i in range(0, len(months), chunk_months)]
+
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        if workers <= 1 or len(chunks) <= 1:
+            return _select_months(months, criteria, zi_shi_mode)
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            parts = pool.map(_select_months, chunks, [criteria] * len(chunks), [zi_shi_mode] * len(chunks))
+            return [w for part in parts for w in part]
+
+    @staticmethod
+    def request_for(window: BirthWindow, zi_shi_mode: ZiShiMode = ZiShiMode.LATE_ZI_IN_DAY,
+                    **fields) -> BaziRequest:
+        """窗口起点的排盘请求：固定东八区、平太阳时，校正后的时刻即窗口起点"""
+        values = dict(
+            name=str(window), birth_datetime=window.start_solar.toYmdHms(), time_zone="+08:00",
+            time_mode=TimeMode.MEAN_SOLAR, zi_shi_mode=zi_shi_mode,
+            fortune_depth=FortuneDepth.DA_YUN, trace_level=TraceLevel.OFF
+        )
+        values.update(fields)
+        return BaziRequest(**values)
+
+    @staticmethod
+    def arrange(windows: Iterable[BirthWindow], engine=None, workers: Optional[int] = 1,
+                zi_shi_mode: ZiShiMode = ZiShiMode.LATE_ZI_IN_DAY, **fields):
+        """对命中的时辰跑完整排盘 (BaziEngine.arrange_many)，返回 BatchItem 列表"""
+        from src.engine.core import BaziEngine
+        engine = engine or BaziEngine()
+        requests = [DateSelector.request_for(w, zi_shi_mode, **fields) for w in windows]
+        return engine.arrange_many(requests, workers=workers)
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else "data/lunar_months_1800_2200.bin"
+    table = LunarMonthTable.compute()
+    table.save(out)
+    print(f"已写出 {len(table)} 个农历月 -> {out}")
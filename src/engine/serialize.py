@@ -0,0 +1,93 @@
+import json
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # 可选依赖：缺失时回退到标准库 json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖：仅 MessagePack 输出需要
+    msgpack = None
+
+FORMATS = ("json", "msgpack")
+VIEWS = ("full", "pillars")
+
+def pillars_view(result) -> Dict[str, Any]:
+    """精简投影：只保留校正后时刻与四柱干支，约为完整结果的 1%"""
+    core = result.core
+    return {
+        "name": result.request.name,
+        "birth_solar_datetime": result.birth_solar_datetime,
+        "birth_lunar_datetime": result.birth_lunar_datetime,
+        "pillars": {
+            "year": core.year.gan + core.year.zhi,
+            "month": core.month.gan + core.month.zhi,
+            "day": core.day.gan + core.day.zhi,
+            "time": core.time.gan + core.time.zhi,
+        }
+    }
+
+def to_data(result, view: str = "full") -> Dict[str, Any]:
+    """转为只含 JSON 基本类型的字典 (用于 MessagePack 或二次加工)"""
+    if view == "pillars":
+        return pillars_view(result)
+    return result.model_dump(mode="json")
+
+def dumps_data(data: Any) -> bytes:
+    """字典 -> JSON 字节：优先 orjson"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+def dumps(result, fmt: str = "json", view: str = "full") -> bytes:
+    """
+    BaziResult 快速序列化。
+    完整 JSON 直接由 pydantic-core 的序列化器写出字节，不经过中间字典；
+    精简投影与 MessagePack 先取基本类型再编码。
+    结果由引擎内部构建，序列化前不再重新校验。
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的格式: {fmt}，可选 {FORMATS}")
+    if view not in VIEWS:
+        raise ValueError(f"不支持的投影: {view}，可选 {VIEWS}")
+
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise ImportError("MessagePack 输出需要安装 msgpack：pip install msgpack")
+        return msgpack.packb(to_data(result, view), use_bin_type=True)
+    if view == "full":
+        return result.__pydantic_serializer__.to_json(result)
+    return dumps_data(pillars_view(result))
+
+def dumps_item(item, fmt: str = "json", view: str = "full") -> bytes:
+    """BatchItem 序列化：结果部分按 view 投影"""
+    if view == "full" and fmt == "json":
+        return item.__pydantic_serializer__.to_json(item)
+    data = {
+        "index": item.index,
+        "result": to_data(item.result, view) if item.result is not None else None,
+        "error": item.error
+    }
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise ImportError("MessagePack 输出需要安装 msgpack：pip install msgpack")
+        return msgpack.packb(data, use_bin_type=True)
+    return dumps_data(data)
+
+def join_array(parts, fmt: str = "json") -> bytes:
+    """将逐项编码好的元素拼成数组，无需整体重新编码"""
+    if fmt == "msgpack":
+        n = len(parts)
+        if n < 16:
+            header = bytes([0x90 | n])
+        elif n < 0x10000:
+            header = b"\xdc" + n.to_bytes(2, "big")
+        else:
+            header = b"\xdd" + n.to_bytes(4, "big")
+        return header + b"".join(parts)
+    return b"[" + b",".join(parts) + b"]"
+
+def content_type(fmt: str) -> bytes:
+    return b"application/msgpack" if fmt == "msgpack" else b"application/json"
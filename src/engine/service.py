@@ -0,0 +1,349 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from pydantic import ValidationError
+from src.engine import core, serialize
+from src.engine.core import BaziEngine, BatchItem, _init_worker
+from src.engine.models import BaziRequest
+
+# --- 进程池工作端：结果在子进程内直接编码，主进程只转发字节 ---
+def _worker_arrange(request: BaziRequest, fmt: str, view: str) -> bytes:
+    engine = core._worker_engine or BaziEngine()
+    return serialize.dumps(engine.arrange(request), fmt, view)
+
+def _worker_arrange_batch(chunk: List[Tuple[int, BaziRequest]], fmt: str, view: str) -> List[bytes]:
+    engine = core._worker_engine or BaziEngine()
+    return [serialize.dumps_item(engine._arrange_item(index, request), fmt, view) for index, request in chunk]
+
+def _worker_ready() -> bool:
+    return core._worker_engine is not None and core._worker_engine.warmed
+
+class Overloaded(Exception):
+    """待处理任务已满，调用方应返回 429"""
+
+class BatchTooLarge(Exception):
+    """单批排盘数超过 max_pending，空闲时也无法容纳，重试无意义，调用方应返回 413"""
+
+class BaziService:
+    """
+    排盘 HTTP 服务 (ASGI 应用，无第三方框架依赖)。
+    CPU 密集的排盘在进程池中执行，事件循环只负责解析、排队与转发。
+
+    路由：
+      POST /arrange        单个 BaziRequest -> BaziResult
+      POST /arrange/batch  BaziRequest 数组 (或 {"requests": [...]}) -> BatchItem 数组
+      两个排盘路由均支持查询参数 format=json|msgpack 与 view=full|pillars
+      GET  /health         存活与负载状态
+      GET  /metrics        Prometheus 文本格式指标
+
+    背压：在途 + 排队中的排盘数超过 max_pending 时直接返回 429；
+    单批有效请求数本身超过 max_pending 的批量请求永远无法被容纳，返回 413。
+    合并：完全相同的请求在途时不重复计算，共享同一个结果。
+    自愈：工作进程异常退出 (OOM、段错误) 使进程池失效时，受影响的请求返回 503，
+    自有进程池随即重建并重新预热；重建完成前 /health 报告 degraded。
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 256, batch_chunksize: int = 32,
+                 max_body: int = 4 * 1024 * 1024, config_obj=None, executor: Optional[Executor] = None):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.batch_chunksize = batch_chunksize
+        self.max_body = max_body
+        self.config_obj = config_obj
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending = 0
+        self._started = time.time()
+        self._counters = {
+            "requests": {},        # 按路由计数
+            "responses": {},       # 按状态码计数
+            "arranged": 0,         # 实际提交给进程池的排盘数
+            "coalesced": 0,        # 被合并的重复请求数
+            "rejected": 0,         # 因背压返回 429 的请求数
+        }
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._pool_restarts = 0
+        self._pool_error: Optional[str] = None  # 最近一次进程池失效的原因，恢复后清空
+        self._rewarming: Optional[asyncio.Future] = None
+
+    # --- 生命周期 ---
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.config_obj,))
+        return self._executor
+
+    async def warm_up(self) -> int:
+        """拉起全部工作进程 (初始化时各自预热引擎)，返回已预热的进程数"""
+        loop = asyncio.get_running_loop()
+        ready = await asyncio.gather(*(loop.run_in_executor(self.executor, _worker_ready)
+                                       for _ in range(self.workers)))
+        return sum(ready)
+
+    def _pool_broken(self) -> bool:
+        # ProcessPoolExecutor 在工作进程异常退出后置位 _broken；其他 Executor 无此属性
+        return bool(getattr(self._executor, "_broken", False))
+
+    def _recover(self, broken: Executor, error: BaseException):
+        """进程池失效：自有进程池丢弃并重建、后台重新预热；外部传入的进程池无法重建，保持 degraded"""
+        self._pool_error = f"{type(error).__name__}: {error}"
+        if self._executor is not broken or not self._owns_executor:
+            return  # 已由并发的其他请求重建，或无权重建
+        self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._pool_restarts += 1
+        self._rewarming = asyncio.ensure_future(self._rewarm())
+
+    async def _rewarm(self):
+        try:
+            await self.warm_up()
+        except BrokenProcessPool as e:
+            self._pool_error = f"{type(e).__name__}: {e}"  # 预热时再次失效：下一个请求会再次触发重建
+        else:
+            self._pool_error = None
+
+    def shutdown(self):
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # --- 排盘调度 ---
+    def _reserve(self, count: int):
+        if self._pending + count > self.max_pending:
+            self._counters["rejected"] += 1
+            raise Overloaded()
+        self._pending += count
+
+    async def _run(self, count: int, fn, *args):
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool as e:
+            self._recover(executor, e)
+            raise
+        finally:
+            self._pending -= count
+
+    async def arrange(self, request: BaziRequest, fmt: str = "json", view: str = "full") -> bytes:
+        """单个排盘，返回编码后的 BaziResult；相同请求在途时直接等待已有结果"""
+        key = f"{fmt}|{view}|{request.model_dump_json()}"
+        future = self._inflight.get(key)
+        if future is not None:
+            self._counters["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        self._reserve(1)
+        self._counters["arranged"] += 1
+        future = asyncio.ensure_future(self._run(1, _worker_arrange, request, fmt, view))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def arrange_batch(self, requests: List[BaziRequest], fmt: str = "json", view: str = "full") -> List[bytes]:
+        """批量排盘：整批一次性占用背压额度 (超过 max_pending 的批次直接拒绝)，按块分发，返回的 BatchItem 编码与输入顺序一致"""
+        return await self._arrange_indexed(list(enumerate(requests)), fmt, view)
+
+    async def _arrange_indexed(self, indexed: List[Tuple[int, BaziRequest]], fmt: str, view: str) -> List[bytes]:
+        if len(indexed) > self.max_pending:
+            raise BatchTooLarge(f"单批最多 {self.max_pending} 个有效请求，收到 {len(indexed)} 个，请拆分后提交")
+        self._reserve(len(indexed))
+        self._counters["arranged"] += len(indexed)
+        chunks = [indexed[i:i + self.batch_chunksize] for i in range(0, len(indexed), self.batch_chunksize)]
+        results = await asyncio.gather(*(self._run(len(chunk), _worker_arrange_batch, chunk, fmt, view)
+                                         for chunk in chunks))
+        return [item for chunk in results for item in chunk]
+
+    # --- 状态 ---
+    def health(self) -> Dict:
+        degraded = self._pool_error is not None or self._pool_broken()
+        return {
+            "status": "degraded" if degraded else "ok",
+            "uptime": round(time.time() - self._started, 1),
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "inflight_keys": len(self._inflight),
+            "pool_restarts": self._pool_restarts,
+            "pool_error": self._pool_error
+        }
+
+    def metrics_text(self) -> str:
+        lines = [
+            "# TYPE bazi_http_requests_total counter",
+            *[f'bazi_http_requests_total{{path="{path}"}} {n}' for path, n in sorted(self._counters["requests"].items())],
+            "# TYPE bazi_http_responses_total counter",
+            *[f'bazi_http_responses_total{{status="{status}"}} {n}' for status, n in sorted(self._counters["responses"].items())],
+            "# TYPE bazi_arranged_total counter",
+            f"bazi_arranged_total {self._counters['arranged']}",
+            "# TYPE bazi_coalesced_total counter",
+            f"bazi_coalesced_total {self._counters['coalesced']}",
+            "# TYPE bazi_rejected_total counter",
+            f"bazi_rejected_total {self._counters['rejected']}",
+            "# TYPE bazi_pool_restarts_total counter",
+            f"bazi_pool_restarts_total {self._pool_restarts}",
+            "# TYPE bazi_pending gauge",
+            f"bazi_pending {self._pending}",
+            "# TYPE bazi_request_seconds summary",
+            f"bazi_request_seconds_sum {self._latency_sum:.6f}",
+            f"bazi_request_seconds_count {self._latency_count}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    # --- ASGI ---
+    _ROUTES = {
+        "/arrange": ("POST", "_handle_arrange"),
+        "/arrange/batch": ("POST", "_handle_batch"),
+        "/health": ("GET", "_handle_health"),
+        "/metrics": ("GET", "_handle_metrics"),
+    }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        started = time.perf_counter()
+        path = scope["path"].rstrip("/") or "/"
+        method = scope["method"]
+        # 未知路径归并计数，避免指标标签无限增长
+        label = path if path in self._ROUTES else "other"
+        self._counters["requests"][label] = self._counters["requests"].get(label, 0) + 1
+
+        status, content_type, body = await self._dispatch(method, path, scope, receive)
+        self._counters["responses"][status] = self._counters["responses"].get(status, 0) + 1
+        self._latency_sum += time.perf_counter() - started
+        self._latency_count += 1
+
+        headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+        if status == 429:
+            headers.append((b"retry-after", b"1"))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.warm_up()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _dispatch(self, method: str, path: str, scope, receive) -> Tuple[int, bytes, bytes]:
+        route = self._ROUTES.get(path)
+        if route is None:
+            return _error(404, "未知路径")
+        if method != route[0]:
+            return _error(405, f"仅支持 {route[0]}")
+
+        try:
+            return await getattr(self, route[1])(scope, receive)
+        except Overloaded:
+            return _error(429, "排盘队列已满，请稍后重试")
+        except BatchTooLarge as e:
+            return _error(413, str(e))
+        except BrokenProcessPool:
+            return _error(503, "工作进程异常退出，进程池正在重建，请稍后重试")
+        except ValidationError as e:
+            return 422, b"application/json", json.dumps(
+                {"error": "请求参数校验失败", "detail": json.loads(e.json())}, ensure_ascii=False).encode()
+        except ValueError as e:
+            return _error(400, str(e))
+        except Exception as e:
+            return _error(500, f"{type(e).__name__}: {e}")
+
+    async def _read_json(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ValueError("客户端已断开")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body:
+                raise ValueError(f"请求体超过 {self.max_body} 字节")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        try:
+            return json.loads(b"".join(chunks))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON 解析失败: {e}")
+
+    @staticmethod
+    def _output_options(scope) -> Tuple[str, str]:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        fmt = query.get("format", ["json"])[0]
+        view = query.get("view", ["full"])[0]
+        if fmt not in serialize.FORMATS:
+            raise ValueError(f"不支持的格式: {fmt}，可选 {serialize.FORMATS}")
+        if view not in serialize.VIEWS:
+            raise ValueError(f"不支持的投影: {view}，可选 {serialize.VIEWS}")
+        if fmt == "msgpack" and serialize.msgpack is None:
+            raise ValueError("服务端未安装 msgpack，无法输出 MessagePack")
+        return fmt, view
+
+    async def _handle_arrange(self, scope, receive):
+        fmt, view = self._output_options(scope)
+        request = BaziRequest.model_validate(await self._read_json(receive))
+        return 200, serialize.content_type(fmt), await self.arrange(request, fmt, view)
+
+    async def _handle_batch(self, scope, receive):
+        fmt, view = self._output_options(scope)
+        payload = await self._read_json(receive)
+        if isinstance(payload, dict):
+            payload = payload.get("requests")
+        if not isinstance(payload, list):
+            raise ValueError("批量请求体应为 BaziRequest 数组或 {\"requests\": [...]}")
+
+        # 单项参数错误只记录在对应 BatchItem 中，不影响整批
+        items: List[Optional[bytes]] = [None] * len(payload)
+        valid: List[Tuple[int, BaziRequest]] = []
+        for index, raw in enumerate(payload):
+            try:
+                valid.append((index, BaziRequest.model_validate(raw)))
+            except ValidationError as e:
+                items[index] = serialize.dumps_item(BatchItem(index=index, error=f"ValidationError: {e}"), fmt, view)
+
+        if valid:
+            results = await self._arrange_indexed(valid, fmt, view)
+            for (index, _), item in zip(valid, results):
+                items[index] = item
+        return 200, serialize.content_type(fmt), serialize.join_array(items, fmt)
+
+    async def _handle_health(self, scope, receive):
+        health = self.health()
+        status = 200 if health["status"] == "ok" else 503
+        return status, b"application/json", json.dumps(health, ensure_ascii=False).encode()
+
+    async def _handle_metrics(self, scope, receive):
+        return 200, b"text/plain; version=0.0.4", self.metrics_text().encode()
+
+def _error(status: int, message: str) -> Tuple[int, bytes, bytes]:
+    return status, b"application/json", json.dumps({"error": message}, ensure_ascii=False).encode()
+
+# 供 ASGI 服务器加载：uvicorn src.engine.service:app
+app = BaziService()
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("需要安装 ASGI 服务器才能直接运行：pip install uvicorn")
+    host = os.environ.get("BAZI_HOST", "127.0.0.1")
+    port = int(os.environ.get("BAZI_PORT", "8000"))
+    uvicorn.run(app, host=host, port=port)
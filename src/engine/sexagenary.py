@@ -0,0 +1,98 @@
+from datetime import date
+from typing import NamedTuple, Optional, Tuple
+import numpy as np
+from src.engine.models import ZiShiMode
+from src.engine.jieqi import JieQiTable, EPOCH_ORDINAL, get_table
+from src.engine.ganzhi import GAN, ZHI, cycle_index
+
+# 1949-10-01 为甲子日，据此推出 1800-01-01 (表内第 0 天) 的日柱序号
+_DAY_OFFSET = -(date(1949, 10, 1).toordinal() - EPOCH_ORDINAL) % 60
+_EPOCH = np.datetime64("1800-01-01T00:00:00", "s")
+
+class PillarArrays(NamedTuple):
+    """四柱干支序号数组：干 0-9 (甲-癸)，支 0-11 (子-亥)"""
+    year_gan: np.ndarray
+    year_zhi: np.ndarray
+    month_gan: np.ndarray
+    month_zhi: np.ndarray
+    day_gan: np.ndarray
+    day_zhi: np.ndarray
+    time_gan: np.ndarray
+    time_zhi: np.ndarray
+
+    def gan_zhi(self, pillar: str) -> np.ndarray:
+        """输出边界：将某一柱 (year/month/day/time) 转为干支字符串数组"""
+        gan = getattr(self, f"{pillar}_gan")
+        zhi = getattr(self, f"{pillar}_zhi")
+        return np.char.add(np.array(GAN)[gan], np.array(ZHI)[zhi])
+
+class SexagenaryCalculator:
+    """
+    向量化四柱计算器：对一批校正后的出生时刻 (北京时间墙钟) 直接用
+    儒略日算术 + 预计算节气表求干支序号，不为每行构造 Solar/Lunar。
+    口径与 lunar_python 的 EightChar 一致：年柱以立春交节时刻为界，
+    月柱以节为界 (节气定月)，时柱以 23 点起子时；日柱按 zi_shi_mode 处理晚子时。
+    """
+
+    def __init__(self, table: Optional[JieQiTable] = None):
+        table = table or get_table()
+        if table is None:
+            raise RuntimeError("缺少节气表 data/jieqi_1800_2200.bin，请先运行 python -m src.engine.jieqi")
+        self.instants = np.frombuffer(table.instants, dtype=np.int64)
+
+        # 以表内第一个立春为锚点：立春起寅月，年柱在立春换年
+        anchor = next(i for i in range(12) if table.name_at(i) == "立春")
+        anchor_year = date.fromordinal(EPOCH_ORDINAL + int(self.instants[anchor] // 86400)).year
+        year_gan = (anchor_year - 4) % 10
+        self._anchor = anchor
+        self._anchor_year_index = (anchor_year - 4) % 60
+        self._anchor_month_index = cycle_index((year_gan % 5 * 2 + 2) % 10, 2)
+
+    def jie_cycles(self) -> Tuple[np.ndarray, np.ndarray]:
+        """每个节月 [instants[i], instants[i+1]) 的年、月干支序号"""
+        offset = np.arange(len(self.instants) - 1) - self._anchor
+        year_index = (self._anchor_year_index + np.floor_divide(offset, 12)) % 60
+        month_index = (self._anchor_month_index + offset) % 60
+        return year_index, month_index
+
+    @staticmethod
+    def to_seconds(instants) -> np.ndarray:
+        """datetime64 数组 -> 自 1800-01-01 起的整数秒；整数数组视为已编码的秒"""
+        arr = np.asarray(instants)
+        if np.issubdtype(arr.dtype, np.datetime64):
+            return (arr.astype("datetime64[s]") - _EPOCH).astype(np.int64)
+        return arr.astype(np.int64)
+
+    def compute(self, instants, zi_shi_mode: ZiShiMode = ZiShiMode.LATE_ZI_IN_DAY) -> PillarArrays:
+        secs = self.to_seconds(instants)
+        if secs.size and (secs.min() < self.instants[0] or secs.max() >= self.instants[-1]):
+            raise ValueError("存在超出节气表范围 (1800-2200) 的时刻")
+
+        # 1. 年、月柱：定位上一个节
+        jie = np.searchsorted(self.instants, secs, side="right") - 1
+        offset = jie - self._anchor
+        year_index = (self._anchor_year_index + np.floor_divide(offset, 12)) % 60
+        month_index = (self._anchor_month_index + offset) % 60
+
+        # 2. 日柱：按天计数，23 点后的晚子时视流派决定是否进位
+        days, rest = np.divmod(secs, 86400)
+        late_zi = rest >= 23 * 3600
+        next_day = days + late_zi
+        day_number = next_day if zi_shi_mode == ZiShiMode.NEXT_DAY else days
+        day_index = (_DAY_OFFSET + day_number) % 60
+
+        # 3. 时柱：时支由小时决定；时干按五鼠遁，晚子时取次日日干
+        time_zhi = ((rest // 3600 + 1) // 2) % 12
+        time_day_gan = (_DAY_OFFSET + next_day) % 10
+        time_gan = (time_day_gan % 5 * 2 + time_zhi) % 10
+
+        return PillarArrays(
+            year_gan=(year_index % 10).astype(np.int8),
+            year_zhi=(year_index % 12).astype(np.int8),
+            month_gan=(month_index % 10).astype(np.int8),
+            month_zhi=(month_index % 12).astype(np.int8),
+            day_gan=(day_index % 10).astype(np.int8),
+            day_zhi=(day_index % 12).astype(np.int8),
+            time_gan=time_gan.astype(np.int8),
+            time_zhi=time_zhi.astype(np.int8)
+        )
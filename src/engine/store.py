@@ -0,0 +1,381 @@
+import argparse
+import json
+import os
+import sys
+import itertools
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from src.engine.preprocessor import parse_datetime
+from src.engine.jieqi import ymdhms_to_seconds
+from src.engine.ganzhi import GAN, ZHI, GAN_INDEX, ZHI_INDEX, ELEMENTS, ELEMENT_INDEX
+from src.engine.algorithms.stars import StarDetector
+
+try:
+    import orjson
+except ImportError:  # 可选依赖：缺失时回退到标准库 json
+    orjson = None
+
+# 每行一个命盘：干支、五行均为整数编码 (见 ganzhi.py)，格局与强弱按 meta.json 中的类别表编码
+CHART_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("birth", "<i8"),               # 校正后的出生时刻 (自 1800-01-01 起的整数秒)
+    ("gender", "i1"),
+    ("gan", "i1", (4,)),            # 年月日时天干
+    ("zhi", "i1", (4,)),            # 年月日时地支
+    ("energy", "<f4", (5,)),        # 五行能量 (木火土金水)
+    ("geju", "<i2"),                # 格局名编码，-1 为缺失
+    ("strength", "i1"),             # 强弱等级编码，-1 为缺失
+    ("strength_score", "<f4"),      # 日主支持率
+    ("yong", "i1"), ("xi", "i1"), ("ji", "i1"), ("chou", "i1"),  # 喜用忌仇五行序号
+    ("stars", "<u2"),               # 神煞位集 (StarDetector.NAMES 顺序)
+])
+
+PILLARS = ("year", "month", "day", "time")
+CATEGORIES = ("geju", "strength")
+ELEMENT_FIELDS = ("yong", "xi", "ji", "chou")
+STAR_BITS: Dict[str, int] = {name: 1 << i for i, name in enumerate(StarDetector.NAMES)}
+
+# 从 BaziResult 中取出入库所需的部分，避免整体转字典
+_INCLUDE = {
+    "request": {"gender"}, "birth_solar_datetime": True, "core": True,
+    "five_elements": {"scores"}, "geju": {"name"}, "analysis": True, "stars": True
+}
+
+def _loads(line):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+class ChartStore:
+    """
+    列式命盘库：一个目录下若干不可变的分区 (part-NNNNN.npy，CHART_DTYPE 结构化数组)，
+    加上记录分区列表与类别表的 meta.json。分区以 mmap 只读加载，查询逐分区向量化计算，
+    无需反序列化 BaziResult。单写多读：写入先落分区文件，再原子替换 meta.json。
+    小批量追加产生的小分区随写随并 (见 _merge_tail)，分区数随总行数对数增长。
+
+    查询条件 (关键字参数，多个条件同时满足)：
+      geju / strength            名称或名称列表 ("伤官佩印"、["偏弱", "极弱"])
+      yong / xi / ji / chou      五行名或列表
+      year_gan ... time_zhi      干支字或列表 (如 day_gan="甲")
+      stars                      神煞名或列表，须全部出现
+      gender / id / birth / strength_score  值、值列表，或 (下限, 上限) 闭区间 (None 为不限)；
+                                 birth 可写 YYYY-MM-DD HH:MM:SS
+    """
+
+    META = "meta.json"
+
+    def __init__(self, path: str, partition_rows: int = 1 << 20):
+        self.path = path
+        self.partition_rows = partition_rows
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, self.META)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {"version": 1, "partitions": [], "categories": {c: [] for c in CATEGORIES}}
+        self.meta.setdefault("next_part", len(self.meta["partitions"]))  # 下一个分区文件编号
+        self._codes = {c: {name: i for i, name in enumerate(names)} for c, names in self.meta["categories"].items()}
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return sum(p["rows"] for p in self.meta["partitions"])
+
+    # --- 写入 ---
+    def _code(self, category: str, name: Optional[str]) -> int:
+        if name is None:
+            return -1
+        codes = self._codes[category]
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(codes)
+            self.meta["categories"][category].append(name)
+        return code
+
+    def row(self, data: Dict[str, Any], row_id: int) -> tuple:
+        """BaziResult 的 JSON 形式 (字典) -> 一行"""
+        core = data["core"]
+        scores = (data.get("five_elements") or {}).get("scores") or {}
+        analysis = data.get("analysis") or {}
+        geju = data.get("geju") or {}
+        stars = 0
+        for star in data.get("stars") or ():
+            stars |= STAR_BITS.get(star["name"], 0)
+
+        def element(key: str) -> int:
+            return ELEMENT_INDEX.get(analysis.get(key), -1)
+
+        return (
+            row_id,
+            ymdhms_to_seconds(*parse_datetime(data["birth_solar_datetime"][:19])),
+            int(data["request"]["gender"]),
+            tuple(GAN_INDEX[core[p]["gan"]] for p in PILLARS),
+            tuple(ZHI_INDEX[core[p]["zhi"]] for p in PILLARS),
+            tuple(scores.get(e, np.nan) for e in ELEMENTS),
+            self._code("geju", geju.get("name")),
+            self._code("strength", analysis.get("strength_level")),
+            analysis.get("strength_score", np.nan),
+            element("yong_shen"), element("xi_shen"), element("ji_shen"), element("chou_shen"),
+            stars
+        )
+
+    def append(self, results: Iterable, ids: Optional[Iterable[int]] = None) -> int:
+        """
+        追加 BaziResult (或其 JSON 字典)，每 partition_rows 行写出一个分区；返回写入行数。
+        ids 缺省时按入库顺序编号。
+        """
+        return self.append_records((r if isinstance(r, dict) else r.model_dump(mode="json", include=_INCLUDE)
+                                    for r in results), ids)
+
+    def append_records(self, records: Iterable[Dict[str, Any]], ids: Optional[Iterable[int]] = None) -> int:
+        return self._append(zip(records, ids if ids is not None else itertools.count(len(self))))
+
+    def ingest_ndjson(self, stream: IO) -> int:
+        """
+        导入 NDJSON：每行一个 BaziResult，或批量排盘 CLI (--view full) 输出的 BatchItem
+        (以 index 为 id，失败项跳过)。
+        """
+        next_id = itertools.count(len(self))
+
+        def pairs() -> Iterator[Tuple[Dict[str, Any], int]]:
+            for line in stream:
+                if not line.strip():
+                    continue
+                data = _loads(line)
+                if "core" in data:
+                    yield data, next(next_id)
+                elif data.get("result") is not None:
+                    yield data["result"], data["index"]
+
+        return self._append(pairs())
+
+    def _append(self, pairs: Iterable[Tuple[Dict[str, Any], int]]) -> int:
+        rows, written = [], 0
+        for data, row_id in pairs:
+            rows.append(self.row(data, row_id))
+            if len(rows) >= self.partition_rows:
+                written += self._write_partition(rows)
+                rows = []
+        if rows:
+            written += self._write_partition(rows)
+        return written
+
+    def _write_partition(self, rows: List[tuple]) -> int:
+        self.meta["partitions"].append(self._save_array(np.array(rows, dtype=CHART_DTYPE)))
+        obsolete = self._merge_tail()
+        tmp = os.path.join(self.path, self.META + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, self.META))
+        # 被合并的分区在 meta.json 替换后才删除
+        for name in obsolete:
+            self._cache.pop(name, None)
+            os.remove(os.path.join(self.path, name))
+        return len(rows)
+
+    def _save_array(self, array: np.ndarray) -> Dict[str, Any]:
+        name = f"part-{self.meta['next_part']:05d}.npy"
+        self.meta["next_part"] += 1
+        np.save(os.path.join(self.path, name), array)
+        return {"file": name, "rows": len(array)}
+
+    def _merge_tail(self) -> List[str]:
+        """
+        末尾两个分区中前一个不大于后一个、且合并后不超过 partition_rows 时合并，反复进行 (同二进制进位)：
+        逐条追加时每行至多被重写 log2(partition_rows) 次，未写满的小分区也只有对数个。
+        返回被合并掉的分区文件名。
+        """
+        parts = self.meta["partitions"]
+        obsolete = []
+        while len(parts) >= 2 and parts[-2]["rows"] <= parts[-1]["rows"] \
+                and parts[-2]["rows"] + parts[-1]["rows"] <= self.partition_rows:
+            tail = parts[-2:]
+            merged = np.concatenate([self._load(p) for p in tail])
+            parts[-2:] = [self._save_array(merged)]
+            obsolete += [p["file"] for p in tail]
+        return obsolete
+
+    # --- 读取 ---
+    def _load(self, partition: Dict[str, Any]) -> np.ndarray:
+        array = self._cache.get(partition["file"])
+        if array is None:
+            array = self._cache[partition["file"]] = np.load(os.path.join(self.path, partition["file"]), mmap_mode="r")
+        return array
+
+    def partitions(self) -> Iterator[np.ndarray]:
+        for p in self.meta["partitions"]:
+            yield self._load(p)
+
+    def _column(self, rows: np.ndarray, key: str) -> np.ndarray:
+        if key.endswith(("_gan", "_zhi")) and key[:-4] in PILLARS:
+            return rows[key[-3:]][:, PILLARS.index(key[:-4])]
+        if key not in CHART_DTYPE.names or key in ("gan", "zhi", "energy"):
+            raise ValueError(f"不支持的查询字段: {key}")
+        return rows[key]
+
+    def _encode(self, key: str, value):
+        """条件值 -> 列中的整数编码 (未知名称编码为 -2，不匹配任何行)"""
+        if key in CATEGORIES:
+            return self._codes[key].get(value, -2)
+        if key in ELEMENT_FIELDS:
+            return ELEMENT_INDEX.get(value, -2) if isinstance(value, str) else value
+        if key.endswith("_gan"):
+            return GAN_INDEX.get(value, -2) if isinstance(value, str) else value
+        if key.endswith("_zhi"):
+            return ZHI_INDEX.get(value, -2) if isinstance(value, str) else value
+        if key == "birth" and isinstance(value, str):
+            return ymdhms_to_seconds(*parse_datetime(value))
+        return value
+
+    def _mask(self, rows: np.ndarray, where: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(len(rows), dtype=bool)
+        for key, value in where.items():
+            if key == "stars":
+                names = [value] if isinstance(value, str) else value
+                if any(n not in STAR_BITS for n in names):
+                    mask[:] = False  # 与未知类别一致：未知神煞不匹配任何行
+                    continue
+                bits = sum(STAR_BITS[n] for n in names)
+                mask &= (rows["stars"] & bits) == bits
+                continue
+            column = self._column(rows, key)
+            if isinstance(value, tuple):
+                lo, hi = (self._encode(key, v) if v is not None else None for v in value)
+                if lo is not None:
+                    mask &= column >= lo
+                if hi is not None:
+                    mask &= column <= hi
+            elif isinstance(value, (list, set, frozenset)):
+                mask &= np.isin(column, [self._encode(key, v) for v in value])
+            else:
+                mask &= column == self._encode(key, value)
+        return mask
+
+    def count(self, **where) -> int:
+        """满足条件的行数"""
+        return sum(int(self._mask(rows, where).sum()) for rows in self.partitions())
+
+    def select(self, **where) -> np.ndarray:
+        """满足条件的行 (CHART_DTYPE 数组，已脱离 mmap)"""
+        parts = [rows[self._mask(rows, where)] for rows in self.partitions()]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=CHART_DTYPE)
+
+    def group_by(self, *keys: str, **where) -> Dict[Any, int]:
+        """
+        按一个或多个字段分组计数，返回 {标签: 行数} (多个字段时标签为元组)，按行数降序。
+        可分组的字段同查询条件 (stars 与连续数值字段除外)。
+        """
+        if not keys:
+            raise ValueError("至少需要一个分组字段")
+        counts: Dict[tuple, int] = {}
+        for rows in self.partitions():
+            picked = rows[self._mask(rows, where)] if where else rows
+            if not len(picked):
+                continue
+            # 各列平移到非负后按混合进制合成一列整数键，一维 unique 远快于按行 unique
+            columns = [self._column(picked, k).astype(np.int64) + 1 for k in keys]
+            radix = [int(c.max()) + 1 for c in columns]
+            combined = np.ravel_multi_index(columns, radix)
+            values, n = np.unique(combined, return_counts=True)
+            decoded = np.unravel_index(values, radix)
+            for value, c in zip(zip(*(d.tolist() for d in decoded)), n.tolist()):
+                value = tuple(v - 1 for v in value)
+                counts[value] = counts.get(value, 0) + c
+        result = {}
+        for value, c in sorted(counts.items(), key=lambda kv: -kv[1]):
+            labels = tuple(self.label(k, v) for k, v in zip(keys, value))
+            result[labels if len(keys) > 1 else labels[0]] = c
+        return result
+
+    def label(self, key: str, code: int):
+        """列编码 -> 可读标签"""
+        if key in CATEGORIES:
+            return self.meta["categories"][key][code] if code >= 0 else None
+        if key in ELEMENT_FIELDS:
+            return ELEMENTS[code] if code >= 0 else None
+        if key.endswith("_gan"):
+            return GAN[code]
+        if key.endswith("_zhi"):
+            return ZHI[code]
+        return code
+
+    def records(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """select() 结果解码为字典，便于展示"""
+        result = []
+        for r in rows:
+            result.append({
+                "id": int(r["id"]),
+                "birth": int(r["birth"]),
+                "gender": int(r["gender"]),
+                "pillars": [GAN[g] + ZHI[z] for g, z in zip(r["gan"], r["zhi"])],
+                "energy": {e: float(v) for e, v in zip(ELEMENTS, r["energy"])},
+                "geju": self.label("geju", int(r["geju"])),
+                "strength": self.label("strength", int(r["strength"])),
+                "strength_score": float(r["strength_score"]),
+                **{k: self.label(k, int(r[k])) for k in ELEMENT_FIELDS},
+                "stars": [n for n, bit in STAR_BITS.items() if r["stars"] & bit]
+            })
+        return result
+
+def _bound(key: str, text: str):
+    """区间端点：strength_score 为浮点数，整数按整数，其余 (如 birth 的日期时间) 原样交给 _encode"""
+    if not text:
+        return None
+    if key == "strength_score":
+        return float(text)
+    return int(text) if text.lstrip("-").isdigit() else text
+
+def _parse_where(pairs: Sequence[str]) -> Dict[str, Any]:
+    """命令行条件 key=value；逗号分隔为多选，lo..hi 为区间"""
+    where = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        if ".." in value:
+            lo, hi = value.split("..", 1)
+            where[key] = (_bound(key, lo), _bound(key, hi))
+        elif "," in value or key == "stars":
+            where[key] = value.split(",")
+        else:
+            where[key] = int(value) if value.lstrip("-").isdigit() and key in ("gender", "id") else value
+    return where
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.engine.store", description="列式命盘库：导入与统计")
+    parser.add_argument("store", help="命盘库目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="导入 BaziResult / BatchItem NDJSON")
+    ingest.add_argument("inputs", nargs="*", default=["-"], help="输入文件，缺省或 - 为标准输入")
+    ingest.add_argument("--partition-rows", type=int, default=1 << 20, help="每个分区的最大行数")
+    count = sub.add_parser("count", help="按条件计数")
+    count.add_argument("where", nargs="*", help="条件 key=value，如 strength=偏弱 geju=伤官佩印")
+    group = sub.add_parser("group-by", help="按字段分组计数")
+    group.add_argument("keys", help="分组字段，逗号分隔")
+    group.add_argument("where", nargs="*", help="条件 key=value")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        store = ChartStore(args.store, args.partition_rows)
+        total = 0
+        for path in args.inputs:
+            stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+            try:
+                total += store.ingest_ndjson(stream)
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+        print(f"已导入 {total} 行，共 {len(store)} 行")
+        return 0
+
+    store = ChartStore(args.store)
+    try:
+        where = _parse_where(args.where)
+        if args.command == "count":
+            print(store.count(**where))
+        else:
+            for label, n in store.group_by(*args.keys.split(","), **where).items():
+                print(f"{label}\t{n}")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
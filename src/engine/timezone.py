@@ -0,0 +1,274 @@
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from src.engine.jieqi import EPOCH_ORDINAL, ymdhms_to_seconds
+
+# 北京时间 (东八区) 的 UTC 偏移：排盘流程内部的墙钟时刻均以此为准
+BEIJING_OFFSET = 8 * 3600
+
+# Unix 纪元在本项目整数秒编码 (自 1800-01-01 起) 中的位置
+_UNIX_EPOCH = (date(1970, 1, 1).toordinal() - EPOCH_ORDINAL) * 86400
+
+_MAGIC = b"TZT1"
+_HEADER = struct.Struct("<4sIII")  # magic, 起始年, 结束年, 目录字节数
+_INT64_MIN = -(1 << 63)
+
+_FIXED_OFFSET = re.compile(r"^(?:UTC|GMT)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$", re.IGNORECASE)
+
+class ZoneOffset(NamedTuple):
+    """某地某时刻的时制：UTC 偏移 (含夏令时) 与其中的夏令时部分，单位秒"""
+    utc_offset: int
+    dst: int
+
+    @property
+    def standard(self) -> int:
+        """标准时 UTC 偏移"""
+        return self.utc_offset - self.dst
+
+def parse_fixed_offset(zone: str) -> Optional[int]:
+    """'+05:30'、'UTC-3'、'GMT+0800' 等固定偏移写法 -> 秒；不是固定偏移时返回 None"""
+    match = _FIXED_OFFSET.match(zone.strip())
+    if not match:
+        return None
+    sign, hours, minutes = match.groups()
+    seconds = int(hours) * 3600 + int(minutes or 0) * 60
+    if seconds > 14 * 3600:
+        raise ValueError(f"无效的 UTC 偏移: {zone}")
+    return -seconds if sign == "-" else seconds
+
+class OffsetResolver(ABC):
+    """
+    时制解析器接口：给定时区与出生地墙钟时刻 (整数秒，见 jieqi.py)，返回该时刻的 ZoneOffset。
+    可通过 BaziConfig(tz_resolver=...) 替换为自定义实现；未实现 resolve 的子类在实例化时即报错。
+    """
+
+    @abstractmethod
+    def resolve(self, zone: Optional[str], local_seconds: int) -> ZoneOffset:
+        ...
+
+class TzTable:
+    """
+    预构建的时区转换表 (1800-2200)，数据来自 tzdata，通过 mmap 只读映射。
+    每个时区一段按墙钟时刻排序的转换点，二分查找，单次 O(log n)。
+    转换点的墙钟键取 转换时刻 + 前后两个偏移中较大者：跳过的时刻 (春季拨快) 与
+    重复的时刻 (秋季拨回) 都按转换前的偏移解释，与 zoneinfo 的 fold=0 一致。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.start_year, self.end_year, dir_size = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"无效的时区表文件: {path}")
+        offset = _HEADER.size
+        directory = json.loads(bytes(self._mm[offset:offset + dir_size]).decode("utf-8"))
+        offset += dir_size
+        # 目录：时区名 -> (首个转换点下标, 转换点数)，别名与其主时区共用同一段
+        self._zones: Dict[str, Tuple[int, int]] = {name: tuple(v) for name, v in directory["zones"].items()}
+        count = directory["entries"]
+        self._keys = self._view(offset, count, "q")
+        self._offsets = self._view(offset + count * 8, count, "i")
+        self._dsts = self._view(offset + count * 12, count, "i")
+
+    def _view(self, offset: int, count: int, code: str):
+        size = array(code).itemsize
+        body = memoryview(self._mm)[offset:offset + count * size]
+        if sys.byteorder == "little":
+            return body.cast(code)
+        data = array(code, body.tobytes())
+        data.byteswap()
+        return data
+
+    def __contains__(self, zone: str) -> bool:
+        return zone in self._zones
+
+    @property
+    def zones(self) -> List[str]:
+        return sorted(self._zones)
+
+    def lookup(self, zone: str, local_seconds: int) -> ZoneOffset:
+        span = self._zones.get(zone)
+        if span is None:
+            raise ValueError(f"未知时区: {zone}")
+        start, count = span
+        # 每段首项为哨兵 (键为 int64 最小值)，下标不会越过段首
+        i = bisect_right(self._keys, local_seconds, start, start + count) - 1
+        return ZoneOffset(self._offsets[i], self._dsts[i])
+
+    @staticmethod
+    def build(path: str, start_year: int = 1800, end_year: int = 2200, zones: Optional[List[str]] = None) -> int:
+        """由系统 tzdata 生成转换表，返回转换点总数"""
+        import zoneinfo
+        names = sorted(zones or zoneinfo.available_timezones())
+        lower = ymdhms_to_seconds(start_year, 1, 1, 0, 0, 0)
+        upper = ymdhms_to_seconds(end_year + 1, 1, 1, 0, 0, 0)
+
+        keys, offsets, dsts = array("q"), array("i"), array("i")
+        directory: Dict[str, List[int]] = {}
+        segments: Dict[tuple, List[int]] = {}
+        for name in names:
+            try:
+                segment = _zone_segment(name, lower, upper)
+            except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+                continue
+            # 内容相同的时区 (别名) 共用一段
+            shared = segments.get(segment)
+            if shared is None:
+                shared = [len(keys), len(segment)]
+                segments[segment] = shared
+                for key, utc_offset, dst in segment:
+                    keys.append(key)
+                    offsets.append(utc_offset)
+                    dsts.append(dst)
+            directory[name] = shared
+
+        blob = json.dumps({"zones": directory, "entries": len(keys)}, separators=(",", ":")).encode("utf-8")
+        if sys.byteorder != "little":
+            for data in (keys, offsets, dsts):
+                data.byteswap()
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, start_year, end_year, len(blob)))
+            f.write(blob)
+            for data in (keys, offsets, dsts):
+                f.write(data.tobytes())
+        return len(keys)
+
+def _tzif_transitions(name: str) -> List[int]:
+    """读取 TZif 文件中的显式转换时刻 (Unix 秒)"""
+    import zoneinfo
+    for root in zoneinfo.TZPATH:
+        path = os.path.join(root, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            break
+    else:
+        from importlib import resources
+        data = resources.files("tzdata.zoneinfo").joinpath(name).read_bytes()
+
+    def counts(offset):
+        if data[offset:offset + 4] != b"TZif":
+            raise ValueError(f"无效的 TZif 文件: {name}")
+        return struct.unpack_from(">6l", data, offset + 20)
+
+    isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = counts(0)
+    if data[4:5] < b"2":
+        return list(struct.unpack_from(f">{timecnt}l", data, 44))
+    # v2+：跳过 32 位数据块，读取 64 位转换时刻
+    v1_size = timecnt * 5 + typecnt * 6 + charcnt + leapcnt * 8 + isstdcnt + isutcnt
+    offset = 44 + v1_size
+    isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = counts(offset)
+    return list(struct.unpack_from(f">{timecnt}q", data, offset + 44))
+
+def _zone_segment(name: str, lower: int, upper: int) -> tuple:
+    """
+    单个时区在 [lower, upper) 内的转换点 ((墙钟键, UTC 偏移, 夏令时), ...)，首项为哨兵。
+    转换时刻取自 TZif 显式记录；最后一条记录之后的规则性转换 (TZif 尾部的 POSIX 规则)
+    按周采样、二分定位到秒。偏移与夏令时部分统一由 zoneinfo 给出。
+    """
+    import zoneinfo
+    tz = zoneinfo.ZoneInfo(name)
+
+    def state(t: int) -> Tuple[int, int]:
+        moment = datetime(1800, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=t)
+        local = moment.astimezone(tz)
+        return int(local.utcoffset().total_seconds()), int((local.dst() or timedelta(0)).total_seconds())
+
+    explicit = sorted(t + _UNIX_EPOCH for t in _tzif_transitions(name))
+    instants = [t for t in explicit if lower < t < upper]
+
+    # 显式记录之后的规则性转换
+    t = max(explicit[-1] if explicit else lower, lower)
+    step = 7 * 86400
+    current = state(t)
+    while t < upper:
+        nxt = min(t + step, upper)
+        after = state(nxt)
+        if after != current:
+            lo, hi = t, nxt  # state(lo) == current, state(hi) != current
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if state(mid) == current:
+                    lo = mid
+                else:
+                    hi = mid
+            instants.append(hi)
+            current = state(hi)
+            t = hi
+        else:
+            t = nxt
+
+    entries = [(_INT64_MIN,) + state(lower)]
+    for t in sorted(set(instants)):
+        before, after = state(t - 1), state(t)
+        if after == before:
+            continue
+        entries.append((t + max(before[0], after[0]),) + after)
+    return tuple(entries)
+
+class TzDatabase(OffsetResolver):
+    """
+    默认时制解析器：
+      zone 为空       沿用旧口径：北京时间，1986-1991 夏令时按 DSTCorrector.DST_RANGES
+      '+05:30' 等     固定 UTC 偏移，无夏令时
+      IANA 时区名     查预构建的 tzdata 转换表 (data/tz_1800_2200.bin)；表不存在时回退到 zoneinfo
+    """
+
+    def __init__(self, path: str = "data/tz_1800_2200.bin"):
+        self.path = path
+        self._table: Optional[TzTable] = None
+        self._loaded = False
+
+    @property
+    def table(self) -> Optional[TzTable]:
+        if not self._loaded:
+            self._loaded = True
+            if os.path.exists(self.path):
+                self._table = TzTable(self.path)
+        return self._table
+
+    def __getstate__(self):
+        # mmap 不可序列化：传给子进程时只带路径，到达后重新映射
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def resolve(self, zone: Optional[str], local_seconds: int) -> ZoneOffset:
+        if zone is None:
+            from src.engine.preprocessor import DSTCorrector
+            dst = DSTCorrector.offset(local_seconds)
+            return ZoneOffset(BEIJING_OFFSET + dst, dst)
+        fixed = parse_fixed_offset(zone)
+        if fixed is not None:
+            return ZoneOffset(fixed, 0)
+        table = self.table
+        if table is not None and table.start_year <= _year_of(local_seconds) <= table.end_year:
+            return table.lookup(zone, local_seconds)
+        return _zoneinfo_offset(zone, local_seconds)
+
+def _year_of(seconds: int) -> int:
+    return date.fromordinal(EPOCH_ORDINAL + seconds // 86400).year
+
+def _zoneinfo_offset(zone: str, local_seconds: int) -> ZoneOffset:
+    import zoneinfo
+    try:
+        tz = zoneinfo.ZoneInfo(zone)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"未知时区: {zone}")
+    local = (datetime(1800, 1, 1) + timedelta(seconds=local_seconds)).replace(tzinfo=tz)
+    return ZoneOffset(int(local.utcoffset().total_seconds()), int((local.dst() or timedelta(0)).total_seconds()))
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else "data/tz_1800_2200.bin"
+    n = TzTable.build(out)
+    print(f"已写出 {n} 个时区转换点 -> {out}")
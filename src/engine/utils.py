@@ -1,20 +1,134 @@
-from typing import List
-from src.engine.models import TraceStep
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from src.engine.models import TraceStep, StageTiming
+
+# lunar_python 的 toFullString() 末尾带星座，输出时去掉
+ZODIAC_PATTERN = re.compile(r"\s(白羊|金牛|双子|巨蟹|狮子|处女|天秤|天蝎|射手|摩羯|水瓶|双鱼)座")
+
+def strip_zodiac(text: str) -> str:
+    return ZODIAC_PATTERN.sub("", text)
 
 class Tracer:
     """
     计算追踪器：用于收集排盘过程中的所有推导路径。
     使用 thread-local 或在排盘生命周期内传递。
+    推导步骤以元组暂存，仅在 get_steps() 时才转换为 TraceStep。
     """
     def __init__(self):
-        self._steps: List[TraceStep] = []
+        self._steps: List[Tuple[str, str, Optional[float]]] = []
+
+    def __bool__(self) -> bool:
+        return True
 
     def record(self, module: str, desc: str, value: float = None):
-        step = TraceStep(module=module, desc=desc, value=value)
-        self._steps.append(step)
+        self._steps.append((module, desc, value))
 
     def get_steps(self) -> List[TraceStep]:
-        return self._steps
+        # 内部产生的数据无需再校验
+        return [TraceStep.model_construct(module=m, desc=d, value=v) for m, d, v in self._steps]
 
     def clear(self):
         self._steps = []
+
+class NullTracer(Tracer):
+    """
+    关闭追踪时使用的空追踪器：record 不做任何事。
+    布尔值为 False，调用方 `if tracer:` 的分支 (含 f-string 格式化) 会被整体跳过。
+    """
+    def __init__(self):
+        self._steps = []
+
+    def __bool__(self) -> bool:
+        return False
+
+    def record(self, module: str, desc: str, value: float = None):
+        pass
+
+    def get_steps(self) -> List[TraceStep]:
+        return []
+
+# 全局共享实例，关闭追踪时不产生任何分配
+NULL_TRACER = NullTracer()
+
+# 指标钩子：每个阶段结束时以 (阶段名, 耗时秒数) 调用，可直接对接 Prometheus 等导出器
+MetricsHook = Callable[[str, float], None]
+
+class StageTimer:
+    """
+    阶段计时器：lap(stage) 记录自上一次 lap (或创建) 以来的墙钟耗时。
+    同名阶段多次出现时累加耗时与调用次数；若设置了 hook 则每次 lap 都会上报。
+    """
+    def __init__(self, hook: Optional[MetricsHook] = None):
+        self._hook = hook
+        self._stages: Dict[str, List[float]] = {}
+        self._last = time.perf_counter()
+
+    def __bool__(self) -> bool:
+        return True
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        entry = self._stages.get(stage)
+        if entry is None:
+            self._stages[stage] = [elapsed, 1]
+        else:
+            entry[0] += elapsed
+            entry[1] += 1
+        if self._hook is not None:
+            self._hook(stage, elapsed)
+
+    def get_timings(self) -> Dict[str, StageTiming]:
+        return {k: StageTiming.model_construct(seconds=v[0], calls=v[1]) for k, v in self._stages.items()}
+
+class NullStageTimer(StageTimer):
+    """不计时也不上报时使用的空计时器，lap 不读取时钟"""
+    def __init__(self):
+        self._hook = None
+        self._stages = {}
+
+    def __bool__(self) -> bool:
+        return False
+
+    def lap(self, stage: str):
+        pass
+
+    def get_timings(self) -> Dict[str, StageTiming]:
+        return {}
+
+NULL_TIMER = NullStageTimer()
+
+class StageMetrics:
+    """
+    进程内的累计阶段指标，可作为 MetricsHook 传给 BaziEngine。
+    记录每个阶段的调用次数、总耗时与最大耗时，用于定位偶发的延迟尖刺。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}
+
+    def __call__(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {"calls": calls, "total_seconds": total, "max_seconds": peak,
+                        "mean_seconds": total / calls}
+                for stage, (calls, total, peak) in self._stages.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
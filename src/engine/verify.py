@@ -0,0 +1,390 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from lunar_python import LunarYear, Solar
+from src.engine.models import BaziRequest, MonthMode, ZiShiMode, Gender, TimeMode, FortuneDepth, TraceLevel
+from src.engine.jieqi import get_table, ymdhms_to_seconds, seconds_to_solar
+from src.engine.preprocessor import BaziContext, Preprocessor, DSTCorrector, SolarTimeCalculator
+from src.engine.extractor import CoreExtractor, FortuneExtractor
+from src.engine.algorithms.command import MonthCommandExtractor
+from src.engine.sexagenary import SexagenaryCalculator
+from src.engine.ganzhi import GAN, ZHI
+from src.engine.utils import strip_zodiac
+
+# 可比对的字段：四柱、各柱十神/藏干/纳音/旬空、前后节气、司令天干、大运
+FIELDS = ("pillars", "columns", "jie", "command", "da_yun")
+DEFAULT_FIELDS = ("pillars", "columns", "jie", "command")
+
+_EPOCH = datetime(1800, 1, 1)
+# 抽样范围：节气表 (1800-2200) 内侧各留一个月，前后节气都在表内
+_LOWER = ymdhms_to_seconds(1800, 2, 1, 0, 0, 0)
+_UPPER = ymdhms_to_seconds(2200, 12, 1, 0, 0, 0)
+
+class Probe(NamedTuple):
+    """一个探测输入：北京时间墙钟 (自 1800-01-01 起的整数秒，夏令时校正之前) 与排盘选项"""
+    seconds: int
+    zi_shi_mode: ZiShiMode = ZiShiMode.LATE_ZI_IN_DAY
+    month_mode: MonthMode = MonthMode.SOLAR_TERM
+    gender: int = 1
+    time_mode: TimeMode = TimeMode.MEAN_SOLAR
+    longitude: float = 120.0    # 仅真太阳时使用
+
+    def __str__(self) -> str:
+        text = (f"{(_EPOCH + timedelta(seconds=self.seconds)).isoformat(' ')} "
+                f"{self.zi_shi_mode.value} {self.month_mode.value} gender={self.gender}")
+        if self.time_mode == TimeMode.TRUE_SOLAR:
+            text += f" TRUE_SOLAR longitude={self.longitude}"
+        return text
+
+# 候选实现：fn(探测输入, 请求字段) -> 各输入的观测值 (只含其实现的字段)，与 reference 逐字段比对
+Candidate = Callable[[List[Probe], Sequence[str]], List[Dict[str, Any]]]
+
+# --- 参考路径：只用 datetime 与 lunar_python，不经过引擎的快照、整数表与提取器 ---
+_DST_RANGES = [(datetime.strptime(s, "%Y-%m-%d %H:%M:%S"), datetime.strptime(e, "%Y-%m-%d %H:%M:%S"))
+               for s, e in DSTCorrector.DST_RANGES]
+
+# 《渊海子平》司令分野 (月支: [(天干, 天数), ...])，一个月按 30 天计
+_COMMAND_TABLE = {
+    "寅": [("戊", 7), ("丙", 7), ("甲", 16)], "卯": [("甲", 10), ("乙", 20)],
+    "辰": [("乙", 9), ("癸", 3), ("戊", 18)], "巳": [("戊", 5), ("庚", 9), ("丙", 16)],
+    "午": [("丙", 10), ("己", 9), ("丁", 11)], "未": [("丁", 9), ("乙", 3), ("己", 18)],
+    "申": [("己", 7), ("壬", 3), ("庚", 20)], "酉": [("庚", 10), ("辛", 20)],
+    "戌": [("辛", 9), ("丁", 3), ("戊", 18)], "亥": [("戊", 7), ("甲", 5), ("壬", 18)],
+    "子": [("壬", 10), ("癸", 20)], "丑": [("癸", 9), ("辛", 3), ("己", 18)],
+}
+
+def _request(probe: Probe) -> BaziRequest:
+    return BaziRequest(
+        name="verify", gender=Gender(probe.gender),
+        birth_datetime=(_EPOCH + timedelta(seconds=probe.seconds)).strftime("%Y-%m-%d %H:%M:%S"),
+        time_mode=probe.time_mode, longitude=probe.longitude,
+        month_mode=probe.month_mode, zi_shi_mode=probe.zi_shi_mode,
+        fortune_depth=FortuneDepth.DA_YUN, trace_level=TraceLevel.OFF
+    )
+
+def _observe(ctx: BaziContext, fields: Sequence[str]) -> Dict[str, Any]:
+    """引擎路径的观测值：CoreExtractor / MonthCommandExtractor / FortuneExtractor"""
+    result = {}
+    if {"pillars", "columns", "jie"} & set(fields):
+        core = CoreExtractor.extract(ctx)
+        cols = (core.year, core.month, core.day, core.time)
+        result["pillars"] = [c.gan + c.zhi for c in cols]
+        result["columns"] = [[c.shi_shen_gan, c.shi_shen_zhi, c.hide_gan, c.na_yin, c.xun_kong] for c in cols]
+        jq = core.jie_qi
+        result["jie"] = [jq.prev_name, jq.prev_jie, jq.next_name, jq.next_jie]
+    if "command" in fields:
+        result["command"] = MonthCommandExtractor.get_command(ctx)[0]
+    if "da_yun" in fields:
+        fortune = FortuneExtractor.extract(ctx)
+        result["da_yun"] = [fortune.start_solar, fortune.start_age] + \
+            [f"{d.start_year}/{d.start_age}/{d.gan_zhi}" for d in fortune.da_yun]
+    return {k: v for k, v in result.items() if k in fields}
+
+def _reference_wall(probe: Probe) -> datetime:
+    """夏令时 (DST_RANGES 闭区间，datetime 比较) 与真太阳时 (经度 + 均时差公式现算) 校正"""
+    wall = _EPOCH + timedelta(seconds=probe.seconds)
+    if any(start <= wall <= end for start, end in _DST_RANGES):
+        wall -= timedelta(hours=1)
+    if probe.time_mode == TimeMode.TRUE_SOLAR:
+        b = math.radians(360 * (wall.timetuple().tm_yday - 81) / 365)
+        eot = 9.87 * math.sin(2 * b) - 7.67 * math.sin(b + math.radians(78.7))
+        wall = (wall + timedelta(minutes=(probe.longitude - 120.0) * 4 + eot)).replace(microsecond=0)
+    return wall
+
+def _lunar_month_gan_zhi(lunar) -> Optional[str]:
+    for m in LunarYear.fromYear(lunar.getYear()).getMonths():
+        if m.getMonth() == lunar.getMonth():  # 闰月为负数，符号一并匹配
+            return m.getGanZhi()
+    return None
+
+def reference(probe: Probe, fields: Sequence[str] = DEFAULT_FIELDS) -> Dict[str, Any]:
+    """
+    参考路径：时间校正用 datetime，四柱、各柱明细、前后节气、大运全部直接取自 lunar_python 的
+    EightChar / Yun，司令分野按交节时刻的 datetime 差现算。
+    """
+    wall = _reference_wall(probe)
+    solar = Solar.fromYmdHms(wall.year, wall.month, wall.day, wall.hour, wall.minute, wall.second)
+    lunar = solar.getLunar()
+    ec = lunar.getEightChar()
+    ec.setSect(1 if probe.zi_shi_mode == ZiShiMode.NEXT_DAY else 2)
+
+    result = {}
+    if {"pillars", "columns"} & set(fields):
+        pillars = [ec.getYear(), ec.getMonth(), ec.getDay(), ec.getTime()]
+        if probe.month_mode == MonthMode.LUNAR_MONTH:
+            pillars[1] = _lunar_month_gan_zhi(lunar) or pillars[1]
+        result["pillars"] = pillars
+        result["columns"] = [
+            [getattr(ec, f"get{p}ShiShenGan")(), getattr(ec, f"get{p}ShiShenZhi")(),
+             getattr(ec, f"get{p}HideGan")(), getattr(ec, f"get{p}NaYin")(), list(getattr(ec, f"get{p}XunKong")())]
+            for p in ("Year", "Month", "Day", "Time")
+        ]
+    prev_jie, next_jie = lunar.getPrevJie(), lunar.getNextJie()
+    if "jie" in fields:
+        result["jie"] = [prev_jie.getName(), strip_zodiac(prev_jie.getSolar().toFullString()),
+                         next_jie.getName(), strip_zodiac(next_jie.getSolar().toFullString())]
+    if "command" in fields:
+        s = prev_jie.getSolar()
+        jie = datetime(s.getYear(), s.getMonth(), s.getDay(), s.getHour(), s.getMinute(), s.getSecond())
+        days_passed = (wall - jie).total_seconds() / 86400.0
+        rules = _COMMAND_TABLE[ec.getMonthZhi()]
+        accumulated, command = 0, rules[-1][0]
+        for gan, days in rules:
+            accumulated += days
+            if days_passed <= accumulated:
+                command = gan
+                break
+        result["command"] = command
+    if "da_yun" in fields:
+        yun = lunar.getEightChar().getYun(probe.gender)
+        result["da_yun"] = [strip_zodiac(yun.getStartSolar().toFullString()),
+                            yun.getStartYear() - solar.getYear() if yun.getStartYear() > 0 else 0] + \
+            [f"{dy.getStartYear()}/{dy.getStartAge()}/{dy.getGanZhi()}" for dy in yun.getDaYun()[1:]]
+    return {k: v for k, v in result.items() if k in fields}
+
+# --- 内置候选 ---
+_preprocessor: Optional[Preprocessor] = None
+
+def engine_candidate(probes: List[Probe], fields: Sequence[str] = DEFAULT_FIELDS) -> List[Dict[str, Any]]:
+    """排盘流程的实际路径：整数秒夏令时校正 + 节气表定位前后节气"""
+    global _preprocessor
+    pre = _preprocessor = _preprocessor or Preprocessor()
+    result = []
+    for probe in probes:
+        request = _request(probe)
+        solar, longitude = pre.correct(request)
+        result.append(_observe(pre.build_context(request, solar, longitude), fields))
+    return result
+
+_calculator: Optional[SexagenaryCalculator] = None
+
+def sexagenary_candidate(probes: List[Probe], fields: Sequence[str] = DEFAULT_FIELDS) -> List[Dict[str, Any]]:
+    """向量化四柱 (SexagenaryCalculator + 农历月表) 与节气表：一批探测一次算完"""
+    from src.engine.search import get_lunar_months
+    global _calculator
+    calc = _calculator = _calculator or SexagenaryCalculator()
+    table = get_table()
+    secs = [DSTCorrector.correct_seconds(p.seconds) for p in probes]
+    secs = np.array([SolarTimeCalculator.true_solar_seconds(t, p.longitude) if p.time_mode == TimeMode.TRUE_SOLAR else t
+                     for t, p in zip(secs, probes)], dtype=np.int64)
+
+    by_mode = {mode: calc.compute(secs, mode) for mode in {p.zi_shi_mode for p in probes}}
+    months = get_lunar_months()
+    lunar_month = months.cycles[np.searchsorted(months.days, secs // 86400, side="right") - 1]
+
+    result = []
+    for i, probe in enumerate(probes):
+        arr = by_mode[probe.zi_shi_mode]
+        pillars = [GAN[arr.year_gan[i]] + ZHI[arr.year_zhi[i]], GAN[arr.month_gan[i]] + ZHI[arr.month_zhi[i]],
+                   GAN[arr.day_gan[i]] + ZHI[arr.day_zhi[i]], GAN[arr.time_gan[i]] + ZHI[arr.time_zhi[i]]]
+        if probe.month_mode == MonthMode.LUNAR_MONTH:
+            c = int(lunar_month[i])
+            pillars[1] = GAN[c % 10] + ZHI[c % 12]
+        (prev_name, prev_ts), (next_name, next_ts) = table.prev_next(int(secs[i]))
+        observed = {"pillars": pillars, "jie": [prev_name, strip_zodiac(seconds_to_solar(prev_ts).toFullString()),
+                                                next_name, strip_zodiac(seconds_to_solar(next_ts).toFullString())]}
+        result.append({k: v for k, v in observed.items() if k in fields})
+    return result
+
+CANDIDATES: Dict[str, Candidate] = {"engine": engine_candidate, "sexagenary": sexagenary_candidate}
+
+def resolve(name: str) -> Candidate:
+    """内置候选名，或 'package.module:function' 形式的自定义候选"""
+    if name in CANDIDATES:
+        return CANDIDATES[name]
+    module, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"未知候选: {name}，内置候选 {tuple(CANDIDATES)}，自定义候选写作 module:function")
+    return getattr(importlib.import_module(module), attr)
+
+# --- 抽样 ---
+# 分层抽样权重：均匀、交节前后、子时边界 (23 点 / 0 点 / 1 点)、夏令时切换前后，
+# 以及真太阳时 (时刻按前四类之一抽取，经度在中国境内随机)
+STRATA = (("uniform", 0.35), ("jie", 0.25), ("zi", 0.15), ("dst", 0.1), ("true_solar", 0.15))
+
+def _jitter(rng: random.Random) -> int:
+    """边界附近的偏移：恰在边界、前后 1 秒、前后 1 分钟，或 ±2 小时内随机"""
+    return rng.choice((0, -1, 1, -60, 60, rng.randint(-7200, 7200)))
+
+def sample(rng: random.Random, n: int) -> List[Probe]:
+    table = get_table()
+    first, last = table.locate(_LOWER) + 1, table.locate(_UPPER)
+    bounds = [t for pair in DSTCorrector._BOUNDS for t in pair]
+    kinds = [k for k, _ in STRATA]
+    weights = [w for _, w in STRATA]
+
+    probes = []
+    for _ in range(n):
+        kind = rng.choices(kinds, weights)[0]
+        true_solar = kind == "true_solar"
+        if true_solar:
+            kind = rng.choices(kinds[:-1], weights[:-1])[0]
+        if kind == "uniform":
+            t = rng.randint(_LOWER, _UPPER - 1)
+        elif kind == "jie":
+            t = table.instant_at(rng.randint(first, last)) + _jitter(rng)
+        elif kind == "zi":
+            day = rng.randint(_LOWER // 86400, _UPPER // 86400 - 1)
+            t = day * 86400 + rng.choice((23, 0, 1)) * 3600 + rng.choice((0, -1, 1, -30, 30))
+        else:
+            t = rng.choice(bounds) + rng.choice((0, 3600, -3600)) + _jitter(rng)
+        probes.append(Probe(
+            min(max(t, _LOWER), _UPPER - 1), rng.choice(list(ZiShiMode)), rng.choice(list(MonthMode)),
+            rng.randint(0, 1), *((TimeMode.TRUE_SOLAR, round(rng.uniform(73.0, 135.0), 4)) if true_solar else ())
+        ))
+    return probes
+
+# --- 比对与最小化 ---
+def _diff(expected: Dict[str, Any], actual: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+    return {k: (expected.get(k), v) for k, v in actual.items() if expected.get(k) != v}
+
+def _fails(candidate: Candidate, probe: Probe, fields: Sequence[str]) -> bool:
+    actual = candidate([probe], fields)[0]
+    return bool(_diff(reference(probe, list(actual)), actual))
+
+def shrink(candidate: Candidate, probe: Probe, fields: Sequence[str] = DEFAULT_FIELDS) -> Probe:
+    """
+    把失败输入缩到最小复现：
+    1. 选项逐项恢复为默认值 (真太阳时的经度先取整)，仍失败则保留；
+    2. 时刻依次取整到日、时、分，仍失败则保留；
+    3. 在前 1 天内二分查找开始出错的那一秒 (前一秒通过)，即分歧的边界。
+    """
+    defaults = Probe(probe.seconds)
+    trials = [{field: getattr(defaults, field)} for field in ("zi_shi_mode", "month_mode", "gender")]
+    trials += [{"time_mode": defaults.time_mode, "longitude": defaults.longitude}, {"longitude": round(probe.longitude)}]
+    for update in trials:
+        trial = probe._replace(**update)
+        if trial != probe and _fails(candidate, trial, fields):
+            probe = trial
+    for unit in (86400, 3600, 60):
+        trial = probe._replace(seconds=probe.seconds // unit * unit)
+        if trial != probe and _fails(candidate, trial, fields):
+            probe = trial
+            break
+    lo = probe.seconds - 86400
+    if lo >= _LOWER and not _fails(candidate, probe._replace(seconds=lo), fields):
+        hi = probe.seconds  # lo 通过，hi 失败
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if _fails(candidate, probe._replace(seconds=mid), fields):
+                hi = mid
+            else:
+                lo = mid
+        probe = probe._replace(seconds=hi)
+    return probe
+
+def _run_chunk(candidate_name: str, seed: int, chunk: int, size: int, fields: Sequence[str],
+               max_failures: int) -> Dict[str, Any]:
+    """工作进程：按 (seed, chunk) 生成探测输入，两条路径各跑一遍并比对"""
+    candidate = resolve(candidate_name)
+    # 按时刻排序后再跑：lunar_python 只缓存最近一个农历年，乱序会每次重算整年的朔望与节气
+    probes = sorted(sample(random.Random(f"{seed}:{chunk}"), size))
+
+    t0 = time.perf_counter()
+    actual = candidate(probes, fields)
+    t1 = time.perf_counter()
+    expected = [reference(p, list(a)) for p, a in zip(probes, actual)]
+    t2 = time.perf_counter()
+
+    failures = []
+    for probe, e, a in zip(probes, expected, actual):
+        diff = _diff(e, a)
+        if diff:
+            failures.append((probe, diff))
+    return {
+        "probes": size, "candidate_seconds": t1 - t0, "reference_seconds": t2 - t1,
+        "failed": len(failures), "failures": failures[:max_failures],
+        "fields": sorted({k for a in actual for k in a})
+    }
+
+def run(candidate: str, samples: int, workers: int = 1, seed: int = 20240101, chunk: int = 20000,
+        fields: Sequence[str] = DEFAULT_FIELDS, max_failures: int = 5) -> Dict[str, Any]:
+    """按块并行比对；块内的探测输入只由 (seed, 块序号) 决定，结果与进程数无关"""
+    resolve(candidate)
+    sizes = [min(chunk, samples - i) for i in range(0, samples, chunk)]
+    args = [(candidate, seed, i, size, tuple(fields), max_failures) for i, size in enumerate(sizes)]
+
+    t0 = time.perf_counter()
+    if workers <= 1 or len(args) <= 1:
+        parts = [_run_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_chunk, *zip(*args)))
+    elapsed = time.perf_counter() - t0
+
+    failures = [f for p in parts for f in p["failures"]][:max_failures]
+    shrunk = []
+    resolved = resolve(candidate)
+    for probe, diff in failures:
+        minimal = shrink(resolved, probe, fields)
+        actual = resolved([minimal], fields)[0]
+        shrunk.append({"probe": str(probe), "diff": diff, "minimal": str(minimal), "minimal_probe": minimal,
+                       "minimal_diff": _diff(reference(minimal, list(actual)), actual)})
+
+    candidate_seconds = sum(p["candidate_seconds"] for p in parts)
+    reference_seconds = sum(p["reference_seconds"] for p in parts)
+    return {
+        "candidate": candidate, "seed": seed, "probes": samples, "workers": workers,
+        "fields": sorted({f for p in parts for f in p["fields"]}),
+        "failed": sum(p["failed"] for p in parts),
+        "elapsed_seconds": elapsed,
+        "candidate_rate": samples / candidate_seconds if candidate_seconds > 0 else float("inf"),
+        "reference_rate": samples / reference_seconds if reference_seconds > 0 else float("inf"),
+        "failures": shrunk
+    }
+
+def print_report(report: Dict[str, Any]):
+    print("\n" + "═"*75)
+    print(f"  差分校验: {report['candidate']} vs 参考路径 (探测 {report['probes']}，种子 {report['seed']}，"
+          f"进程 {report['workers']})")
+    print("─"*75)
+    print(f"  比对字段: {', '.join(report['fields'])}")
+    print(f"  {'路径':<12}{'吞吐 (次/秒)':>16}")
+    print(f"  {report['candidate']:<12}{report['candidate_rate']:>16.0f}")
+    print(f"  {'reference':<12}{report['reference_rate']:>16.0f}")
+    print(f"  > 加速比 {report['candidate_rate'] / report['reference_rate']:.1f}x，总耗时 {report['elapsed_seconds']:.1f} 秒")
+    print(f"  > 不一致: {report['failed']}")
+    for f in report["failures"]:
+        print(f"  ❌ {f['probe']}")
+        print(f"     最小复现: {f['minimal']}")
+        for field, (expected, actual) in f["minimal_diff"].items():
+            print(f"     {field}: 参考 {expected} / 候选 {actual}")
+    print("═"*75 + "\n")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.engine.verify",
+                                     description="差分校验：候选实现与 lunar_python 参考路径逐项比对")
+    parser.add_argument("candidate", nargs="?", default="engine",
+                        help=f"内置候选 {'/'.join(CANDIDATES)}，或 module:function")
+    parser.add_argument("-n", "--samples", type=int, default=100000, help="探测输入数")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="工作进程数")
+    parser.add_argument("--seed", type=int, default=20240101)
+    parser.add_argument("--chunk", type=int, default=20000, help="每块探测数")
+    parser.add_argument("--fields", default=",".join(DEFAULT_FIELDS), help=f"比对字段，可选 {','.join(FIELDS)}")
+    parser.add_argument("--max-failures", type=int, default=5, help="最多最小化并列出的失败数")
+    parser.add_argument("--json", help="将报告保存为 JSON")
+    args = parser.parse_args(argv)
+
+    fields = tuple(f for f in args.fields.split(",") if f)
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        parser.error(f"未知字段: {', '.join(sorted(unknown))}")
+    report = run(args.candidate, args.samples, args.workers, args.seed, args.chunk, fields, args.max_failures)
+    print_report(report)
+    if args.json:
+        data = dict(report, failures=[{k: v for k, v in f.items() if k != "minimal_probe"} for f in report["failures"]])
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
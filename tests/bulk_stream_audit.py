@@ -0,0 +1,77 @@
+import io
+import json
+from itertools import islice
+from src.engine.cli import arrange_stream, read_ndjson
+from src.engine.core import BaziEngine
+
+def _lines(total: int, every: int):
+    """每 every 行一条合法请求，其余为无效行 (缺少出生时间)"""
+    for i in range(total):
+        if i % every == every - 1:
+            yield json.dumps({"name": f"例{i}", "birth_datetime": f"19{50 + i % 50}-03-0{1 + i % 9} 10:00:00"})
+        else:
+            yield json.dumps({"name": f"坏{i}"})
+
+class _Counter:
+    def __init__(self, lines):
+        self.lines = lines
+        self.read = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+def run_bulk_stream_audit():
+    """
+    流式批量排盘 (大段无效输入)：
+    1. 输出顺序与输入一致，错误项与结果项各在原位置；
+    2. 全部无效的输入也能边读边产出，读入量与已产出量之差有上限；
+    3. 多进程时各段输入共用一个进程池，不随缓冲区排空重建。
+    """
+    engine = BaziEngine()
+    print("\n" + "═"*75)
+    print("  流式批量排盘：大段无效输入")
+    print("─"*75)
+    failures = 0
+
+    for workers in (1, 2):
+        # 1. 顺序与内容：每 50 行一条合法请求
+        items = list(arrange_stream(engine, read_ndjson(io.StringIO("\n".join(_lines(2000, 50)))),
+                                    workers=workers, chunksize=8, max_buffered=100))
+        offsets = [offset for offset, _ in items]
+        valid = [offset for offset, item in items if item.error is None]
+        ok = offsets == list(range(2000)) and valid == list(range(49, 2000, 50)) \
+            and all(item.index == offset for offset, item in items)
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} workers={workers}: 输出 {len(items)} 项，合法 {len(valid)} 项")
+
+        # 2. 全部无效：取前 10 项时读入量不超过缓冲上限
+        source = _Counter(_lines(300000, 300001))
+        head = list(islice(arrange_stream(engine, read_ndjson(source), workers=workers, max_buffered=100), 10))
+        ok = len(head) == 10 and source.read <= 100 + 1
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} workers={workers}: 全部无效，产出 {len(head)} 项时读入 {source.read} 行")
+
+    # 3. 进程池只创建一次：2000 行、缓冲上限 100 时输入被切成约 20 段
+    pools = []
+    create = engine.process_pool
+
+    def counting_pool(workers):
+        pools.append(create(workers))
+        return pools[-1]
+
+    engine.process_pool = counting_pool
+    items = list(arrange_stream(engine, read_ndjson(io.StringIO("\n".join(_lines(2000, 50)))),
+                                workers=2, chunksize=8, max_buffered=100))
+    del engine.process_pool
+    ok = len(pools) == 1 and len(items) == 2000
+    failures += not ok
+    print(f"  {'✅' if ok else '❌'} workers=2: 约 20 段输入共创建进程池 {len(pools)} 个")
+
+    print(f"  > 不一致: {failures}")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_bulk_stream_audit()
@@ -0,0 +1,89 @@
+import io
+import os
+import random
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+from src.engine.core import BaziEngine
+from src.engine.jieqi import ymdhms_to_seconds
+from src.engine.models import BaziRequest
+from src.engine.store import ChartStore, main
+
+def run_chart_store_audit(samples: int = 200, seed: int = 20240701):
+    """
+    命盘库对账：
+    1. 逐条、小批量追加与一次性写入的内容一致，小分区随写随并 (分区数为对数级)，被合并的文件已删除；
+    2. 重新打开后计数、分组与直接按排盘结果统计一致；
+    3. 命令行条件：birth 的日期时间区间、strength_score 的浮点区间，核对输出的计数；
+       未知神煞不匹配任何行，不支持的字段报错退出而非抛出异常。
+    """
+    engine = BaziEngine()
+    rng = random.Random(seed)
+    results = [engine.arrange(BaziRequest(
+        name=f"例{i}", gender=rng.randint(0, 1),
+        birth_datetime=f"{rng.randint(1950, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00"
+    )) for i in range(samples)]
+
+    print("\n" + "═"*75)
+    print(f"  命盘库对账 ({samples} 例)")
+    print("─"*75)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        bulk = ChartStore(os.path.join(tmp, "bulk"))
+        bulk.append(results)
+        small = ChartStore(os.path.join(tmp, "small"), partition_rows=64)
+        i = 0
+        while i < samples:
+            step = rng.choice((1, 1, 2, 5))
+            small.append(results[i:i + step], ids=range(i, i + step))
+            i += step
+
+        # 1. 内容与分区数
+        files = sorted(f for f in os.listdir(small.path) if f.endswith(".npy"))
+        sizes = [p["rows"] for p in small.meta["partitions"]]
+        same = (small.select()["id"].tolist() == list(range(samples))
+                and (small.select() == bulk.select()).all())
+        ok = same and len(sizes) <= samples // 64 + 7 and files == sorted(p["file"] for p in small.meta["partitions"])
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} 小批量追加: 分区 {sizes}，磁盘文件 {len(files)} 个")
+
+        # 2. 重新打开后的统计
+        reopened = ChartStore(small.path)
+        weak = sum(r.analysis.strength_level in ("偏弱", "极弱") for r in results)
+        by_gender = {g: sum(int(r.request.gender) == g for r in results) for g in (0, 1)}
+        ok = reopened.count(strength=["偏弱", "极弱"]) == weak \
+            and reopened.group_by("gender") == {g: n for g, n in by_gender.items() if n}
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} 重新打开: 偏弱/极弱 {weak} 例，性别分布 {by_gender}")
+
+        # 3. 命令行区间条件
+        lo, hi = ymdhms_to_seconds(1980, 1, 1, 0, 0, 0), ymdhms_to_seconds(2000, 1, 1, 0, 0, 0)
+        births = reopened.select()["birth"]
+        expected = int(((births >= lo) & (births <= hi)).sum())
+        got = reopened.count(birth=("1980-01-01 00:00:00", "2000-01-01 00:00:00"))
+        scores = reopened.select()["strength_score"]
+        expected_cli = int(((births >= lo) & (births <= hi) & (scores >= 0) & (scores <= 50)).sum())
+        out = io.StringIO()
+        with redirect_stdout(out):
+            code = main([small.path, "count", "birth=1980-01-01 00:00:00..2000-01-01 00:00:00", "strength_score=0..50"])
+        ok = got == expected and code == 0 and out.getvalue().strip() == str(expected_cli)
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} birth 区间 1980-2000: {got} 例 (期望 {expected})，"
+              f"命令行加 strength_score 0..50 输出 {out.getvalue().strip()} (期望 {expected_cli})")
+
+        # 4. 未知神煞与不支持的字段
+        out, err = io.StringIO(), io.StringIO()
+        with redirect_stdout(out):
+            code = main([small.path, "count", "stars=不存在"])
+        with redirect_stderr(err):
+            bad = main([small.path, "count", "不存在=1"])
+        ok = reopened.count(stars=["不存在", "天乙贵人"]) == 0 and code == 0 and out.getvalue().strip() == "0" \
+            and bad == 2 and "不支持的查询字段" in err.getvalue()
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} 未知神煞计数 {out.getvalue().strip()}，不支持的字段退出码 {bad}")
+
+    print(f"  > 不一致: {failures}")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_chart_store_audit()
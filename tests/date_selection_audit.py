@@ -0,0 +1,104 @@
+import random
+import time
+from src.engine.core import BaziEngine
+from src.engine.models import ZiShiMode
+from src.engine.jieqi import seconds_to_solar, ymdhms_to_seconds
+from src.engine.search import DateSelector, SelectionCriteria
+
+# 不剔除任何时辰、但要求完整判定格局与强弱的条件 (全量对账用)
+FULL = SelectionCriteria(strength_min=float("-inf"))
+
+# 条件组合：逐项与全量时辰上的筛选结果对账
+CRITERIA = (
+    SelectionCriteria(no_clash=True),
+    SelectionCriteria(stars=["天乙贵人"]),
+    SelectionCriteria(stars=["天乙贵人", "月德贵人"], no_clash=True),
+    SelectionCriteria(geju=["正官格", "正财格"]),
+    SelectionCriteria(strength_levels=["中和"]),
+    SelectionCriteria(strength_min=40, strength_max=55, stars=["驿马"]),
+)
+
+def _accepts(w, c: SelectionCriteria, clash: bool) -> bool:
+    return (not c.geju or w.geju in c.geju) \
+        and (not c.strength_levels or w.strength_level in c.strength_levels) \
+        and (c.strength_min is None or w.strength_score >= c.strength_min) \
+        and (c.strength_max is None or w.strength_score <= c.strength_max) \
+        and set(c.stars).issubset(w.stars) \
+        and not (c.no_clash and clash)
+
+def run_date_selection_audit(samples: int = 3, days: int = 20, seed: int = 20240601):
+    """
+    择日对账：
+    1. 不剔除时返回的时辰首尾相接、恰好覆盖查询区间；无条件时与之同一批时辰，但跳过格局与强弱判定；
+    2. 每个时辰以起点跑完整排盘，四柱、格局、强弱与神煞必须与择日判定一致；
+    3. 各条件组合的结果必须等于在全量时辰上按排盘结果筛选，不含格局与强弱条件时这两项为空；
+    4. 多进程与单进程结果一致。
+    """
+    selector = DateSelector()
+    engine = BaziEngine()
+    rng = random.Random(seed)
+
+    print("\n" + "═"*75)
+    print(f"  择日对账 (随机区间 {samples} 段 x {days} 天 x 子时流派 {len(ZiShiMode)})")
+    print("─"*75)
+
+    failures, checked = 0, 0
+    for _ in range(samples):
+        first = rng.randint(ymdhms_to_seconds(1900, 1, 1, 0, 0, 0), ymdhms_to_seconds(2100, 1, 1, 0, 0, 0)) // 3600 * 3600
+        start = seconds_to_solar(first).toYmdHms()
+        end = seconds_to_solar(first + days * 86400).toYmdHms()
+        for zi_shi_mode in ZiShiMode:
+            windows = selector.find(start, end, FULL, zi_shi_mode=zi_shi_mode)
+            if windows[0].start != first or windows[-1].end != first + days * 86400 \
+                    or any(a.end != b.start for a, b in zip(windows, windows[1:])):
+                failures += 1
+                print(f"  ❌ 时辰未完整覆盖 {start} ~ {end} {zi_shi_mode.value}")
+            bare = selector.find(start, end, SelectionCriteria(), zi_shi_mode=zi_shi_mode)
+            if [(w.start, w.end, w.pillars, w.stars) for w in bare] != [(w.start, w.end, w.pillars, w.stars) for w in windows] \
+                    or any(w.geju is not None or w.strength_score is not None for w in bare):
+                failures += 1
+                print(f"  ❌ 无条件择日与完整判定的时辰不一致 {start} ~ {end} {zi_shi_mode.value}")
+
+            clashes = {}
+            for w, item in zip(windows, DateSelector.arrange(windows, engine, zi_shi_mode=zi_shi_mode)):
+                checked += 1
+                r = item.result
+                core = r.core
+                expected = (
+                    tuple(c.gan + c.zhi for c in (core.year, core.month, core.day, core.time)),
+                    r.geju.name, r.analysis.strength_level, r.analysis.strength_score,
+                    tuple(dict.fromkeys(s.name for s in r.stars))
+                )
+                got = (w.pillars, w.geju, w.strength_level, w.strength_score, w.stars)
+                if got != expected:
+                    failures += 1
+                    print(f"  ❌ {w} 择日 {got} 排盘 {expected}")
+                clashes[w.start] = any(i.type == "冲" for i in r.interactions)
+
+            for c in CRITERIA:
+                found = selector.find(start, end, c, zi_shi_mode=zi_shi_mode)
+                picked = [w.start for w in found]
+                expected = [w.start for w in windows if _accepts(w, c, clashes[w.start])]
+                if not c.needs_analysis and any(w.geju is not None for w in found):
+                    failures += 1
+                    print(f"  ❌ 条件 {c} 不含格局与强弱，却返回了判定结果")
+                if picked != expected:
+                    failures += 1
+                    print(f"  ❌ 条件 {c} 择日 {len(picked)} 个，筛选 {len(expected)} 个 ({start})")
+
+    criteria = SelectionCriteria(stars=["天乙贵人"], no_clash=True, strength_levels=["中和", "偏强"])
+    t0 = time.perf_counter()
+    serial = selector.find("2030-01-01 00:00:00", "2032-01-01 00:00:00", criteria, workers=1)
+    cost = time.perf_counter() - t0
+    parallel = selector.find("2030-01-01 00:00:00", "2032-01-01 00:00:00", criteria, workers=2)
+    if serial != parallel:
+        failures += 1
+        print(f"  ❌ 多进程结果不一致: {len(serial)} vs {len(parallel)}")
+
+    print(f"  > 不一致: {failures}，复核时辰 {checked} 个")
+    print(f"  > 两年范围择日 (单进程): {cost:.2f} 秒，命中 {len(serial)} 个时辰")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_date_selection_audit()
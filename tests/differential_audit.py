@@ -0,0 +1,19 @@
+from src.engine.verify import DEFAULT_FIELDS, FIELDS, run, print_report
+
+def run_differential_audit(samples: int = 2000, seed: int = 20240101):
+    """
+    差分校验 (小样本)：两个内置候选与 lunar_python 参考路径逐项比对，均不得有不一致。
+    1. engine：排盘流程实际路径 (整数秒时间校正 + 命盘快照 + 提取器)，全部字段含大运；
+    2. sexagenary：向量化四柱 + 农历月表 + 节气表。
+    两者都覆盖真太阳时探测。
+    大样本请直接运行 python -m src.engine.verify。
+    """
+    failures = 0
+    for candidate, fields in (("engine", FIELDS), ("sexagenary", DEFAULT_FIELDS)):
+        report = run(candidate, samples, workers=1, seed=seed, chunk=samples, fields=fields)
+        print_report(report)
+        failures += report["failed"]
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_differential_audit()
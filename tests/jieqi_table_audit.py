@@ -0,0 +1,60 @@
+import random
+import time
+from lunar_python import Solar
+from src.engine.jieqi import JieQiTable, get_table, solar_to_seconds, seconds_to_solar
+
+def _reference(solar: Solar):
+    lunar = solar.getLunar()
+    prev_jie, next_jie = lunar.getPrevJie(), lunar.getNextJie()
+    return (
+        (prev_jie.getName(), prev_jie.getSolar().toYmdHms()),
+        (next_jie.getName(), next_jie.getSolar().toYmdHms())
+    )
+
+def _from_table(table: JieQiTable, solar: Solar):
+    (prev_name, prev_ts), (next_name, next_ts) = table.prev_next(solar_to_seconds(solar))
+    return (
+        (prev_name, seconds_to_solar(prev_ts).toYmdHms()),
+        (next_name, seconds_to_solar(next_ts).toYmdHms())
+    )
+
+def run_jieqi_table_audit(samples: int = 2000, seed: int = 20240101):
+    """节气表对账：随机时刻 + 每个交节时刻前后 1 秒，与 lunar_python 逐项比对"""
+    table = get_table()
+    assert table is not None, "缺少 data/jieqi_1800_2200.bin，请先运行 python -m src.engine.jieqi"
+
+    rng = random.Random(seed)
+    probes = []
+    for _ in range(samples):
+        probes.append(rng.randint(table.lower, table.upper - 1))
+    # 交节边界：恰好交节、交节前 1 秒
+    for i in range(1, len(table) - 1, max(1, len(table) // samples)):
+        ts = table.instant_at(i)
+        probes.extend([ts, ts - 1])
+
+    print("\n" + "═"*75)
+    print(f"  节气表对账 (表项 {len(table)}, 探测点 {len(probes)})")
+    print("─"*75)
+
+    failures = 0
+    ref_cost, tbl_cost = 0.0, 0.0
+    for ts in probes:
+        solar = seconds_to_solar(ts)
+        t0 = time.perf_counter()
+        expected = _reference(solar)
+        t1 = time.perf_counter()
+        actual = _from_table(table, solar)
+        t2 = time.perf_counter()
+        ref_cost += t1 - t0
+        tbl_cost += t2 - t1
+        if actual != expected:
+            failures += 1
+            print(f"  ❌ {solar.toYmdHms()} 期望 {expected} 实际 {actual}")
+
+    print(f"  > 不一致: {failures}/{len(probes)}")
+    print(f"  > lunar_python: {ref_cost / len(probes) * 1e6:.1f} µs/次, 节气表: {tbl_cost / len(probes) * 1e6:.1f} µs/次")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_jieqi_table_audit()
@@ -0,0 +1,61 @@
+from src.engine.config import config
+from src.engine.core import BaziEngine
+from src.engine.location import AmbiguousLocation
+from src.engine.models import BaziRequest, TimeMode
+
+def run_location_ambiguity_audit():
+    """歧义地名：多个同级同名地点时真太阳时排盘报错并列出候选，不再静默取其一"""
+    print("\n" + "═"*75)
+    print("  地名索引：同名地点的歧义处理")
+    print("─"*75)
+    failures = 0
+
+    def report(desc: str, ok: bool):
+        nonlocal failures
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} {desc}")
+
+    # 1. 索引层：严格查找列出全部同级候选；完整路径与唯一简称不受影响
+    try:
+        config.get_location("南山区", strict=True)
+        report("南山区 严格查找应报歧义", False)
+    except AmbiguousLocation as e:
+        paths = {c.path for c in e.candidates}
+        report(f"南山区 严格查找报歧义：{e}",
+               paths == {"黑龙江省/鹤岗市/南山区", "广东省/深圳市/南山区"})
+    loc = config.get_location("广东/深圳/南山", strict=True)
+    report(f"完整路径 -> {loc.path} {loc.longitude:.2f}°", loc.path == "广东省/深圳市/南山区" and abs(loc.longitude - 113.93) < 0.01)
+    for name, path in (("北京", "北京"), ("吉林", "吉林省"), ("西安", "陕西省/西安市"), ("深圳", "广东省/深圳市")):
+        loc = config.get_location(name, strict=True)
+        report(f"{name} 取最浅一级唯一候选 -> {loc.path}", loc.path == path)
+
+    # 2. 引擎层：真太阳时报错 (单个、批量、多流派对比)；平太阳时不使用经度，照常排盘
+    engine = BaziEngine()
+    true_solar = BaziRequest(name="甲", birth_datetime="1990-05-01 10:00:00", birth_location="南山区",
+                             time_mode=TimeMode.TRUE_SOLAR)
+    try:
+        engine.arrange(true_solar)
+        report("真太阳时 + 歧义地名应报错", False)
+    except ValueError as e:
+        report("真太阳时 + 歧义地名报错", isinstance(e, AmbiguousLocation))
+    item = engine.arrange_many([true_solar], workers=1)[0]
+    report(f"批量排盘记录为单项错误：{item.error}", item.result is None and "广东省/深圳市/南山区" in (item.error or ""))
+    try:
+        engine.arrange_variants(true_solar, full=False)
+        report("含真太阳时的多流派对比应报错", False)
+    except AmbiguousLocation:
+        report("含真太阳时的多流派对比报错", True)
+
+    mean_solar = true_solar.model_copy(update={"time_mode": TimeMode.MEAN_SOLAR})
+    report("平太阳时 + 歧义地名照常排盘", engine.arrange(mean_solar).core.year.gan == "庚")
+    explicit = true_solar.model_copy(update={"birth_location": "广东省/深圳市/南山区"})
+    by_longitude = true_solar.model_copy(update={"longitude": 113.93})
+    a, b = engine.arrange(explicit), engine.arrange(by_longitude)
+    report(f"完整路径与显式经度结果一致：{a.birth_solar_datetime}", a.birth_solar_datetime == b.birth_solar_datetime)
+
+    print(f"  > 不一致: {failures}")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_location_ambiguity_audit()
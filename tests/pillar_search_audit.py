@@ -0,0 +1,75 @@
+import json
+import random
+import time
+from lunar_python import Solar
+from src.engine.models import MonthMode, ZiShiMode
+from src.engine.chart import ChartSnapshot
+from src.engine.extractor import CoreExtractor
+from src.engine.jieqi import ymdhms_to_seconds, seconds_to_solar
+from src.engine.search import PillarSearch
+
+def _pillars(solar: Solar, zi_shi_mode: ZiShiMode, month_mode: MonthMode):
+    """参考口径：与排盘流程相同的 ChartSnapshot + 农历月定月"""
+    chart = ChartSnapshot.build(solar, zi_shi_mode)
+    month = chart.month.gan_zhi
+    if month_mode == MonthMode.LUNAR_MONTH:
+        month = CoreExtractor.lunar_month_gan_zhi(chart.lunar) or month
+    return [chart.year.gan_zhi, month, chart.day.gan_zhi, chart.time.gan_zhi]
+
+def run_pillar_search_audit(samples: int = 150, seed: int = 20240101):
+    """
+    四柱反查对账：
+    1. 随机时刻排出四柱后反查，该时刻必须落在某个返回时段内；
+    2. 每个返回时段的首尾秒按 lunar_python 重新排盘，四柱必须一致；
+    3. 回归命例的四柱反查，原出生日期不在候选中时列出反查结果，供校对数据集。
+    """
+    search = PillarSearch()
+    rng = random.Random(seed)
+    modes = [(z, m) for z in ZiShiMode for m in MonthMode]
+    lower, upper = ymdhms_to_seconds(1800, 1, 1, 0, 0, 0), ymdhms_to_seconds(2201, 1, 1, 0, 0, 0)
+
+    print("\n" + "═"*75)
+    print(f"  四柱反查对账 (随机时刻 {samples} x 流派 {len(modes)})")
+    print("─"*75)
+
+    failures, windows_checked, cost = 0, 0, 0.0
+    for _ in range(samples):
+        ts = rng.randint(lower, upper - 1)
+        solar = seconds_to_solar(ts)
+        for zi_shi_mode, month_mode in modes:
+            pillars = _pillars(solar, zi_shi_mode, month_mode)
+            t0 = time.perf_counter()
+            windows = search.find(pillars, zi_shi_mode=zi_shi_mode, month_mode=month_mode)
+            cost += time.perf_counter() - t0
+            if not any(w.start <= ts < w.end for w in windows):
+                failures += 1
+                print(f"  ❌ 未覆盖 {solar.toYmdHms()} {pillars} {zi_shi_mode.value} {month_mode.value}")
+            for w in windows:
+                for edge in (w.start, w.end - 1):
+                    windows_checked += 1
+                    got = _pillars(seconds_to_solar(edge), zi_shi_mode, month_mode)
+                    if got != pillars:
+                        failures += 1
+                        print(f"  ❌ 误报 {w} 期望 {pillars} 实际 {got}")
+
+    with open("data/regression_test_full.json", "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    for case in cases:
+        birth = case["birth_datetime"][:10]
+        found = {}
+        for zi_shi_mode, month_mode in modes:
+            for w in search.find(case["pillars"], zi_shi_mode=zi_shi_mode, month_mode=month_mode):
+                found[w.start_solar.toYmd()] = w
+                found[seconds_to_solar(w.end - 1).toYmd()] = w
+        if birth not in found:
+            hits = sorted({str(w) for w in found.values()}) or ["无"]
+            print(f"  ⚠️ {case['case_name']} {case['pillars']} 原日期 {birth} 不在反查结果中，反查得到: {', '.join(hits)}")
+
+    queries = samples * len(modes)
+    print(f"  > 不一致: {failures}，复核时段端点 {windows_checked} 个")
+    print(f"  > 反查: {cost / queries * 1e3:.2f} ms/次")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_pillar_search_audit()
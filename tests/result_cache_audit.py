@@ -0,0 +1,52 @@
+import os
+import tempfile
+from src.engine.core import BaziEngine
+from src.engine.cache import ResultCache, SQLiteResultCache
+from src.engine.models import BaziRequest
+
+def run_result_cache_audit():
+    """
+    结果缓存隔离：
+    1. 命中结果与未命中时完整排盘的结果一致 (请求相关字段除外)；
+    2. 调用方修改自己拿到的结果 (含嵌套的四柱、大运、神煞)，之后的命中不受影响；
+    3. SQLite 缓存按最近访问淘汰，行数保持在上限附近。
+    """
+    req_a = BaziRequest(name="甲", birth_datetime="1990-05-01 10:00:00")
+    req_b = BaziRequest(name="乙", birth_datetime="1990-05-01 10:00:00")
+    expected = BaziEngine().arrange(req_b).model_dump(exclude={"environment", "request", "analysis_trace"})
+
+    print("\n" + "═"*75)
+    print("  结果缓存：隔离与容量")
+    print("─"*75)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cache in (("ResultCache", ResultCache()),
+                            ("SQLiteResultCache", SQLiteResultCache(os.path.join(tmp, "cache.db")))):
+            engine = BaziEngine(cache=cache)
+            for _ in range(2):  # 第一次为未命中后写入的结果，第二次为命中结果
+                r = engine.arrange(req_a)
+                r.core.year.gan = "X"
+                r.fortune.da_yun.clear()
+                r.stars.clear()
+            hit = engine.arrange(req_b)
+            got = hit.model_dump(exclude={"environment", "request", "analysis_trace"})
+            ok = got == expected and cache.hits == 2
+            failures += not ok
+            print(f"  {'✅' if ok else '❌'} {name}: 年干 {hit.core.year.gan}，大运 {len(hit.fortune.da_yun)} 步，命中 {cache.hits} 次")
+            if isinstance(cache, SQLiteResultCache):
+                cache.close()
+
+        # 3. SQLite 容量：每 evict_every 次写入淘汰一次，行数不超过 maxsize + evict_every
+        cache = SQLiteResultCache(os.path.join(tmp, "small.db"), maxsize=64)
+        for i in range(300):
+            cache.put(str(i), hit)
+        ok = len(cache) < 64 + cache.evict_every and cache.get("299") is not None and cache.get("0") is None
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} SQLite 容量: maxsize 64，写入 300 条后 {len(cache)} 条")
+        cache.close()
+    print(f"  > 不一致: {failures}")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_result_cache_audit()
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from src.engine.service import BaziService, BatchTooLarge, Overloaded
+from src.engine.models import BaziRequest
+
+async def _call(app, method: str, path: str, body: bytes = b""):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": path, "query_string": b""}, receive, send)
+    return sent[0]["status"], dict(sent[0]["headers"]), json.loads(sent[1]["body"])
+
+def _batch(n: int, invalid: int = 0) -> bytes:
+    rows = [{"name": f"甲{i}", "birth_datetime": f"1990-05-{i % 28 + 1:02d} 10:00:00"} for i in range(n)]
+    rows += [{"name": "坏", "birth_datetime": "不是时间"}] * invalid
+    return json.dumps(rows).encode()
+
+async def _scenario(report):
+    app = BaziService(workers=1, max_pending=2)
+    try:
+        # 1. 空闲服务收到超过 max_pending 的批次：413 而非 429，且不带 Retry-After
+        try:
+            await app.arrange_batch([BaziRequest(name="甲", birth_datetime="1990-05-01 10:00:00")] * 3)
+            report("直接调用超额批次应抛出 BatchTooLarge", False)
+        except BatchTooLarge:
+            report("直接调用超额批次抛出 BatchTooLarge", True)
+        except Overloaded:
+            report("直接调用超额批次误报 Overloaded", False)
+
+        status, headers, body = await _call(app, "POST", "/arrange/batch", _batch(3))
+        report(f"超额批次返回 {status}：{body.get('error')}", status == 413 and b"retry-after" not in headers)
+        report(f"拒绝后背压额度未被占用 (pending={app._pending})", app._pending == 0)
+
+        # 2. 上限只计有效请求；恰好等于上限的批次正常完成
+        status, _, items = await _call(app, "POST", "/arrange/batch", _batch(2, invalid=3))
+        ok = status == 200 and len(items) == 5 and all(item["error"] is None for item in items[:2]) \
+            and all(item["error"] for item in items[2:])
+        report(f"2 个有效 + 3 个无效的批次返回 {status}", ok)
+
+        # 3. 批次本身可容纳、只是当前队列已满时仍返回 429
+        app._pending = 1
+        status, headers, _ = await _call(app, "POST", "/arrange/batch", _batch(2))
+        app._pending = 0
+        report(f"队列已满时可容纳的批次返回 {status}", status == 429 and headers.get(b"retry-after") == b"1")
+    finally:
+        app.shutdown()
+
+def run_service_batch_limit_audit():
+    """批量上限：超过 max_pending 的批次返回 413 (重试无意义)，与队列已满的 429 区分"""
+    print("\n" + "═"*75)
+    print("  排盘服务：超额批次与背压")
+    print("─"*75)
+    failures = 0
+
+    def report(desc: str, ok: bool):
+        nonlocal failures
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} {desc}")
+
+    asyncio.run(_scenario(report))
+    print(f"  > 不一致: {failures}")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_service_batch_limit_audit()
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import os
+import signal
+from src.engine.service import BaziService
+
+async def _call(app, method: str, path: str, body: bytes = b""):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": path, "query_string": b""}, receive, send)
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+async def _scenario(report):
+    app = BaziService(workers=1)
+    await app.warm_up()
+    body = json.dumps({"name": "甲", "birth_datetime": "1990-05-01 10:00:00"}).encode()
+    try:
+        report("排盘正常", (await _call(app, "POST", "/arrange", body))[0] == 200)
+
+        # 1. 杀掉工作进程：在途 / 随后的请求返回 503，health 为 degraded
+        for pid in list(app.executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        await asyncio.sleep(0.5)
+        status, _ = await _call(app, "POST", "/arrange", body)
+        report(f"进程被杀后请求返回 {status}", status == 503)
+        status, health = await _call(app, "GET", "/health")
+        report(f"health: {status} {health['status']}，重建 {health['pool_restarts']} 次",
+               health["pool_restarts"] == 1 and (status, health["status"]) in ((503, "degraded"), (200, "ok")))
+
+        # 2. 重建预热完成后恢复
+        await app._rewarming
+        status, health = await _call(app, "GET", "/health")
+        report(f"重建后 health: {status} {health['status']}", status == 200 and health["status"] == "ok")
+        status, result = await _call(app, "POST", "/arrange", body)
+        report(f"重建后排盘返回 {status}", status == 200 and result["core"]["year"]["gan"] == "庚")
+    finally:
+        app.shutdown()
+
+def run_service_recovery_audit():
+    """服务自愈：工作进程被杀后请求返回 503、health 报告 degraded，进程池重建预热后恢复"""
+    print("\n" + "═"*75)
+    print("  排盘服务：工作进程崩溃后的自愈")
+    print("─"*75)
+    failures = 0
+
+    def report(desc: str, ok: bool):
+        nonlocal failures
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} {desc}")
+
+    asyncio.run(_scenario(report))
+    print(f"  > 不一致: {failures}")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_service_recovery_audit()
@@ -0,0 +1,47 @@
+import random
+import time
+from src.engine.jieqi import ymdhms_to_seconds
+from src.engine.timezone import TzDatabase, _zoneinfo_offset
+
+def run_tz_table_audit(samples: int = 20000, seed: int = 20240101):
+    """时区表对账：随机 (时区, 墙钟时刻) + 每个转换点前后，与 zoneinfo 逐项比对"""
+    table = TzDatabase().table
+    assert table is not None, "缺少 data/tz_1800_2200.bin，请先运行 python -m src.engine.timezone"
+
+    rng = random.Random(seed)
+    zones = table.zones
+    lower = ymdhms_to_seconds(table.start_year, 1, 2, 0, 0, 0)
+    upper = ymdhms_to_seconds(table.end_year, 12, 30, 0, 0, 0)
+    probes = [(rng.choice(zones), rng.randint(lower, upper)) for _ in range(samples)]
+    # 转换边界：跳过 / 重复的墙钟时段两端
+    for zone in ("Asia/Shanghai", "Asia/Hong_Kong", "Asia/Taipei", "Asia/Urumqi", "America/New_York", "Europe/London"):
+        start, count = table._zones[zone]
+        for i in range(start + 1, start + count):
+            for delta in (-3601, -3600, -1, 0, 1, 3599, 3600):
+                probes.append((zone, table._keys[i] + delta))
+
+    print("\n" + "═"*75)
+    print(f"  时区表对账 (时区 {len(zones)}, 探测点 {len(probes)})")
+    print("─"*75)
+
+    failures = 0
+    ref_cost, tbl_cost = 0.0, 0.0
+    for zone, seconds in probes:
+        t0 = time.perf_counter()
+        expected = _zoneinfo_offset(zone, seconds)
+        t1 = time.perf_counter()
+        actual = table.lookup(zone, seconds)
+        t2 = time.perf_counter()
+        ref_cost += t1 - t0
+        tbl_cost += t2 - t1
+        if actual != expected:
+            failures += 1
+            print(f"  ❌ {zone} {seconds} 期望 {expected} 实际 {actual}")
+
+    print(f"  > 不一致: {failures}/{len(probes)}")
+    print(f"  > zoneinfo: {ref_cost / len(probes) * 1e6:.1f} µs/次, 时区表: {tbl_cost / len(probes) * 1e6:.1f} µs/次")
+    print("═"*75 + "\n")
+    assert failures == 0
+
+if __name__ == "__main__":
+    run_tz_table_audit()